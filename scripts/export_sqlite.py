@@ -0,0 +1,88 @@
+import argparse
+import sys
+
+from modules.sqlite_export import SQLITE_EXPORT_FILE, export_folders
+from modules.utils import Font, eprint
+from modules.validation import DATA_FOLDERS
+from update_hash import add_jobs_argument, check_folder_hashes
+
+
+def main(database: str, folders: list[str], force: bool, jobs: int | None) -> None:
+    export(database, folders, force, jobs)
+
+
+def export(
+    database: str, folders: list[str], force: bool = False, jobs: int | None = None
+) -> None:
+    """
+    Exports the data files in each folder to a SQLite database. Only data files that
+    have changed since the last export are read again. The export compares each
+    folder's hash.json file with the database to find the changed files, so exits with
+    an error code without exporting anything if a hash.json file is out of date. The
+    hash.json files are only read, never written.
+
+    Args:
+        database (str): The location of the database.
+
+        folders (list[str]): The folders to export. Each must be one of `DATA_FOLDERS`.
+
+        force (bool, optional): Whether to rebuild the database from scratch. Defaults
+            to `False`.
+
+        jobs (int, optional): How many files to hash at once. Defaults to `None`, which
+            uses a thread for each CPU.
+    """
+    if errors := check_folder_hashes(folders, jobs):
+        for error in errors:
+            eprint(f'• {error}')
+
+        eprint(
+            f'\n{Font.error}The hash.json files are out of date. Run python '
+            f'scripts/update_hash.py {" ".join(folders)} first.{Font.end}',
+            level='error',
+        )
+
+        sys.exit(1)
+
+    eprint(f'• Exporting data files to {database}...')
+
+    exported: list[str] = export_folders(database, folders, force)
+
+    eprint(
+        f'• Exporting data files to {database}... done, exported {len(exported)} files.',
+        overwrite=True,
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=(
+            'Exports the clone list, metadata, MIA, and RetroAchievements files to a SQLite '
+            'database.'
+        )
+    )
+    parser.add_argument(
+        'folders',
+        nargs='*',
+        help='The folders to export. Defaults to all of them.',
+    )
+    parser.add_argument(
+        '--database',
+        default=SQLITE_EXPORT_FILE,
+        help=f'The location of the database. Defaults to {SQLITE_EXPORT_FILE}.',
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rebuild the database from scratch, instead of only exporting changed files.',
+    )
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+
+    if unknown_folders := [x for x in args.folders if x not in DATA_FOLDERS]:
+        parser.error(
+            f'unknown folders: {", ".join(unknown_folders)}. Choose from '
+            f'{", ".join(DATA_FOLDERS)}.'
+        )
+
+    main(args.database, args.folders or list(DATA_FOLDERS), args.force, args.jobs)
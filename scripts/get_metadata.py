@@ -0,0 +1,563 @@
+import argparse
+import concurrent.futures
+import contextlib
+import functools
+import io
+import json
+import os
+import pathlib
+import re
+import tempfile
+import zipfile
+
+from typing import IO, Any, Callable, Container, Iterable, Iterator
+
+from modules.languages import TAG_REGEX, get_language_tables, get_title_tags
+from modules.metadata_bundle import METADATA_BUNDLE_FILE, update_metadata_bundle
+from modules.metadata_index import update_metadata_indexes
+from modules.parse_dat import get_logiqx_header, iter_logiqx_titles
+from modules.system_names import get_dat_file_tags_regex
+from modules.utils import (
+    DOWNLOAD_CACHE_FILE,
+    POOL_TASKS_PER_WORKER,
+    SPOOL_MAX_SIZE,
+    DownloadResult,
+    Font,
+    download,
+    eprint,
+    hash_file,
+    iter_bounded_results,
+    make_staging_folder,
+    sync_staged_files,
+    update_download_cache,
+    update_hash,
+    write_bytes_atomic,
+    write_file_atomic,
+)
+
+# The sidecar file that stores the SHA-256 digest of the DAT file each metadata file was
+# last generated from, next to hash.json. Each line is the compact JSON of one system,
+# sorted by file name. It doesn't end in .json, so hash.json doesn't include it.
+METADATA_SOURCE_FILE: str = 'sources.jsonl'
+
+# The strings in a DAT file header's homepage or URL that show which database it's from,
+# and the suffix that's added to the system name for each
+METADATA_SOURCES: dict[str, str] = {
+    'no-intro': 'No-Intro',
+    'redump': 'Redump',
+}
+
+# The attributes that database exports set on a title's `game` tag for its languages
+# and local name
+METADATA_LANGUAGE_ATTRIBS: tuple[str, ...] = ('languages',)
+METADATA_LOCAL_NAME_ATTRIBS: tuple[str, ...] = ('name_alt', 'localName')
+
+# The line ending of the metadata files
+METADATA_NEWLINE: str = '\r\n'
+
+# A language code in any case, like `en` or `EN-gb`. Codes that don't look like this,
+# like `nolang`, are written as they are.
+LANGUAGE_CODE_REGEX: re.Pattern[str] = re.compile(r'[A-Za-z]{2}(?:-[A-Za-z0-9]+)*')
+
+
+def format_language_code(language_code: str) -> str:
+    """
+    Writes a language code the way title tags and the metadata files do, like `En`,
+    `En-GB`, or `Zh-Hans`.
+
+    Args:
+        language_code (str): The language code, in any case.
+
+    Returns:
+        str: The language code.
+    """
+    if not LANGUAGE_CODE_REGEX.fullmatch(language_code):
+        return language_code
+
+    language, *subtags = language_code.split('-')
+
+    return '-'.join(
+        [language.capitalize()] + [x.capitalize() if len(x) == 4 else x.upper() for x in subtags]
+    )
+
+
+def get_dat_files(
+    dat_source: zipfile.ZipFile | pathlib.Path,
+) -> list[tuple[str, Callable[[], IO[bytes]]]]:
+    """
+    Finds the DAT files in a zip file or folder, without reading them.
+
+    Args:
+        dat_source (zipfile.ZipFile | pathlib.Path): The open zip file, or a folder.
+            Folders are searched recursively.
+
+    Returns:
+        list[tuple[str, Callable[[], IO[bytes]]]]: The name of each DAT file, and a
+        function that opens it in binary mode, sorted by name. Zip file members can
+        only be opened while the zip file is open.
+    """
+    if isinstance(dat_source, pathlib.Path):
+        return [
+            (dat_path.name, functools.partial(open, dat_path, 'rb'))
+            for dat_path in sorted(dat_source.rglob('*.dat'))
+            if dat_path.is_file()
+        ]
+
+    return [
+        (pathlib.Path(member.filename).name, functools.partial(dat_source.open, member))
+        for member in sorted(dat_source.infolist(), key=lambda x: x.filename)
+        if not member.is_dir() and member.filename.lower().endswith('.dat')
+    ]
+
+
+def get_metadata_system_name(dat_file: IO[bytes], existing_systems: Container[str] = ()) -> str:
+    """
+    Gets the system name from a No-Intro or Redump DAT file's header, in the same
+    format as the metadata file names.
+
+    Args:
+        dat_file (IO[bytes]): The DAT file, opened in binary mode.
+
+        existing_systems (Container[str], optional): The names of the systems that
+            already have metadata files. If one of them keeps the DAT file tags in the
+            header name, like `Apple - Macintosh (BETA) (No-Intro)`, it's used instead
+            of the name with the tags removed. Defaults to `()`.
+
+    Returns:
+        str: The system name, like `Sony - PlayStation (Redump)`, or `''` if the DAT
+        file isn't from No-Intro or Redump, or doesn't have a LogiqX header.
+    """
+    try:
+        header_data: dict[str, str] = get_logiqx_header(dat_file)
+    except ValueError as error:
+        # Skip the file like one from another database, so one bad DAT file doesn't
+        # stop the others from being updated
+        eprint(f'• {error} Skipping...', level='warning')
+        return ''
+
+    source_text: str = f'{header_data["homepage"]} {header_data["url"]}'.lower()
+
+    for source_key, source_name in METADATA_SOURCES.items():
+        if source_key in source_text:
+            system_name: str = header_data['name'].strip()
+
+            if f'{system_name} ({source_name})' not in existing_systems:
+                system_name = get_dat_file_tags_regex().sub('', system_name).strip()
+
+            if system_name:
+                return f'{system_name} ({source_name})'
+
+    return ''
+
+
+def get_metadata_sources(local_path: str | pathlib.Path) -> dict[str, str]:
+    """
+    Reads the digests of the DAT files the metadata files were last generated from.
+
+    Args:
+        local_path (str | pathlib.Path): The metadata folder.
+
+    Returns:
+        dict[str, str]: Each metadata file name, and the SHA-256 digest of its DAT file.
+    """
+    sources: dict[str, str] = {}
+
+    try:
+        with open(
+            pathlib.Path(local_path).joinpath(METADATA_SOURCE_FILE), encoding='utf-8'
+        ) as source_file:
+            for line in source_file:
+                if line.strip():
+                    source: dict[str, str] = json.loads(line)
+                    sources[source['file']] = source['dat']
+    except FileNotFoundError:
+        pass
+
+    return sources
+
+
+def get_title_tag_languages(name: str) -> list[str]:
+    """
+    Gets a title's language codes the way the metadata files write them. These are the
+    codes in the title's first language tag as they're written, like `En-GB`. If the
+    title doesn't have a language tag, they're the languages its regions imply, without
+    a region or script, like `Zh` for China.
+
+    Args:
+        name (str): The title name, like `Title (Europe) (En-GB,Fr)`.
+
+    Returns:
+        list[str]: The sorted language codes.
+    """
+    language_tag_regex: re.Pattern[str] = get_language_tables().language_tag_regex
+
+    for tag in TAG_REGEX.findall(name):
+        if language_tag_regex.fullmatch(tag):
+            return sorted(set(re.split('[,+]', tag)))
+
+    return sorted({x.split('-', 1)[0] for x in get_title_tags(name).region_languages})
+
+
+def iter_metadata_json(
+    metadata_titles: Iterable[tuple[str, list[str], str]]
+) -> Iterator[str]:
+    """
+    Formats metadata titles as JSON, one title at a time. The output is the same as
+    `json.dumps` with a tab indent and `ensure_ascii` off, except each language list is
+    kept on one line, and lines end in `METADATA_NEWLINE`.
+
+    Args:
+        metadata_titles (Iterable[tuple[str, list[str], str]]): The name, language codes,
+            and local name of each title, in the order to write them. The local name is
+            left out if it's empty.
+
+    Yields:
+        Iterator[str]: The JSON, in chunks.
+    """
+    newline: str = METADATA_NEWLINE
+
+    yield '{'
+
+    separator: str = newline
+
+    for name, languages, local_name in metadata_titles:
+        fields: list[str] = [f'\t\t"languages": {json.dumps(languages, ensure_ascii=False)}']
+
+        if local_name:
+            fields.append(f'\t\t"localName": {json.dumps(local_name, ensure_ascii=False)}')
+
+        yield (
+            f'{separator}\t{json.dumps(name, ensure_ascii=False)}: {{{newline}'
+            f'{("," + newline).join(fields)}{newline}\t}}'
+        )
+
+        separator = f',{newline}'
+
+    if separator == newline:
+        yield f'}}{newline}'
+    else:
+        yield f'{newline}}}{newline}'
+
+
+def main(download_location: str, jobs: int, force: bool) -> None:
+    update_metadata(download_location, jobs, force)
+
+
+def read_dat_file(open_dat_file: Callable[[], IO[bytes]]) -> bytes:
+    """
+    Reads a whole DAT file, to send it to a worker process.
+
+    Args:
+        open_dat_file (Callable[[], IO[bytes]]): The function that opens the DAT file,
+            as returned by `get_dat_files`.
+
+    Returns:
+        bytes: The contents of the DAT file.
+    """
+    with open_dat_file() as dat_file:
+        return dat_file.read()
+
+
+def update_metadata(download_location: str, jobs: int = 1, force: bool = False) -> None:
+    """
+    Generates the metadata files from the latest No-Intro and Redump DAT files. Only
+    systems whose DAT file has changed since their metadata file was last generated
+    are parsed again, and metadata files for systems that aren't in the DAT files are
+    left as they are.
+
+    Args:
+        download_location (str): The URL to download a zip file of DAT files from, or
+            the location of a local zip file or folder of DAT files.
+
+        jobs (int, optional): How many processes to parse the DAT files with. Output is
+            the same regardless of the number of processes. Defaults to `1`.
+
+        force (bool, optional): Whether to parse every DAT file, even if it hasn't
+            changed. Defaults to `False`.
+    """
+    local_path: str = 'metadata'
+    local_file: str = str(pathlib.Path(local_path).joinpath('metadata.zip'))
+
+    eprint()
+
+    download_result: DownloadResult | None = None
+
+    # Keep the zip file in memory unless it gets too large, and read the DAT files
+    # straight out of it
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as metadata_zip:
+        source: IO[bytes] | pathlib.Path
+
+        if pathlib.Path(download_location).exists():
+            source = pathlib.Path(download_location)
+        else:
+            download_result = download(
+                (f'{download_location}', local_file),
+                True,
+                metadata_zip,
+                '' if force else DOWNLOAD_CACHE_FILE,
+            )
+
+            if download_result.failed:
+                return
+
+            if download_result.not_modified:
+                update_download_cache(DOWNLOAD_CACHE_FILE, download_location, download_result)
+                eprint(
+                    '• The metadata DAT files haven\'t changed since the last update, '
+                    'skipping...'
+                )
+                return
+
+            eprint(
+                f'• Downloading {Font.b}{pathlib.Path(local_file).name}{Font.be}... done.',
+                overwrite=True,
+            )
+
+            source = metadata_zip
+
+        # Write the metadata files to a staging folder, so only the files that have
+        # changed are replaced
+        eprint('• Writing system metadata files...')
+
+        sources: dict[str, str] = get_metadata_sources(local_path)
+        updated_sources: dict[str, str] = {}
+        metadata_systems: dict[str, Callable[[], IO[bytes]]] = {}
+
+        existing_systems: set[str] = {x.stem for x in pathlib.Path(local_path).glob('*.json')}
+
+        with contextlib.ExitStack() as exit_stack:
+            dat_source: zipfile.ZipFile | pathlib.Path = (
+                source
+                if isinstance(source, pathlib.Path) and source.is_dir()
+                else exit_stack.enter_context(zipfile.ZipFile(source))
+            )
+
+            # Only the header and digest of each DAT file are read at first, in chunks,
+            # so no DAT file has to be held in memory to find the ones that changed
+            for _, open_dat_file in get_dat_files(dat_source):
+                with open_dat_file() as dat_file:
+                    system_name: str = get_metadata_system_name(dat_file, existing_systems)
+
+                    if not system_name:
+                        continue
+
+                    dat_file.seek(0)
+                    dat_digest: str = hash_file(dat_file)
+
+                # If two files have the same system name, only use the last one, so
+                # workers never write to the same file
+                file_name: str = f'{system_name}.json'
+                updated_sources[file_name] = dat_digest
+
+                if (
+                    not force
+                    and sources.get(file_name) == dat_digest
+                    and pathlib.Path(local_path).joinpath(file_name).is_file()
+                ):
+                    metadata_systems.pop(system_name, None)
+                    continue
+
+                metadata_systems[system_name] = open_dat_file
+
+            with make_staging_folder(local_path) as staging_path:
+                if jobs > 1 and len(metadata_systems) > 1:
+                    # Each changed DAT file is only read when a worker is ready for it,
+                    # so only a few are held in memory at once
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                        for _ in iter_bounded_results(
+                            executor,
+                            write_metadata_system,
+                            (
+                                (
+                                    io.BytesIO(read_dat_file(open_dat_file)),
+                                    system_name,
+                                    local_path,
+                                    staging_path,
+                                )
+                                for system_name, open_dat_file in metadata_systems.items()
+                            ),
+                            jobs * POOL_TASKS_PER_WORKER,
+                        ):
+                            pass
+                else:
+                    for system_name, open_dat_file in metadata_systems.items():
+                        with open_dat_file() as dat_file:
+                            write_metadata_system(
+                                dat_file, system_name, local_path, staging_path
+                            )
+
+                # Systems that aren't in the DAT files keep their metadata files
+                changed_files, _ = sync_staged_files(
+                    staging_path,
+                    local_path,
+                    (x.name for x in pathlib.Path(local_path).iterdir()),
+                )
+
+    eprint(
+        f'• Writing system metadata files... done ({len(metadata_systems)} parsed, '
+        f'{len(changed_files)} changed).',
+        overwrite=True,
+    )
+
+    sources.update(updated_sources)
+
+    write_file_atomic(
+        pathlib.Path(local_path).joinpath(METADATA_SOURCE_FILE),
+        [
+            json.dumps(
+                {'file': file_name, 'dat': dat_digest}, ensure_ascii=False, separators=(',', ':')
+            )
+            + '\n'
+            for file_name, dat_digest in sorted(
+                sources.items(), key=lambda x: (x[0].lower(), x[0])
+            )
+        ],
+    )
+
+    # Update the hash.json file
+    eprint('• Writing metadata hash.json file...')
+
+    files = list(
+        str(x) for x in pathlib.Path(local_path).glob('*.json') if x.name != 'hash.json'
+    )
+
+    update_hash(files, f'{local_path}/hash.json')
+
+    eprint('• Writing metadata hash.json file... done.', overwrite=True)
+
+    eprint(f'• Writing metadata {METADATA_BUNDLE_FILE} file...')
+
+    update_metadata_bundle(local_path)
+
+    eprint(f'• Writing metadata {METADATA_BUNDLE_FILE} file... done.', overwrite=True)
+
+    eprint('• Writing metadata index files...')
+
+    update_metadata_indexes(local_path)
+
+    eprint('• Writing metadata index files... done.', overwrite=True)
+
+    if download_result:
+        update_download_cache(DOWNLOAD_CACHE_FILE, download_location, download_result)
+
+
+def write_metadata_system(
+    dat_file: IO[bytes], system_name: str, local_path: str, staging_path: str
+) -> str:
+    """
+    Parses a No-Intro or Redump DAT file, and writes the languages and local name of
+    each of its titles to a system metadata file. Safe to run in a worker process, as
+    each call only writes the file for its own system.
+
+    Each title's languages come from the first of these that has them, and are always
+    written the way title tags write them, like `En-GB` and `Zh`:
+
+    1. The languages attribute of a database export.
+    2. The existing metadata file, as DAT files don't usually have languages.
+    3. The title's language tag, or the languages implied by its regions, from
+       `get_title_tag_languages`.
+
+    Its local name comes from the database export if it's there, otherwise from the
+    existing metadata file.
+
+    Args:
+        dat_file (IO[bytes]): The DAT file, opened in binary mode.
+
+        system_name (str): The system name, as returned by `get_metadata_system_name`.
+
+        local_path (str): The folder the existing metadata files are in.
+
+        staging_path (str): The folder to write the new metadata file to.
+
+    Returns:
+        str: The system name.
+    """
+    existing_bytes: bytes = b''
+    existing_metadata: dict[str, dict[str, Any]] = {}
+
+    try:
+        existing_bytes = pathlib.Path(local_path).joinpath(f'{system_name}.json').read_bytes()
+        existing_metadata = json.loads(existing_bytes)
+    except FileNotFoundError:
+        pass
+
+    metadata_titles: dict[str, tuple[list[str], str]] = {}
+
+    for title in iter_logiqx_titles(dat_file, ('game', 'machine')):
+        attribs: dict[str, str] = dict(title.tag_attribs)
+        existing_title: dict[str, Any] = existing_metadata.get(title.name, {})
+
+        languages: list[str] = []
+
+        if language_values := [
+            attribs[x] for x in METADATA_LANGUAGE_ATTRIBS if attribs.get(x, '').strip()
+        ]:
+            languages = sorted(
+                {
+                    format_language_code(x.strip())
+                    for x in re.split('[,+]', language_values[0])
+                    if x.strip()
+                }
+            )
+        elif 'languages' in existing_title:
+            languages = existing_title['languages']
+        else:
+            languages = get_title_tag_languages(title.name)
+
+        local_name: str = next(
+            (
+                attribs[x].strip()
+                for x in METADATA_LOCAL_NAME_ATTRIBS
+                if attribs.get(x, '').strip()
+            ),
+            existing_title.get('localName', ''),
+        )
+
+        metadata_titles[title.name] = (languages, local_name)
+
+    # Some existing metadata files are formatted differently, like without a newline at
+    # the end, so if no titles have changed, the file is kept exactly as it is
+    if [
+        (name, title.get('languages'), title.get('localName', ''))
+        for name, title in existing_metadata.items()
+    ] == [(name, *details) for name, details in metadata_titles.items()]:
+        write_bytes_atomic(f'{staging_path}/{system_name}.json', existing_bytes)
+        return system_name
+
+    # Titles are kept in DAT file order, the same as the existing metadata files
+    write_file_atomic(
+        f'{staging_path}/{system_name}.json',
+        iter_metadata_json(
+            (name, languages, local_name)
+            for name, (languages, local_name) in metadata_titles.items()
+        ),
+    )
+
+    return system_name
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generates the metadata files from No-Intro and Redump DAT files.'
+    )
+    parser.add_argument(
+        'download_location',
+        help=(
+            'The URL to download a zip file of DAT files from, or the location of a local '
+            'zip file or folder of DAT files.'
+        ),
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='How many processes to parse DAT files with. Defaults to the CPU count.',
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Parse every DAT file, even the ones that haven\'t changed.',
+    )
+    args = parser.parse_args()
+
+    main(args.download_location, max(args.jobs, 1), args.force)
@@ -1,13 +1,45 @@
-import glob
+import io
 import json
 import pathlib
-import re
 import sys
+import tempfile
 import zipfile
 
-from typing import Any
-
-from modules.utils import Font, download, eprint, update_hash, validate_json
+from modules.system_names import normalize_mia_system_name
+from modules.utils import (
+    DOWNLOAD_CACHE_FILE,
+    SPOOL_MAX_SIZE,
+    DownloadResult,
+    Font,
+    download,
+    eprint,
+    make_staging_folder,
+    sync_staged_files,
+    update_download_cache,
+    update_hash,
+    write_file_atomic,
+)
+from modules.validation import validate_contents
+
+
+def get_mia_json(system_files: list[dict[str, str]]) -> str:
+    """
+    Formats a system's MIA titles as JSON, sorted by name.
+
+    Args:
+        system_files (list[dict[str, str]]): The MIA titles, each with a `name` and
+            `crc`.
+
+    Returns:
+        str: The JSON, tab indented.
+    """
+    mia_entries: list[str] = [
+        f'\n\t\t{{\n\t\t\t"name": {json.dumps(x["name"], ensure_ascii=False)},'
+        f'\n\t\t\t"crc": {json.dumps(x["crc"], ensure_ascii=False)}\n\t\t}}'
+        for x in sorted(system_files, key=lambda x: x['name'])
+    ]
+
+    return f'{{\n\t"mias": [{",".join(mia_entries)}\n\t]\n}}\n'
 
 
 def main(download_location: str) -> None:
@@ -17,154 +49,136 @@ def main(download_location: str) -> None:
 def update_mia(download_location: str) -> None:
     """Downloads the latest MIA lists, and parses them into a usable format."""
 
+    # The zip file is never written to disk, so local_file is only used for reporting
     local_file: str = str(pathlib.Path('mias').joinpath('mia.zip'))
     local_path: str = f'{pathlib.Path(local_file).parent}'
 
-    # Clear out the MIAs folder
-    files = glob.glob(f'{local_path}/*.*')
+    # Only ask for the zip file if it's changed since the MIA files were last written
+    cache_file: str = ''
 
-    for file in files:
-        pathlib.Path(file).unlink()
+    if pathlib.Path(local_path).joinpath('hash.json').exists():
+        cache_file = DOWNLOAD_CACHE_FILE
 
     eprint()
-    failed: bool = False
-    failed = download((f'{download_location}', local_file), True)
+    download_result: DownloadResult
+
+    # Keep the zip file in memory unless it gets too large, and read the Markdown files
+    # straight out of it
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as mia_zip:
+        download_result = download((f'{download_location}', local_file), True, mia_zip, cache_file)
+
+        if download_result.failed:
+            return
+
+        if download_result.not_modified:
+            update_download_cache(DOWNLOAD_CACHE_FILE, download_location, download_result)
+            eprint('• The MIA lists haven\'t changed since the last update, skipping...')
+            return
 
-    if not failed:
         eprint(
             f'• Downloading {Font.b}{pathlib.Path(local_file).name}{Font.be}... done.',
             overwrite=True,
         )
 
-        with zipfile.ZipFile(local_file) as zip_file:
-            for member in zip_file.infolist():
+        # Set up the system MIAs
+        system_mias: dict[str, list[dict[str, str]]] = {}
 
+        with zipfile.ZipFile(mia_zip) as zip_file:
+            md_members: dict[str, zipfile.ZipInfo] = {}
+
+            for member in zip_file.infolist():
                 if member.is_dir():
                     continue
 
-                member.filename = pathlib.Path(member.filename).name
+                if member.filename.endswith('.md'):
+                    md_members[pathlib.Path(member.filename).name] = member
+
+            for md_file, member in md_members.items():
+                # Get the system name
+                system_name: str = normalize_mia_system_name(pathlib.Path(md_file).stem)
+
+                if system_name not in system_mias:
+                    system_mias[system_name] = []
+
+                # Extract the MIA titles
+                with io.TextIOWrapper(zip_file.open(member), encoding='utf-8') as md:
+                    for line in md:
+                        if line.startswith('###'):
+                            if 'CRC: ' in line[-14:]:
+                                system_mias[system_name].append(
+                                    {'name': line[4:-16].strip(), 'crc': line[-9:].strip()}
+                                )
+                        if line.startswith('- '):
+                            if 'CRC: ' in line[-14:]:
+                                system_mias[system_name].append(
+                                    {'name': line[2:-16].strip(), 'crc': line[-9:].strip()}
+                                )
+
+    # Write the MIA JSON files
+    system_mias = dict(sorted(system_mias.items()))
+
+    eprint('• Writing system MIA files...')
+
+    # Write to a staging folder, so only the files that have changed are replaced, and
+    # MIA files for systems that no longer have a list are removed
+    with make_staging_folder(local_path) as staging_path:
+        try:
+            for system, system_files in system_mias.items():
+                write_mia_system(system, system_files, staging_path)
+        except ValueError as error:
+            # Leave the MIA files as they are, and ask for the zip file again next time
+            eprint(f'• {error}', level='error')
+            return
 
-                zip_file.extract(member, local_path)
+        changed_files, removed_files = sync_staged_files(staging_path, local_path, ('hash.json',))
 
-        pathlib.Path(local_file).unlink()
+    eprint(
+        f'• Writing system MIA files... done ({len(changed_files)} changed, '
+        f'{len(removed_files)} removed).',
+        overwrite=True,
+    )
 
-        # Set up the system MIAs
-        system_mias: dict[str, list[dict[str, str]]] = {}
+    # Update the hash.json file
+    eprint(f'• Writing MIA hash.json file...')
 
-        # Get Markdown into a format that's useful for Retool
-        md_files = glob.glob(f'{local_path}/*.md')
+    files = list(str(x) for x in pathlib.Path('mias').glob('*.json'))
 
-        # Get DAT file tags to remove
-        dat_file_tags: list[str] = []
+    update_hash(files, 'mias/hash.json')
+
+    eprint('• Writing MIA hash.json file... done.', overwrite=True)
+
+    update_download_cache(DOWNLOAD_CACHE_FILE, download_location, download_result)
+
+
+def write_mia_system(system_name: str, system_files: list[dict[str, str]], local_path: str) -> None:
+    """
+    Writes a system's MIA titles to a JSON file. The JSON is validated against the MIA
+    schema before it's written, and the file is replaced in one step.
+
+    Args:
+        system_name (str): The system name.
+
+        system_files (list[dict[str, str]]): The MIA titles, each with a `name` and
+            `crc`.
+
+        local_path (str): The folder to write the JSON file to.
+
+    Raises:
+        ValueError: The JSON isn't valid. Each error is printed before this is raised.
+    """
+    mia_json: str = get_mia_json(system_files)
+
+    if errors := validate_contents(mia_json, 'mias'):
+        for error in errors:
+            eprint(f'  * {error}', level='error')
+
+        raise ValueError(
+            f'The MIA file for {system_name} isn\'t valid, check the script is still '
+            'operating as intended.'
+        )
+
+    write_file_atomic(f'{local_path}/{system_name}.json', mia_json)
 
-        try:
-            with open('config/internal-config.json', encoding='utf-8') as input_file:
-                config_file_content: dict[str, Any] = json.load(input_file)
-
-                if 'datFileTags' in config_file_content:
-                    dat_file_tags = config_file_content['datFileTags']
-        except Exception:
-            eprint('Couldn\'t read internal-config.json', level='error')
-            sys.exit(1)
-
-        for md_file in md_files:
-            # Get the system name
-            system_name: str = re.sub('\\s?MIAs$', '', pathlib.Path(md_file).stem)
-
-            for tag in dat_file_tags:
-                system_name = re.sub(rf'\s?\({tag}\)', '', system_name)
-
-            if system_name.startswith('No-Intro - '):
-                system_name = system_name.replace('No-Intro - ', '')
-                system_name = f'{system_name} (No-Intro)'
-
-            if system_name.startswith('Redump - '):
-                system_name = system_name.replace('Redump - ', '')
-                system_name = f'{system_name} (Redump)'
-
-            # Rewrite incorrect system names
-            system_mapping: dict[str, str] = {
-                'Atari - 2600 (No-Intro)': 'Atari - Atari 2600 (No-Intro)',
-                'Atari - 5200 (No-Intro)': 'Atari - Atari 5200 (No-Intro)',
-                'Atari - 7800 (No-Intro)': 'Atari - Atari 7800 (No-Intro)',
-                'Atari - Jaguar (No-Intro)': 'Atari - Atari Jaguar (No-Intro)',
-                'Atari - Lynx (No-Intro)': 'Atari - Atari Lynx (No-Intro)',
-                'Atari - ST (No-Intro)': 'Atari - Atari ST (No-Intro)',
-            }
-
-            for mia_name, proper_name in system_mapping.items():
-                if mia_name == system_name:
-                    system_name = proper_name
-
-            if system_name not in system_mias:
-                system_mias[system_name] = []
-
-            # Extract the MIA titles
-            with open(md_file, encoding='utf-8') as md:
-                for line in md.readlines():
-                    if line.startswith('###'):
-                        if 'CRC: ' in line[-14:]:
-                            system_mias[system_name].append(
-                                {'name': line[4:-16].strip(), 'crc': line[-9:].strip()}
-                            )
-                    if line.startswith('- '):
-                        if 'CRC: ' in line[-14:]:
-                            system_mias[system_name].append(
-                                {'name': line[2:-16].strip(), 'crc': line[-9:].strip()}
-                            )
-
-        # Write the MIA JSON files
-        system_mias = dict(sorted(system_mias.items()))
-
-        eprint('• Writing system MIA files...')
-        for system, system_files in system_mias.items():
-            with open(f'{local_path}/{system}.json', 'w', encoding='utf-8') as mia_file:
-                mia_file.writelines('{\n\t"mias": [')
-
-                for system_file in sorted(system_files, key=lambda x: x['name']):
-                    system_file_name: str = system_file['name'].replace('\\', '\\\\')
-                    system_file_crc: str = system_file['crc']
-
-                    if system_file == sorted(system_files, key=lambda x: x['name'])[-1]:
-                        mia_file.writelines(
-                            f'\n\t\t{{\n\t\t\t"name": "{system_file_name}",\n\t\t\t"crc": "{system_file_crc}"\n\t\t}}'
-                        )
-                    else:
-                        mia_file.writelines(
-                            f'\n\t\t{{\n\t\t\t"name": "{system_file_name}",\n\t\t\t"crc": "{system_file_crc}"\n\t\t}},'
-                        )
-
-                mia_file.writelines('\n\t]\n}\n')
-
-            with open(f'{local_path}/{system}.json', 'r', encoding='utf-8') as mia_file:
-                validate_json(mia_file.read(), f'{local_path}/{system}.json')
-
-        # Remove unneeded MIA files
-        all_mias = glob.glob(f'{local_path}/*.json')
-        all_mias_paths = [pathlib.Path(x) for x in all_mias]
-        new_mias_paths = [pathlib.Path('mias').joinpath(f'{x}.json') for x in system_mias.keys()]
-
-        old_files = [x for x in all_mias_paths if x not in new_mias_paths]
-
-        for old_file in old_files:
-            pathlib.Path(old_file).unlink()
-
-        # Remove the Markdown files
-        files = glob.glob(f'{local_path}/*.md')
-
-        for file in files:
-            pathlib.Path(file).unlink()
-
-        eprint('• Writing system MIA files... done.', overwrite=True)
-
-        # Update the hash.json file
-        eprint(f'• Writing MIA hash.json file...')
-
-        files = list(str(x) for x in pathlib.Path('mias').glob('*.json'))
-
-        update_hash(files, 'mias/hash.json')
-
-        eprint('• Writing MIA hash.json file... done.', overwrite=True)
 
 if __name__ == '__main__':
     main(sys.argv[1])
@@ -1,256 +1,263 @@
-import glob
+import argparse
+import concurrent.futures
+import io
 import json
+import os
 import pathlib
-import re
-import sys
+import tempfile
 import zipfile
 
-from lxml import etree
-from lxml import html as html_
+from typing import IO, Iterable, Iterator
+
+from modules.parse_dat import FileRecord, get_logiqx_header, iter_logiqx_titles
+from modules.system_names import RA_MERGED_SYSTEMS, RA_PREFIX_REGEX, normalize_ra_system_name
+from modules.utils import (
+    DOWNLOAD_CACHE_FILE,
+    POOL_TASKS_PER_WORKER,
+    SPOOL_MAX_SIZE,
+    DownloadResult,
+    Font,
+    copy_file_atomic,
+    download,
+    eprint,
+    iter_bounded_results,
+    make_staging_folder,
+    sync_staged_files,
+    update_download_cache,
+    update_hash,
+    write_file_atomic,
+)
+
+# The digests written for each RetroAchievements title, in order
+RA_DIGEST_TYPES: tuple[str, ...] = ('crc', 'md5', 'sha1', 'sha256')
+
+
+def get_ra_system_name(dat_file: IO[bytes]) -> str:
+    """
+    Gets the system name from a RetroAchievements DAT file's header, and rewrites it to
+    match the No-Intro or Redump system name.
 
-from modules.parse_dat import TitleData, define_lxml_parser, get_logiqx_header, get_logiqx_titles
-from modules.utils import Font, download, eprint, update_hash, validate_json
+    Args:
+        dat_file (IO[bytes]): The DAT file, opened in binary mode.
 
+    Returns:
+        str: The system name, or `''` if the system isn't in No-Intro or Redump, or the
+        DAT file doesn't have a LogiqX header.
+    """
+    try:
+        header_data: dict[str, str] = get_logiqx_header(dat_file)
+    except ValueError as error:
+        # Skip the file like an unknown system, so one bad DAT file doesn't stop the
+        # others from being updated
+        eprint(f'• {error} Skipping...', level='warning')
+        return ''
 
-def main(download_location: str) -> None:
-    update_ra(download_location)
+    return normalize_ra_system_name(header_data['name'])
 
 
-def update_ra(download_location: str) -> None:
+def write_ra_system(dat_file: IO[bytes], system_name: str, local_path: str) -> str:
     """
-    Downloads the latest RetroAchievements DAT files, and parses them into a usable
-    format.
+    Parses a RetroAchievements DAT file, and writes its titles to a system JSON file. Safe
+    to run in a worker process, as each call only writes its own system's file.
 
     Args:
-        config (Config): The Retool config object.
+        dat_file (IO[bytes]): The DAT file, opened in binary mode.
 
-        gui_input (UserInput): Used to determine whether the update is being run from the
-            GUI. If so, check if a custom download location has been set in
-            `user-config.yaml`.
+        system_name (str): The system name, as returned by `get_ra_system_name`.
 
-        no_exit (bool): Whether to exit the Retool process after the update has run.
-
-    Raises:
-        ExitRetool: Silently exit if run from the GUI, so UI elements can re-enable.
+        local_path (str): The folder to write the JSON files to.
 
     Returns:
-        int: How many successful downloads there were.
+        str: The system name.
     """
-    # Download all RetroAchievements details, and get them into a format that Retool
-    # understands
-    local_file: str = str(pathlib.Path('retroachievements').joinpath('ra.zip'))
-    local_path: str = f'{pathlib.Path(local_file).parent}'
+    retroachievements_titles: list[tuple[str, FileRecord]] = []
 
-    # Clear out the RetroAchievements folder
-    files = glob.glob(f'{local_path}/*.*')
+    for title in iter_logiqx_titles(dat_file, ('game', 'machine'), True, 'bytes'):
+        retroachievements_titles.extend((title.name, x) for x in title.files if any(x.digests))
 
-    for file in files:
-        pathlib.Path(file).unlink()
+    retroachievements_titles.sort(key=lambda x: x[0])
 
-    eprint()
+    # Write the file
+    write_file_atomic(f'{local_path}/{system_name}.json', iter_ra_json(retroachievements_titles))
 
-    failed: bool = False
-    failed = download((f'{download_location}', local_file), True)
+    return system_name
 
-    if not failed:
-        eprint(
-            f'• Downloading {Font.b}{pathlib.Path(local_file).name}{Font.be}... done.',
-            overwrite=True,
-        )
 
-        with zipfile.ZipFile(local_file) as zip_file:
-            for member in zip_file.infolist():
+def iter_ra_json(retroachievements_titles: Iterable[tuple[str, FileRecord]]) -> Iterator[str]:
+    """
+    Formats RetroAchievements titles as JSON, one title at a time. The output is the
+    same as `json.dumps` with an indent of 4.
 
-                if member.is_dir():
-                    continue
+    Args:
+        retroachievements_titles (Iterable[tuple[str, FileRecord]]): The name of each
+            title, and a file from it with at least one digest, in the order to write
+            them.
 
-                if (
-                    'Unofficial-RA-DATs-main/DATs/RetroAchievements (No Subfolders)/'
-                    in member.filename
-                ):
-                    member.filename = re.sub('^RA - ', '', pathlib.Path(member.filename).name)
-                    zip_file.extract(member, local_path)
+    Yields:
+        Iterator[str]: The JSON, in chunks.
+    """
+    yield '{\n    "retroachievements": ['
 
-        pathlib.Path(local_file).unlink()
+    separator: str = '\n'
 
-        # Write the RetroAchievements JSON files
-        eprint('• Writing system RetroAchievements files...')
-        files = glob.glob(f'{local_path}/*.dat')
-        title_data: set[TitleData]
+    for name, file in retroachievements_titles:
+        fields: list[str] = [f'            "name": {json.dumps(name)}']
 
-        for file in files:
-            header_data = get_logiqx_header(pathlib.Path(file))
-            title_data = get_logiqx_titles(
-                pathlib.Path(file), ('game', 'machine'), ra_digest_only=True
-            )
+        for digest_type in RA_DIGEST_TYPES:
+            if digest := getattr(file, digest_type):
+                fields.append(f'            "{digest_type}": {json.dumps(digest)}')
 
-            parser = define_lxml_parser()
-
-            for header_detail in header_data:
-                element = etree.XML(
-                    html_.tostring(html_.fromstring(header_detail.strip())), parser=parser
-                )
-
-                if element.tag == 'name':
-                    system_name: str = element.text if element.text is not None else 'Unknown'
-                    break
-
-            system_name = re.sub('^RA - ', '', system_name)
-
-            # Remove systems not in No-Intro or Redump
-            skip_systems: list[str] = [
-                'Arcade',
-                'Elektor TV Games Computer',
-                'NEC PC-8801',
-                'Uzebox',
-                'WASM-4',
-            ]
-
-            if system_name in skip_systems:
-                continue
-
-            # Rewrite incorrect system names
-            system_mapping: dict[str, str] = {
-                '3DO Interactive Multiplayer': 'Panasonic - 3DO Interactive Multiplayer',
-                '3DO Interactive Multiplayer (CHD)': 'Panasonic - 3DO Interactive Multiplayer (CHD)',
-                'Amstrad CPC': 'Amstrad - CPC',
-                'Apple II': 'Apple - II',
-                'Arduboy': 'Arduboy Inc - Arduboy',
-                'Atari 2600': 'Atari - Atari 2600',
-                'Atari 7800': 'Atari - Atari 7800',
-                'Atari Jaguar': 'Atari - Atari Jaguar',
-                'Atari Jaguar CD': 'Atari - Jaguar CD Interactive Multimedia System',
-                'Atari Lynx': 'Atari - Atari Lynx',
-                'Colecovision': 'Coleco - Colecovision',
-                'Emerson Arcadia 2001': 'Emerson - Arcadia 2001',
-                'Fairchild Channel F': 'Fairchild - Channel F',
-                'GCE Vectrex': 'GCE - Vectrex',
-                'Interton VC 4000': 'Interton - VC 4000',
-                'Magnavox Odyssey 2': 'Magnavox - Odyssey 2',
-                'Mattel Intellivision': 'Mattel - Intellivision',
-                'Mega Duck': 'Welback - Mega Duck',
-                'Microsoft MSX': 'Microsoft - MSX',
-                'NEC PC-FX': 'NEC - PC-FX & PC-FXGA',
-                'NEC PC-FX (CHD)': 'NEC - PC-FX & PC-FXGA (CHD)',
-                'NEC TurboGrafx-16': 'NEC - PC Engine - TurboGrafx-16',
-                'NEC TurboGrafx-CD': 'NEC - PC Engine CD & TurboGrafx CD',
-                'NEC TurboGrafx-CD (CHD)': 'NEC - PC Engine CD & TurboGrafx CD (CHD)',
-                'Nintendo 64': 'Nintendo - Nintendo 64',
-                'Nintendo DS': 'Nintendo - Nintendo DS',
-                'Nintendo DSi': 'Nintendo - Nintendo DSi',
-                'Nintendo Entertainment System': 'Nintendo - Nintendo Entertainment System',
-                'Nintendo Game Boy Advance': 'Nintendo - Game Boy Advance',
-                'Nintendo Game Boy Color': 'Nintendo - Game Boy Color',
-                'Nintendo Game Boy': 'Nintendo - Game Boy',
-                'Nintendo GameCube': 'Nintendo - GameCube',
-                'Nintendo Pokemon Mini': 'Nintendo - Pokemon Mini',
-                'Nintendo Virtual Boy': 'Nintendo - Virtual Boy',
-                'Sega 32X': 'Sega - 32X',
-                'Sega CD': 'Sega - Mega CD & Sega CD',
-                'Sega CD (CHD)': 'Sega - Mega CD & Sega CD (CHD)',
-                'Sega Dreamcast': 'Sega - Dreamcast',
-                'Sega Dreamcast (CHD)': 'Sega - Dreamcast (CHD)',
-                'Sega Game Gear': 'Sega - Game Gear',
-                'Sega Genesis': 'Sega - Mega Drive - Genesis',
-                'Sega Master System': 'Sega - Master System - Mark III',
-                'Sega Saturn': 'Sega - Saturn',
-                'Sega Saturn (CHD)': 'Sega - Saturn (CHD)',
-                'Sega SG-1000': 'Sega - SG-1000',
-                'SNK Neo Geo CD': 'SNK - Neo Geo CD',
-                'SNK Neo Geo CD (CHD)': 'SNK - Neo Geo CD (CHD)',
-                'SNK Neo Geo Pocket': 'SNK - NeoGeo Pocket',
-                'Sony Playstation 2': 'Sony - PlayStation 2',
-                'Sony Playstation': 'Sony - PlayStation',
-                'Sony PSP': 'Sony - PlayStation Portable',
-                'Super Nintendo Entertainment System': 'Nintendo - Super Nintendo Entertainment System',
-                'Watara Supervision': 'Watara - Supervision',
-                'WonderSwan': 'Bandai - WonderSwan',
-            }
-
-            for ra_name, proper_name in system_mapping.items():
-                if ra_name == system_name:
-                    system_name = proper_name
-
-            retroachievements_titles: list[dict[str, str]] = []
-
-            for title in title_data:
-                title_digests: list[dict[str, str]] = [
-                    digest
-                    for digest in title.files
-                    if digest != {'crc': '', 'md5': '', 'sha1': '', 'sha256': ''} and digest != {}
-                ]
-
-                for title_digest in title_digests:
-                    retroachievements_title: dict[str, str] = {}
-
-                    retroachievements_title['name'] = title.name
-
-                    def populate_digests(
-                        digest_type: str,
-                        title_digest: dict[str, str] = title_digest,
-                        retroachievements_title: dict[str, str] = retroachievements_title,
-                    ) -> None:
-                        """
-                        Assigns a dictionary key to the relevant digest value.
-
-                        Args:
-                            digest_type (str): The digest type: crc, md5, sha1, sha256.
-                            title_digest: The title digest.
-                            retroachievements_title: The RetroAchievements title.
-                        """
-                        if title_digest[digest_type]:
-                            retroachievements_title[digest_type] = title_digest[digest_type]
-
-                    populate_digests('crc')
-                    populate_digests('md5')
-                    populate_digests('sha1')
-                    populate_digests('sha256')
-
-                    retroachievements_titles.append(retroachievements_title)
-
-            # Modify the JSON
-            json_file: str = json.dumps(
-                json.loads(
-                    f'{{\n\t"retroachievements":\n{json.dumps(sorted(retroachievements_titles, key=lambda d: d['name']))}\n\t}}'
-                ),
-                indent=4,
-            )
+        yield separator + '        {\n' + ',\n'.join(fields) + '\n        }'
+
+        separator = ',\n'
+
+    if separator == '\n':
+        yield ']\n}\n'
+    else:
+        yield '\n    ]\n}\n'
 
-            # Write the file
-            with open(f'{local_path}/{system_name}.json', 'w', encoding='utf-8') as ra_file:
-                ra_file.write(f'{json_file}\n')
 
-            with open(f'{local_path}/{system_name}.json', 'r', encoding='utf-8') as ra_file:
-                validate_json(ra_file.read(), f'{local_path}/{system_name}.json')
+def main(download_location: str, jobs: int) -> None:
+    update_ra(download_location, jobs)
 
-            # We need to duplicate JSON files where systems have been merged
-            merged_systems: dict[str, str] = {
-                'Bandai - WonderSwan': 'Bandai - WonderSwan Color',
-                'Microsoft - MSX': 'Microsoft - MSX2',
-                'NEC - PC Engine - TurboGrafx-16': 'NEC - PC Engine SuperGrafx',
-            }
 
-            for system, duplicate in merged_systems.items():
-                if system == system_name:
-                    with open(f'{local_path}/{duplicate}.json', 'w', encoding='utf-8') as ra_file:
-                        ra_file.write(f'{json_file}\n')
+def update_ra(download_location: str, jobs: int = 1) -> None:
+    """
+    Downloads the latest RetroAchievements DAT files, and parses them into a usable
+    format.
+
+    Args:
+        download_location (str): The URL to download the RetroAchievements DAT files
+            from.
+
+        jobs (int, optional): How many processes to parse the DAT files with. Output is
+            the same regardless of the number of processes. Defaults to `1`.
+    """
+    # Download all RetroAchievements details, and get them into a format that Retool
+    # understands. The zip file is never written to disk, so local_file is only used for
+    # reporting.
+    local_file: str = str(pathlib.Path('retroachievements').joinpath('ra.zip'))
+    local_path: str = f'{pathlib.Path(local_file).parent}'
+
+    # Only ask for the zip file if it's changed since the RetroAchievements files were
+    # last written
+    cache_file: str = ''
+
+    if pathlib.Path(local_path).joinpath('hash.json').exists():
+        cache_file = DOWNLOAD_CACHE_FILE
+
+    eprint()
+
+    download_result: DownloadResult
 
-        # Remove the DAT files
-        files = glob.glob(f'{local_path}/*.dat')
+    # Keep the zip file in memory unless it gets too large, and read the DAT files
+    # straight out of it
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as ra_zip:
+        download_result = download((f'{download_location}', local_file), True, ra_zip, cache_file)
 
-        for file in files:
-            pathlib.Path(file).unlink()
+        if download_result.failed:
+            return
 
-        eprint('• Writing system RetroAchievements files... done.', overwrite=True)
+        if download_result.not_modified:
+            update_download_cache(DOWNLOAD_CACHE_FILE, download_location, download_result)
+            eprint(
+                '• The RetroAchievements DAT files haven\'t changed since the last update, '
+                'skipping...'
+            )
+            return
 
-        # Update the hash.json file
-        eprint(f'• Writing RetroAchievements hash.json file...')
+        eprint(
+            f'• Downloading {Font.b}{pathlib.Path(local_file).name}{Font.be}... done.',
+            overwrite=True,
+        )
 
-        files = list(str(x) for x in pathlib.Path('retroachievements').glob('*.json'))
+        # Write the RetroAchievements JSON files to a staging folder, so only the files
+        # that have changed are replaced
+        eprint('• Writing system RetroAchievements files...')
 
-        update_hash(files, 'retroachievements/hash.json')
+        with make_staging_folder(local_path) as staging_path, zipfile.ZipFile(ra_zip) as zip_file:
+            dat_members: dict[str, zipfile.ZipInfo] = {}
 
-        eprint('• Writing RetroAchievements hash.json file... done.', overwrite=True)
+            for member in zip_file.infolist():
+                if member.is_dir():
+                    continue
+
+                if (
+                    'Unofficial-RA-DATs-main/DATs/RetroAchievements (No Subfolders)/'
+                    in member.filename
+                    and member.filename.endswith('.dat')
+                ):
+                    dat_members[RA_PREFIX_REGEX.sub('', pathlib.Path(member.filename).name)] = member
+
+            ra_systems: dict[str, zipfile.ZipInfo] = {}
+
+            for member in dat_members.values():
+                with zip_file.open(member) as dat_file:
+                    system_name: str = get_ra_system_name(dat_file)
+
+                # If two files have the same system name, only write the last one, so
+                # workers never write to the same file
+                if system_name:
+                    ra_systems[system_name] = member
+
+            if jobs > 1:
+                # Open zip file members can't be passed to another process, so pass
+                # their contents instead. Members are only read as workers become free,
+                # so only a few DAT files are held in memory at once.
+                with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                    for _ in iter_bounded_results(
+                        executor,
+                        write_ra_system,
+                        (
+                            (io.BytesIO(zip_file.read(member)), system_name, staging_path)
+                            for system_name, member in ra_systems.items()
+                        ),
+                        jobs * POOL_TASKS_PER_WORKER,
+                    ):
+                        pass
+            else:
+                for system_name, member in ra_systems.items():
+                    with zip_file.open(member) as dat_file:
+                        write_ra_system(dat_file, system_name, staging_path)
+
+            # We need to duplicate JSON files where systems have been merged. This is
+            # done once every system has been written, so the copies never race a
+            # worker. Systems that have their own DAT file aren't overwritten.
+            for system_name, duplicate in RA_MERGED_SYSTEMS.items():
+                if system_name in ra_systems and duplicate not in ra_systems:
+                    copy_file_atomic(
+                        f'{staging_path}/{system_name}.json', f'{staging_path}/{duplicate}.json'
+                    )
+
+            changed_files, removed_files = sync_staged_files(staging_path, local_path, ('hash.json',))
+
+    eprint(
+        f'• Writing system RetroAchievements files... done ({len(changed_files)} changed, '
+        f'{len(removed_files)} removed).',
+        overwrite=True,
+    )
+
+    # Update the hash.json file
+    eprint(f'• Writing RetroAchievements hash.json file...')
+
+    files = list(str(x) for x in pathlib.Path('retroachievements').glob('*.json'))
+
+    update_hash(files, 'retroachievements/hash.json')
+
+    eprint('• Writing RetroAchievements hash.json file... done.', overwrite=True)
+
+    update_download_cache(DOWNLOAD_CACHE_FILE, download_location, download_result)
 
 if __name__ == '__main__':
-    main(sys.argv[1])
+    parser = argparse.ArgumentParser(description='Gets the latest RetroAchievements files.')
+    parser.add_argument('download_location', help='The URL to download the DAT files from.')
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='How many processes to parse DAT files with. Defaults to the CPU count.',
+    )
+    args = parser.parse_args()
+
+    main(args.download_location, max(args.jobs, 1))
+
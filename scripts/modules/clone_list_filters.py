@@ -0,0 +1,384 @@
+import functools
+import re
+
+from typing import Any, Iterable, NamedTuple
+
+from modules.clone_lists import CloneListMatch
+from modules.languages import TitleTags, get_code_languages, get_language_tables, get_title_tags
+from modules.utils import get_internal_config
+
+# The special region in a `regionOrder` condition that stands for every region not
+# named in the condition
+ALL_OTHER_REGIONS: str = 'All other regions'
+
+
+class CompiledFilter(NamedTuple):
+    """
+    A clone list filter, compiled into a row of a decision table.
+
+    Args:
+        region_mask (int): The bits of the regions a title must have.
+
+        language_mask (int): The bits of the languages a title must have.
+
+        match_string (re.Pattern[str] | None): A regex that must be found in the title
+            name, if there is one.
+
+        results (dict[str, Any]): What to change about the title if it matches.
+    """
+
+    region_mask: int
+    language_mask: int
+    match_string: re.Pattern[str] | None
+    results: dict[str, Any]
+
+
+class FilterTable:
+    """
+    Compiles the filters in a clone list into a decision table, so titles can be
+    evaluated with integer operations instead of list lookups.
+
+    Each search term's filters are checked in clone list order, and the results of
+    every filter whose conditions are all met are applied, with later filters
+    overriding earlier ones. Conditions work as follows:
+
+    * `matchRegions`: the title has all of the regions.
+    * `matchLanguages`: the title has all of the languages.
+    * `matchString`: the regex is found in the title name.
+    * `regionOrder`: every one of the `higherRegions` comes before every one of the
+      `lowerRegions` in the region order. As this doesn't depend on the title, it's
+      settled when the table is compiled.
+
+    Args:
+        clone_list (dict[str, Any]): The contents of a clone list.
+
+        region_order (Iterable[str], optional): The user's region order. Defaults to
+            `None`, which uses the `defaultRegionOrder` in internal-config.json.
+
+    Raises:
+        ValueError: A filter names a region or language that isn't in
+            internal-config.json, or has an invalid `matchString`.
+    """
+
+    def __init__(
+        self, clone_list: dict[str, Any], region_order: Iterable[str] | None = None
+    ) -> None:
+        if region_order is None:
+            region_order = get_internal_config().get('defaultRegionOrder', {})
+
+        self.region_ranks: dict[str, int] = {
+            region: rank for rank, region in enumerate(region_order)
+        }
+
+        # The filters for each search term, by its clone list index
+        self.filters: dict[int, tuple[CompiledFilter, ...]] = {}
+
+        index: int = 0
+
+        for variant in clone_list.get('variants', []):
+            for title in variant.get('titles', []):
+                try:
+                    compiled_filters: tuple[CompiledFilter, ...] = tuple(
+                        compiled_filter
+                        for title_filter in title.get('filters', [])
+                        if (compiled_filter := self.compile_filter(title_filter))
+                    )
+                except ValueError as error:
+                    raise ValueError(
+                        f'Invalid filter for "{title.get("searchTerm", "")}": {error}'
+                    ) from error
+
+                if compiled_filters:
+                    self.filters[index] = compiled_filters
+
+                index += 1
+
+    def compile_filter(self, title_filter: dict[str, Any]) -> CompiledFilter | None:
+        """
+        Compiles a filter's conditions into bitmasks.
+
+        Args:
+            title_filter (dict[str, Any]): The filter from the clone list.
+
+        Raises:
+            ValueError: The filter names a region or language that isn't in
+                internal-config.json, or has an invalid `matchString`.
+
+        Returns:
+            CompiledFilter | None: The compiled filter, or `None` if its region order
+            isn't met.
+        """
+        conditions: dict[str, Any] = title_filter.get('conditions', {})
+        region_bits: dict[str, int] = get_region_bits()
+
+        region_order: dict[str, list[str]] | None = conditions.get('regionOrder')
+
+        if region_order:
+            higher_regions: list[str] = region_order.get('higherRegions', [])
+            lower_regions: list[str] = region_order.get('lowerRegions', [])
+
+            for region in higher_regions + lower_regions:
+                if region != ALL_OTHER_REGIONS and region not in region_bits:
+                    raise ValueError(f'Unknown region "{region}" in regionOrder')
+
+            if not self.is_region_order_met(higher_regions, lower_regions):
+                return None
+
+        region_mask: int = 0
+
+        for region in conditions.get('matchRegions', []):
+            if region not in region_bits:
+                raise ValueError(f'Unknown region "{region}" in matchRegions')
+
+            region_mask |= region_bits[region]
+
+        language_mask: int = 0
+
+        for language_code in conditions.get('matchLanguages', []):
+            if not (language_bits := get_language_code_bits(language_code)):
+                raise ValueError(f'Unknown language "{language_code}" in matchLanguages')
+
+            language_mask |= language_bits
+
+        match_string: re.Pattern[str] | None = None
+
+        if 'matchString' in conditions:
+            try:
+                match_string = re.compile(conditions['matchString'])
+            except re.error as error:
+                raise ValueError(
+                    f'Invalid matchString "{conditions["matchString"]}": {error}'
+                ) from error
+
+        return CompiledFilter(
+            region_mask=region_mask,
+            language_mask=language_mask,
+            match_string=match_string,
+            results=title_filter.get('results', {}),
+        )
+
+    def evaluate(
+        self,
+        name: str,
+        clone_list_match: CloneListMatch,
+        languages: Iterable[str] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Works out what a title's filters change about it.
+
+        Args:
+            name (str): The title name.
+
+            clone_list_match (CloneListMatch): The search term the title matched in the
+                clone list.
+
+            languages (Iterable[str], optional): The title's language codes, used if its
+                name doesn't have a language tag. Defaults to `None`, in which case the
+                languages implied by its regions are used.
+
+        Returns:
+            dict[str, Any]: The results of the filters that the title meets, merged in
+            order. Empty if it doesn't meet any.
+        """
+        compiled_filters: tuple[CompiledFilter, ...] | None = self.filters.get(
+            clone_list_match.index
+        )
+
+        if not compiled_filters:
+            return {}
+
+        region_bits: int | None = None
+        language_bits: int | None = None
+        results: dict[str, Any] = {}
+
+        for compiled_filter in compiled_filters:
+            if compiled_filter.region_mask or compiled_filter.language_mask:
+                if region_bits is None:
+                    region_bits, language_bits = get_title_bits(
+                        name, tuple(languages) if languages is not None else None
+                    )
+
+                if compiled_filter.region_mask & ~region_bits:
+                    continue
+
+                if compiled_filter.language_mask & ~language_bits:  # type: ignore
+                    continue
+
+            if compiled_filter.match_string and not compiled_filter.match_string.search(
+                name
+            ):
+                continue
+
+            results.update(compiled_filter.results)
+
+        return results
+
+    def evaluate_titles(
+        self,
+        clone_list_matches: dict[str, CloneListMatch],
+        languages: dict[str, Iterable[str]] | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Works out what the filters change about many titles at once, like the matches
+        returned by `CloneListMatcher.match_titles`.
+
+        Args:
+            clone_list_matches (dict[str, CloneListMatch]): The titles, and the search
+                terms they matched in the clone list.
+
+            languages (dict[str, Iterable[str]], optional): The language codes of the
+                titles whose names don't have a language tag, like those in a metadata
+                file. Defaults to `None`.
+
+        Returns:
+            dict[str, dict[str, Any]]: The titles that meet at least one filter, and the
+            merged results of the filters they meet.
+        """
+        if languages is None:
+            languages = {}
+
+        filtered_titles: dict[str, dict[str, Any]] = {}
+
+        for name, clone_list_match in clone_list_matches.items():
+            if clone_list_match.index not in self.filters:
+                continue
+
+            if results := self.evaluate(name, clone_list_match, languages.get(name)):
+                filtered_titles[name] = results
+
+        return filtered_titles
+
+    def is_region_order_met(self, higher_regions: list[str], lower_regions: list[str]) -> bool:
+        """
+        Checks whether regions come before other regions in the region order.
+
+        Args:
+            higher_regions (list[str]): The regions that must come first.
+
+            lower_regions (list[str]): The regions that must come after.
+
+        Returns:
+            bool: Whether every higher region comes before every lower region.
+            Regions that aren't in the region order come after all those that are.
+        """
+        named_regions: set[str] = (set(higher_regions) | set(lower_regions)) - {
+            ALL_OTHER_REGIONS
+        }
+        other_regions: list[str] = [x for x in self.region_ranks if x not in named_regions]
+
+        def get_ranks(regions: list[str]) -> list[int]:
+            """Gets the ranks of regions, expanding the other regions."""
+            ranks: list[int] = []
+
+            for region in regions:
+                if region == ALL_OTHER_REGIONS:
+                    ranks.extend(self.region_ranks[x] for x in other_regions)
+                else:
+                    ranks.append(self.region_ranks.get(region, len(self.region_ranks)))
+
+            return ranks
+
+        higher_ranks: list[int] = get_ranks(higher_regions)
+        lower_ranks: list[int] = get_ranks(lower_regions)
+
+        if not higher_ranks or not lower_ranks:
+            return True
+
+        return max(higher_ranks) < min(lower_ranks)
+
+
+@functools.lru_cache(maxsize=None)
+def get_language_bits() -> dict[str, int]:
+    """
+    Assigns a bit to each language in internal-config.json.
+
+    Returns:
+        dict[str, int]: The bit of each language, by its canonical code.
+    """
+    return {
+        language_code: 1 << bit
+        for bit, language_code in enumerate(get_language_tables().language_regexes)
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_language_code_bits(language_code: str) -> int:
+    """
+    Gets the bits of the languages a language code stands for. Some codes, like `Zh`,
+    stand for more than one language.
+
+    Args:
+        language_code (str): The language code, like `En` or `Pt-BR`.
+
+    Returns:
+        int: The bits of the languages, or `0` if the code isn't recognized.
+    """
+    return get_languages_bits(get_code_languages(language_code))
+
+
+def get_languages_bits(languages: Iterable[str]) -> int:
+    """
+    Gets the bits of languages.
+
+    Args:
+        languages (Iterable[str]): The canonical language codes.
+
+    Returns:
+        int: The bits of the languages.
+    """
+    language_bits: dict[str, int] = get_language_bits()
+    bits: int = 0
+
+    for language in languages:
+        bits |= language_bits[language]
+
+    return bits
+
+
+@functools.lru_cache(maxsize=None)
+def get_region_bits() -> dict[str, int]:
+    """
+    Assigns a bit to each region in internal-config.json.
+
+    Returns:
+        dict[str, int]: The bit of each region.
+    """
+    return {
+        region: 1 << bit for bit, region in enumerate(get_language_tables().region_languages)
+    }
+
+
+@functools.lru_cache(maxsize=65536)
+def get_title_bits(name: str, languages: tuple[str, ...] | None = None) -> tuple[int, int]:
+    """
+    Works out the region and language bits of a title.
+
+    Args:
+        name (str): The title name.
+
+        languages (tuple[str, ...], optional): The title's language codes, used if its
+            name doesn't have a language tag. Defaults to `None`, in which case the
+            languages implied by its regions are used.
+
+    Returns:
+        tuple[int, int]: The region bits, and the language bits.
+    """
+    title_tags: TitleTags = get_title_tags(name)
+    region_bits: dict[str, int] = get_region_bits()
+
+    title_region_bits: int = 0
+
+    for region in title_tags.regions:
+        title_region_bits |= region_bits[region]
+
+    title_language_bits: int = 0
+
+    if title_tags.tag_languages is not None:
+        title_language_bits = get_languages_bits(title_tags.tag_languages)
+    elif languages is not None:
+        for language_code in languages:
+            title_language_bits |= get_language_code_bits(language_code)
+    else:
+        title_language_bits = get_languages_bits(title_tags.region_languages)
+
+    return title_region_bits, title_language_bits
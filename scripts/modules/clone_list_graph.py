@@ -0,0 +1,418 @@
+import json
+import pathlib
+
+from typing import Any, Iterator
+
+from modules.utils import write_file_atomic
+
+# The sidecar file that stores the graph of every clone list, next to hash.json. Each
+# line is the compact JSON graph of one clone list, sorted by file name.
+CLONE_LIST_GRAPH_FILE: str = 'graph.jsonl'
+
+
+class CloneListGraph:
+    """
+    The precomputed superset and compilation relationships in a clone list, with
+    constant time lookups.
+
+    Args:
+        graph (dict[str, Any]): The clone list's graph, as built by
+            `build_clone_list_graph`.
+    """
+
+    def __init__(self, graph: dict[str, Any]) -> None:
+        self.file: str = graph.get('file', '')
+        self.sha256: str = graph.get('hash', '')
+
+        self.groups: dict[str, frozenset[str]] = {
+            term: frozenset(groups) for term, groups in graph.get('groups', {}).items()
+        }
+
+        self.compilations: dict[str, frozenset[str]] = {
+            term: frozenset(compilations)
+            for term, compilations in graph.get('compilations', {}).items()
+        }
+
+        self.supersets: dict[str, frozenset[str]] = {
+            group: frozenset(terms) for group, terms in graph.get('supersets', {}).items()
+        }
+
+        self.cycles: list[list[str]] = graph.get('cycles', [])
+        self.duplicates: list[list[Any]] = graph.get('duplicates', [])
+
+    def get_compilations(self, search_term: str) -> frozenset[str]:
+        """
+        Gets the compilations that contain a title.
+
+        Args:
+            search_term (str): The title's search term.
+
+        Returns:
+            frozenset[str]: The search terms of the compilations.
+        """
+        return self.compilations.get(search_term, frozenset())
+
+    def get_groups(self, search_term: str) -> frozenset[str]:
+        """
+        Gets the groups a title belongs to, either directly or by being a superset of
+        them.
+
+        Args:
+            search_term (str): The title's search term.
+
+        Returns:
+            frozenset[str]: The groups.
+        """
+        return self.groups.get(search_term, frozenset())
+
+    def get_supersets(self, group: str) -> frozenset[str]:
+        """
+        Gets the titles that are supersets of a group, including supersets of
+        supersets.
+
+        Args:
+            group (str): The group.
+
+        Returns:
+            frozenset[str]: The search terms of the supersets.
+        """
+        return self.supersets.get(group, frozenset())
+
+    def is_in_compilation(self, search_term: str, compilation: str) -> bool:
+        """
+        Checks whether a compilation contains a title.
+
+        Args:
+            search_term (str): The title's search term.
+
+            compilation (str): The compilation's search term.
+
+        Returns:
+            bool: Whether the compilation contains the title.
+        """
+        return compilation in self.compilations.get(search_term, ())
+
+    def is_in_group(self, search_term: str, group: str) -> bool:
+        """
+        Checks whether a title belongs to a group, either directly or by being a
+        superset of it.
+
+        Args:
+            search_term (str): The title's search term.
+
+            group (str): The group.
+
+        Returns:
+            bool: Whether the title belongs to the group.
+        """
+        return group in self.groups.get(search_term, ())
+
+
+def build_clone_list_graph(clone_list: dict[str, Any]) -> dict[str, Any]:
+    """
+    Works out the relationships between the titles, supersets, and compilations in a
+    clone list.
+
+    Args:
+        clone_list (dict[str, Any]): The contents of a clone list.
+
+    Returns:
+        dict[str, Any]: The graph, with the following keys:
+
+        * `groups`: each search term, and the groups it belongs to. A superset belongs
+          to the groups it's a superset of, and to the groups those groups' titles are
+          supersets of.
+        * `compilations`: each search term, and the compilations that contain the
+          groups it's in.
+        * `supersets`: each group, and the search terms of all of its supersets.
+        * `cycles`: groups that end up being supersets of themselves.
+        * `duplicates`: search terms that are in more than one group, or are listed more
+          than once in the same group, as `[kind, search term, groups]`.
+    """
+    title_groups: dict[str, set[str]] = {}
+    direct_supersets: dict[str, set[str]] = {}
+    group_compilations: dict[str, set[str]] = {}
+    duplicates: list[list[Any]] = []
+
+    for variant in clone_list.get('variants', []):
+        group: str = variant['group']
+
+        for kind in ('titles', 'supersets', 'compilations'):
+            seen: set[str] = set()
+
+            for title in variant.get(kind) or []:
+                search_term: str = title['searchTerm']
+
+                if search_term in seen:
+                    duplicates.append([kind, search_term, [group]])
+                    continue
+
+                seen.add(search_term)
+
+                if kind == 'titles':
+                    title_groups.setdefault(search_term, set()).add(group)
+                elif kind == 'supersets':
+                    direct_supersets.setdefault(search_term, set()).add(group)
+                else:
+                    group_compilations.setdefault(group, set()).add(search_term)
+
+    for search_term, member_groups in title_groups.items():
+        if len(member_groups) > 1:
+            duplicates.append(['titles', search_term, sorted(member_groups)])
+
+    # A group points to the groups its titles are supersets of
+    group_edges: dict[str, set[str]] = {}
+
+    for search_term, covered_groups in direct_supersets.items():
+        for group in title_groups.get(search_term, ()):
+            group_edges.setdefault(group, set()).update(covered_groups)
+
+    # The transitive closure of each superset
+    superset_groups: dict[str, set[str]] = {}
+
+    for search_term, covered_groups in direct_supersets.items():
+        closure: set[str] = set()
+        pending: list[str] = list(covered_groups)
+
+        while pending:
+            group = pending.pop()
+
+            if group not in closure:
+                closure.add(group)
+                pending.extend(group_edges.get(group, ()))
+
+        superset_groups[search_term] = closure
+
+    groups: dict[str, set[str]] = {
+        search_term: set(member_groups) for search_term, member_groups in title_groups.items()
+    }
+
+    supersets: dict[str, set[str]] = {}
+
+    for search_term, covered_groups in superset_groups.items():
+        groups.setdefault(search_term, set()).update(covered_groups)
+
+        for group in covered_groups:
+            supersets.setdefault(group, set()).add(search_term)
+
+    compilations: dict[str, set[str]] = {}
+
+    for search_term, member_groups in title_groups.items():
+        for group in member_groups:
+            if group in group_compilations:
+                compilations.setdefault(search_term, set()).update(group_compilations[group])
+
+    return {
+        'groups': {k: sorted(v) for k, v in sorted(groups.items())},
+        'compilations': {k: sorted(v) for k, v in sorted(compilations.items())},
+        'supersets': {k: sorted(v) for k, v in sorted(supersets.items())},
+        'cycles': find_cycles(group_edges),
+        'duplicates': sorted(duplicates),
+    }
+
+
+def find_cycles(edges: dict[str, set[str]]) -> list[list[str]]:
+    """
+    Finds the cycles in a directed graph, using Tarjan's strongly connected components
+    algorithm.
+
+    Args:
+        edges (dict[str, set[str]]): Each node, and the nodes it points to.
+
+    Returns:
+        list[list[str]]: The sorted nodes of each cycle, sorted.
+    """
+    indexes: dict[str, int] = {}
+    low_links: dict[str, int] = {}
+    stack: list[str] = []
+    on_stack: set[str] = set()
+    cycles: list[list[str]] = []
+
+    for root in sorted(edges):
+        if root in indexes:
+            continue
+
+        # Iterative, so long superset chains can't hit the recursion limit
+        work: list[tuple[str, Iterator[str]]] = [(root, iter(sorted(edges.get(root, ()))))]
+        indexes[root] = low_links[root] = len(indexes)
+        stack.append(root)
+        on_stack.add(root)
+
+        while work:
+            node, children = work[-1]
+            child: str | None = next(children, None)
+
+            if child is not None:
+                if child not in indexes:
+                    indexes[child] = low_links[child] = len(indexes)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(sorted(edges.get(child, ())))))
+                elif child in on_stack:
+                    low_links[node] = min(low_links[node], indexes[child])
+
+                continue
+
+            work.pop()
+
+            if work:
+                parent: str = work[-1][0]
+                low_links[parent] = min(low_links[parent], low_links[node])
+
+            if low_links[node] == indexes[node]:
+                component: list[str] = []
+
+                while True:
+                    member: str = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+
+                    if member == node:
+                        break
+
+                if len(component) > 1 or node in edges.get(node, ()):
+                    cycles.append(sorted(component))
+
+    return sorted(cycles)
+
+
+def get_graph_line(file_name: str, sha256: str, graph: dict[str, Any]) -> str:
+    """
+    Formats a clone list's graph as a line in the graph file.
+
+    Args:
+        file_name (str): The clone list's file name.
+
+        sha256 (str): The clone list's SHA-256 digest in hash.json.
+
+        graph (dict[str, Any]): The clone list's graph.
+
+    Returns:
+        str: The line, with the file name and hash first so they can be read without
+        parsing the rest.
+    """
+    return (
+        json.dumps(
+            {'file': file_name, 'hash': sha256, **graph},
+            ensure_ascii=False,
+            separators=(',', ':'),
+        )
+        + '\n'
+    )
+
+
+def load_clone_list_graph(
+    clone_list_folder: str | pathlib.Path, clone_list_file: str
+) -> CloneListGraph | None:
+    """
+    Reads the graph of a single clone list from the graph file, without parsing the
+    graphs of the other clone lists.
+
+    Args:
+        clone_list_folder (str | pathlib.Path): The folder that contains the clone
+            lists.
+
+        clone_list_file (str): The clone list's file name, like
+            `Sony - PlayStation (Redump).json`.
+
+    Returns:
+        CloneListGraph | None: The graph, or `None` if the clone list isn't in the
+        graph file.
+    """
+    prefix: str = (
+        json.dumps({'file': clone_list_file}, ensure_ascii=False, separators=(',', ':'))[:-1]
+        + ','
+    )
+
+    try:
+        with open(
+            pathlib.Path(clone_list_folder).joinpath(CLONE_LIST_GRAPH_FILE), encoding='utf-8'
+        ) as graph_file:
+            for line in graph_file:
+                if line.startswith(prefix):
+                    return CloneListGraph(json.loads(line))
+    except FileNotFoundError:
+        pass
+
+    return None
+
+
+def load_clone_list_graphs(clone_list_folder: str | pathlib.Path) -> dict[str, CloneListGraph]:
+    """
+    Reads the graphs of all clone lists from the graph file.
+
+    Args:
+        clone_list_folder (str | pathlib.Path): The folder that contains the clone
+            lists.
+
+    Returns:
+        dict[str, CloneListGraph]: Each clone list's file name, and its graph.
+    """
+    graphs: dict[str, CloneListGraph] = {}
+
+    try:
+        with open(
+            pathlib.Path(clone_list_folder).joinpath(CLONE_LIST_GRAPH_FILE), encoding='utf-8'
+        ) as graph_file:
+            for line in graph_file:
+                if line.strip():
+                    graph: CloneListGraph = CloneListGraph(json.loads(line))
+                    graphs[graph.file] = graph
+    except FileNotFoundError:
+        pass
+
+    return graphs
+
+
+def update_clone_list_graphs(clone_list_folder: str | pathlib.Path) -> list[str]:
+    """
+    Rebuilds the graph file for the clone lists in a folder. Only clone lists whose
+    hash in hash.json has changed since the graph file was last written are read
+    again.
+
+    Args:
+        clone_list_folder (str | pathlib.Path): The folder that contains the clone
+            lists and their hash.json file.
+
+    Returns:
+        list[str]: The clone lists that were rebuilt.
+    """
+    folder: pathlib.Path = pathlib.Path(clone_list_folder)
+
+    with open(folder.joinpath('hash.json'), encoding='utf-8') as hash_file:
+        file_hashes: dict[str, str] = json.load(hash_file)
+
+    existing_lines: dict[str, tuple[str, str]] = {}
+
+    try:
+        with open(folder.joinpath(CLONE_LIST_GRAPH_FILE), encoding='utf-8') as graph_file:
+            for line in graph_file:
+                if line.strip():
+                    graph: dict[str, Any] = json.loads(line)
+                    existing_lines[graph['file']] = (graph['hash'], line)
+    except FileNotFoundError:
+        pass
+
+    lines: list[str] = []
+    rebuilt: list[str] = []
+
+    for file_name, sha256 in sorted(file_hashes.items()):
+        existing: tuple[str, str] | None = existing_lines.get(file_name)
+
+        if existing and existing[0] == sha256:
+            lines.append(existing[1])
+            continue
+
+        with open(folder.joinpath(file_name), encoding='utf-8') as clone_list_file:
+            lines.append(
+                get_graph_line(
+                    file_name, sha256, build_clone_list_graph(json.load(clone_list_file))
+                )
+            )
+
+        rebuilt.append(file_name)
+
+    if rebuilt or len(lines) != len(existing_lines):
+        write_file_atomic(str(folder.joinpath(CLONE_LIST_GRAPH_FILE)), lines)
+
+    return rebuilt
@@ -0,0 +1,278 @@
+import functools
+import json
+import pathlib
+import re
+
+from typing import Any, Iterable, NamedTuple
+
+from modules.languages import LanguageTables, get_language_tables
+
+# How many regex search terms are merged into each combined pattern
+REGEX_CHUNK_SIZE: int = 100
+
+# The name types search terms can have, and the default
+NAME_TYPES: frozenset[str] = frozenset({'full', 'regex', 'regionFree', 'short'})
+DEFAULT_NAME_TYPE: str = 'short'
+DEFAULT_PRIORITY: int = 1
+
+
+class CloneListMatch(NamedTuple):
+    """
+    A title's place in a clone list.
+
+    Args:
+        group (str): The variant group the title belongs to.
+
+        priority (int): The title's priority in the group. Lower numbers have a higher
+            priority.
+
+        search_term (str): The search term the title matched.
+
+        name_type (str): How the search term was matched: `short`, `full`,
+            `regionFree`, or `regex`.
+
+        index (int): The position of the search term in the clone list. When a title
+            matches more than one search term, the first one wins.
+    """
+
+    group: str
+    priority: int
+    search_term: str
+    name_type: str
+    index: int
+
+
+class CloneListMatcher:
+    """
+    Matches title names to the variant groups in a clone list.
+
+    Search terms are matched against a title's name in one of the following ways,
+    depending on their `nameType`:
+
+    * `short` (the default): the name up to the first tag in brackets.
+    * `full`: the full name.
+    * `regionFree`: the full name without its region and language tags.
+    * `regex`: a regex that's searched for in the full name.
+
+    The plain search terms are indexed by the name they match, and the regex search terms
+    are merged into a few combined patterns, so each title is only looked up once
+    instead of being compared to every search term.
+
+    Args:
+        clone_list (dict[str, Any]): The contents of a clone list.
+    """
+
+    def __init__(self, clone_list: dict[str, Any]) -> None:
+        self.entries: list[CloneListMatch] = []
+        self.name_indexes: dict[str, dict[str, int]] = {
+            'full': {},
+            'regionFree': {},
+            'short': {},
+        }
+
+        regex_terms: list[tuple[int, str]] = []
+
+        for variant in clone_list.get('variants', []):
+            for title in variant.get('titles', []):
+                name_type: str = title.get('nameType', DEFAULT_NAME_TYPE)
+
+                if name_type not in NAME_TYPES:
+                    raise ValueError(
+                        f'Unknown nameType "{name_type}" in group "{variant["group"]}"'
+                    )
+
+                entry: CloneListMatch = CloneListMatch(
+                    group=variant['group'],
+                    priority=title.get('priority', DEFAULT_PRIORITY),
+                    search_term=title['searchTerm'],
+                    name_type=name_type,
+                    index=len(self.entries),
+                )
+
+                self.entries.append(entry)
+
+                if name_type == 'regex':
+                    regex_terms.append((entry.index, entry.search_term))
+                else:
+                    # Only the first of any duplicate search terms can ever match
+                    self.name_indexes[name_type].setdefault(entry.search_term, entry.index)
+
+        self.regex_patterns: list[tuple[re.Pattern[str], dict[str, int]]] = get_regex_patterns(
+            regex_terms
+        )
+
+    def match(self, name: str) -> CloneListMatch | None:
+        """
+        Finds the variant group a title belongs to.
+
+        Args:
+            name (str): The title name.
+
+        Returns:
+            CloneListMatch | None: The first search term in the clone list that the title
+            matches, or `None` if it doesn't match any.
+        """
+        candidates: list[int] = []
+
+        if (index := self.name_indexes['full'].get(name)) is not None:
+            candidates.append(index)
+
+        if (index := self.name_indexes['short'].get(get_short_name(name))) is not None:
+            candidates.append(index)
+
+        if self.name_indexes['regionFree']:
+            region_free_name: str = get_region_free_name(name)
+
+            if (index := self.name_indexes['regionFree'].get(region_free_name)) is not None:
+                candidates.append(index)
+
+        # The patterns are in clone list order, so only the first match is needed, and
+        # only if it could come before the other candidates
+        for pattern, group_indexes in self.regex_patterns:
+            if candidates and next(iter(group_indexes.values())) > min(candidates):
+                break
+
+            if regex_match := pattern.match(name):
+                candidates.append(group_indexes[regex_match.lastgroup])  # type: ignore
+                break
+
+        if not candidates:
+            return None
+
+        return self.entries[min(candidates)]
+
+    def match_titles(self, names: Iterable[str]) -> dict[str, CloneListMatch]:
+        """
+        Finds the variant groups many titles belong to, like the names of the titles
+        returned by `get_logiqx_titles`.
+
+        Args:
+            names (Iterable[str]): The title names.
+
+        Returns:
+            dict[str, CloneListMatch]: The titles that match a search term, and what they
+            matched.
+        """
+        matches: dict[str, CloneListMatch] = {}
+
+        for name in names:
+            if name not in matches and (clone_list_match := self.match(name)):
+                matches[name] = clone_list_match
+
+        return matches
+
+
+def get_regex_patterns(
+    regex_terms: list[tuple[int, str]]
+) -> list[tuple[re.Pattern[str], dict[str, int]]]:
+    """
+    Merges regex search terms into combined patterns. A combined pattern matches at the
+    start of a name if any of its search terms match anywhere in the name, and the
+    name of the group that matches is the first of those search terms. Search terms
+    that have groups of their own are kept in a pattern by themselves, so their
+    backreferences still work.
+
+    Args:
+        regex_terms (list[tuple[int, str]]): The clone list index and regex of each
+            search term, in clone list order.
+
+    Returns:
+        list[tuple[re.Pattern[str], dict[str, int]]]: The combined patterns, in clone
+        list order, along with the clone list index that each group name maps to.
+    """
+    regex_patterns: list[tuple[re.Pattern[str], dict[str, int]]] = []
+    chunk: list[tuple[int, str]] = []
+
+    def add_pattern(terms: list[tuple[int, str]], merge: bool) -> None:
+        """Compiles search terms into a pattern."""
+        if not terms:
+            return
+
+        if merge:
+            pattern: str = '|'.join(
+                rf'(?=[\s\S]*?(?:{term}))(?P<t{index}>)' for index, term in terms
+            )
+        else:
+            index, term = terms[0]
+            pattern = rf'(?=[\s\S]*?(?:{term}))(?P<t{index}>)'
+
+        regex_patterns.append((re.compile(pattern), {f't{index}': index for index, _ in terms}))
+
+    for index, term in regex_terms:
+        try:
+            term_groups: int = re.compile(term).groups
+        except re.error as error:
+            raise ValueError(f'Invalid regex search term "{term}": {error}') from error
+
+        if term_groups:
+            add_pattern(chunk, True)
+            add_pattern([(index, term)], False)
+            chunk = []
+            continue
+
+        chunk.append((index, term))
+
+        if len(chunk) == REGEX_CHUNK_SIZE:
+            add_pattern(chunk, True)
+            chunk = []
+
+    add_pattern(chunk, True)
+
+    return regex_patterns
+
+
+def get_region_free_name(name: str) -> str:
+    """
+    Removes the region and language tags from a title name.
+
+    Args:
+        name (str): The title name.
+
+    Returns:
+        str: The title name without its region and language tags.
+    """
+    return get_region_free_regex().sub('', name)
+
+
+@functools.lru_cache(maxsize=None)
+def get_region_free_regex() -> re.Pattern[str]:
+    """
+    Compiles a regex that matches region and language tags, from the same tables
+    `languages.py` uses to recognize them.
+
+    Returns:
+        re.Pattern[str]: The regex, including the space before each tag.
+    """
+    language_tables: LanguageTables = get_language_tables()
+
+    return re.compile(
+        rf' \((?:{language_tables.region_tag_regex.pattern}'
+        rf'|{language_tables.language_tag_regex.pattern})\)(?= \(|$)'
+    )
+
+
+def get_short_name(name: str) -> str:
+    """
+    Removes everything from the first tag in brackets onwards from a title name.
+
+    Args:
+        name (str): The title name.
+
+    Returns:
+        str: The title name without any tags.
+    """
+    return name.split(' (', 1)[0]
+
+
+def load_clone_list(clone_list_file: str | pathlib.Path) -> CloneListMatcher:
+    """
+    Reads a clone list, and compiles it into a matcher.
+
+    Args:
+        clone_list_file (str | pathlib.Path): The location of the clone list.
+
+    Returns:
+        CloneListMatcher: The matcher.
+    """
+    with open(clone_list_file, encoding='utf-8') as input_file:
+        return CloneListMatcher(json.load(input_file))
@@ -0,0 +1,323 @@
+import functools
+import re
+import sys
+import types
+
+from typing import Any, Iterable, Mapping, NamedTuple
+
+from modules.utils import get_internal_config
+
+# How many distinct tags, and tag combinations, to keep the languages of. Both repeat
+# heavily across titles, so most titles are looked up instead of parsed.
+TAG_CACHE_SIZE: int = 65536
+
+# Finds every tag in brackets in a title name, including the space before it. The
+# first group is the contents of the tag.
+TAG_REGEX: re.Pattern[str] = re.compile(r' \(([^()]*)\)(?= \(|$)')
+
+EMPTY_LANGUAGES: tuple[str, ...] = ()
+
+# Every tuple of language codes that's been built, so equal tuples are only stored once
+INTERNED_LANGUAGES: dict[tuple[str, ...], tuple[str, ...]] = {EMPTY_LANGUAGES: EMPTY_LANGUAGES}
+
+
+class LanguageTables(NamedTuple):
+    """
+    The languages and regions in internal-config.json, compiled for looking up the
+    languages of titles.
+
+    Args:
+        language_codes (Mapping[str, str]): Each language name, and its canonical
+            code, like `English` and `En`.
+
+        language_regexes (Mapping[str, re.Pattern[str]]): Each canonical language code,
+            and a regex that fully matches the codes that stand for the language, like
+            `En` and `En-GB`.
+
+        region_languages (Mapping[str, tuple[str, ...]]): Each region, and the code of
+            the language it implies. Regions without a recognized implied language have
+            an empty tuple.
+
+        region_tag_regex (re.Pattern[str]): A regex that fully matches the contents of
+            a region tag, like `Japan, Korea`.
+
+        language_tag_regex (re.Pattern[str]): A regex that fully matches the contents
+            of a language tag, like `En,Fr,De`.
+    """
+
+    language_codes: Mapping[str, str]
+    language_regexes: Mapping[str, re.Pattern[str]]
+    region_languages: Mapping[str, tuple[str, ...]]
+    region_tag_regex: re.Pattern[str]
+    language_tag_regex: re.Pattern[str]
+
+
+class TitleTags(NamedTuple):
+    """
+    What a title's region and language tags say about it.
+
+    Args:
+        regions (tuple[str, ...]): The regions in the title's first region tag, in tag
+            order. Empty if it doesn't have one.
+
+        tag_languages (tuple[str, ...] | None): The sorted canonical codes of the
+            languages in the title's first language tag, or `None` if it doesn't have
+            one.
+
+        region_languages (tuple[str, ...]): The sorted canonical codes of the languages
+            its regions imply.
+    """
+
+    regions: tuple[str, ...]
+    tag_languages: tuple[str, ...] | None
+    region_languages: tuple[str, ...]
+
+
+# What a title without any tags has
+EMPTY_TITLE_TAGS: TitleTags = TitleTags(
+    regions=(), tag_languages=None, region_languages=EMPTY_LANGUAGES
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_language_tables() -> LanguageTables:
+    """
+    Compiles the languages and regions in internal-config.json into lookup tables.
+
+    Returns:
+        LanguageTables: The lookup tables.
+    """
+    internal_config: dict[str, Any] = get_internal_config()
+    languages: dict[str, str] = internal_config.get('languages', {})
+    regions: dict[str, dict[str, Any]] = internal_config.get('defaultRegionOrder', {})
+
+    # The first code a language's regex matches is its canonical code
+    language_codes: dict[str, str] = {}
+    language_regexes: dict[str, re.Pattern[str]] = {}
+
+    for language, language_regex in languages.items():
+        if language_code := re.match('[A-Za-z-]+', language_regex):
+            language_codes[language] = sys.intern(language_code.group(0))
+            language_regexes[language_codes[language]] = re.compile(language_regex)
+
+    region_languages: dict[str, tuple[str, ...]] = {
+        region: intern_languages(
+            [language_codes[details['impliedLanguage']]]
+            if details.get('impliedLanguage') in language_codes
+            else []
+        )
+        for region, details in regions.items()
+    }
+
+    region_pattern: str = '|'.join(re.escape(x) for x in sorted(regions, key=len, reverse=True))
+    language_pattern: str = '|'.join(f'(?:{x})' for x in languages.values())
+
+    return LanguageTables(
+        language_codes=types.MappingProxyType(language_codes),
+        language_regexes=types.MappingProxyType(language_regexes),
+        region_languages=types.MappingProxyType(region_languages),
+        region_tag_regex=re.compile(
+            rf'(?:{region_pattern})(?:, (?:{region_pattern}))*' if region_pattern else '(?!)'
+        ),
+        language_tag_regex=re.compile(
+            rf'(?:{language_pattern})(?:[,+](?:{language_pattern}))*'
+            if language_pattern
+            else '(?!)'
+        ),
+    )
+
+
+@functools.lru_cache(maxsize=TAG_CACHE_SIZE)
+def get_code_languages(language_code: str) -> tuple[str, ...]:
+    """
+    Works out the canonical codes of the languages a language code stands for, like
+    `En` for `En-GB`. Some codes, like `Zh`, stand for more than one language.
+
+    Args:
+        language_code (str): The language code, as it appears in a language tag or a
+            metadata file.
+
+    Returns:
+        tuple[str, ...]: The sorted canonical codes. Empty if the code isn't
+        recognized.
+    """
+    return intern_languages(
+        canonical_code
+        for canonical_code, language_regex in get_language_tables().language_regexes.items()
+        if language_regex.fullmatch(language_code)
+    )
+
+
+@functools.lru_cache(maxsize=TAG_CACHE_SIZE)
+def get_tag_details(tag: str) -> tuple[bool, tuple[str, ...]] | None:
+    """
+    Works out whether the contents of a tag are regions or languages, and the languages
+    they stand for.
+
+    Args:
+        tag (str): The contents of the tag, like `Japan, Korea` or `En,Fr+De`.
+
+    Returns:
+        tuple[bool, tuple[str, ...]] | None: Whether the tag is a language tag, and the
+        sorted canonical codes of its languages, or of the languages its regions imply.
+        `None` if it's neither a region tag nor a language tag.
+    """
+    language_tables: LanguageTables = get_language_tables()
+
+    if (languages := language_tables.region_languages.get(tag)) is not None:
+        return (False, languages)
+
+    if language_tables.region_tag_regex.fullmatch(tag):
+        return (
+            False,
+            intern_languages(
+                language
+                for region in tag.split(', ')
+                for language in language_tables.region_languages[region]
+            ),
+        )
+
+    if language_tables.language_tag_regex.fullmatch(tag):
+        return (
+            True,
+            intern_languages(
+                language
+                for language_code in re.split('[,+]', tag)
+                for language in get_code_languages(language_code)
+            ),
+        )
+
+    return None
+
+
+@functools.lru_cache(maxsize=TAG_CACHE_SIZE)
+def get_tags_details(tags: str) -> TitleTags:
+    """
+    Finds a title's first region tag and first language tag, and the languages they
+    stand for.
+
+    Args:
+        tags (str): The title name from its first tag onwards, like
+            ` (Europe) (En,Fr,De) (Rev 1)`.
+
+    Returns:
+        TitleTags: The title's regions and languages.
+    """
+    regions: tuple[str, ...] | None = None
+    region_languages: tuple[str, ...] = EMPTY_LANGUAGES
+    tag_languages: tuple[str, ...] | None = None
+
+    for tag in TAG_REGEX.findall(tags):
+        if (tag_details := get_tag_details(tag)) is None:
+            continue
+
+        if tag_details[0]:
+            if tag_languages is None:
+                tag_languages = tag_details[1]
+        elif regions is None:
+            regions = tuple(tag.split(', '))
+            region_languages = tag_details[1]
+
+        if tag_languages is not None and regions is not None:
+            break
+
+    return TitleTags(
+        regions=regions if regions is not None else (),
+        tag_languages=tag_languages,
+        region_languages=region_languages,
+    )
+
+
+def get_tags_languages(tags: str) -> tuple[str, ...]:
+    """
+    Works out a title's languages from its tags. The languages in the first language
+    tag are used if there is one, otherwise the languages implied by the first region
+    tag are used.
+
+    Args:
+        tags (str): The title name from its first tag onwards, like
+            ` (Europe) (En,Fr,De) (Rev 1)`.
+
+    Returns:
+        tuple[str, ...]: The sorted canonical language codes.
+    """
+    title_tags: TitleTags = get_tags_details(tags)
+
+    if title_tags.tag_languages is not None:
+        return title_tags.tag_languages
+
+    return title_tags.region_languages
+
+
+def get_title_languages(name: str) -> tuple[str, ...]:
+    """
+    Works out a title's languages from its name. Languages in a language tag are used
+    if there is one, otherwise the languages implied by its regions are used.
+
+    Args:
+        name (str): The title name, like `Title (Europe) (En,Fr,De)`.
+
+    Returns:
+        tuple[str, ...]: The sorted canonical language codes. Titles with the same
+        languages share the same tuple.
+    """
+    if (tags_start := name.find(' (')) == -1:
+        return EMPTY_LANGUAGES
+
+    return get_tags_languages(name[tags_start:])
+
+
+def get_title_tags(name: str) -> TitleTags:
+    """
+    Finds a title's first region tag and first language tag, and the languages they
+    stand for.
+
+    Args:
+        name (str): The title name, like `Title (Europe) (En,Fr,De)`.
+
+    Returns:
+        TitleTags: The title's regions and languages.
+    """
+    if (tags_start := name.find(' (')) == -1:
+        return EMPTY_TITLE_TAGS
+
+    return get_tags_details(name[tags_start:])
+
+
+def get_titles_languages(names: Iterable[str]) -> dict[str, tuple[str, ...]]:
+    """
+    Works out the languages of many titles at once, like the keys of a metadata file.
+
+    Args:
+        names (Iterable[str]): The title names.
+
+    Returns:
+        dict[str, tuple[str, ...]]: Each title, and its sorted canonical language
+        codes.
+    """
+    titles_languages: dict[str, tuple[str, ...]] = {}
+
+    for name in names:
+        if (tags_start := name.find(' (')) == -1:
+            titles_languages[name] = EMPTY_LANGUAGES
+        else:
+            titles_languages[name] = get_tags_languages(name[tags_start:])
+
+    return titles_languages
+
+
+def intern_languages(languages: Iterable[str]) -> tuple[str, ...]:
+    """
+    Sorts language codes into a tuple, and returns the same tuple for every set of
+    codes that's the same, so titles with the same languages share it.
+
+    Args:
+        languages (Iterable[str]): The language codes. Duplicates and empty codes are
+            removed.
+
+    Returns:
+        tuple[str, ...]: The sorted language codes.
+    """
+    sorted_languages: tuple[str, ...] = tuple(sorted({sys.intern(x) for x in languages if x}))
+
+    return INTERNED_LANGUAGES.setdefault(sorted_languages, sorted_languages)
@@ -0,0 +1,378 @@
+import hashlib
+import json
+import mmap
+import pathlib
+import struct
+
+from typing import Any
+
+from modules.utils import write_bytes_atomic
+
+# The bundle of every metadata file, next to hash.json
+METADATA_BUNDLE_FILE: str = 'metadata.bundle'
+
+# Identifies the file, and the version of its layout
+METADATA_BUNDLE_MAGIC: bytes = b'RTMD'
+METADATA_BUNDLE_VERSION: int = 1
+
+# The bundle's layout, all little-endian. Strings are stored in the string heap, and
+# referenced by their offset in the heap and their length in bytes.
+#
+# * Header: the magic, version, size of a language mask in bytes, the counts of
+#   languages, systems, and titles, the offsets of the language, system, title, and
+#   heap sections, and the SHA-256 digest of the hash.json file it was built from.
+# * Languages: each language code, in sorted order. A language's bit in a title's
+#   language mask is its position in this table.
+# * Systems: each system name and its range in the title table, sorted by name.
+# * Titles: each title name, local name, and language mask. The titles of each system
+#   are together, sorted by name, so they can be binary searched.
+# * Heap: the UTF-8 encoded strings. Repeated strings are only stored once.
+HEADER_STRUCT: struct.Struct = struct.Struct('<4sHH3I4I32s')
+STRING_STRUCT: struct.Struct = struct.Struct('<2I')
+SYSTEM_STRUCT: struct.Struct = struct.Struct('<4I')
+TITLE_STRUCT: struct.Struct = struct.Struct('<4I')
+
+
+class MetadataBundle:
+    """
+    Reads titles from a metadata bundle without loading it, by memory mapping the file
+    and binary searching its indexes. Only the header and the language table are read
+    when the bundle is opened.
+
+    Can be used as a context manager, which closes the bundle on exit.
+
+    Args:
+        bundle_file (str | pathlib.Path): The location of the bundle.
+
+        check_source (bool, optional): Whether to check the bundle was built from the
+            metadata files as they are now, by comparing the digest it was built from
+            with the hash.json file next to it. Defaults to `True`.
+
+    Raises:
+        ValueError: The file isn't a metadata bundle, is a version that can't be read,
+            or is out of date.
+    """
+
+    def __init__(self, bundle_file: str | pathlib.Path, check_source: bool = True) -> None:
+        with open(bundle_file, 'rb') as input_file:
+            try:
+                self.data: mmap.mmap = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as error:
+                raise ValueError(f'{bundle_file} isn\'t a metadata bundle.') from error
+
+        if len(self.data) < HEADER_STRUCT.size:
+            self.data.close()
+            raise ValueError(f'{bundle_file} isn\'t a metadata bundle.')
+
+        (
+            magic,
+            version,
+            self.mask_size,
+            language_count,
+            self.system_count,
+            self.title_count,
+            languages_offset,
+            self.systems_offset,
+            self.titles_offset,
+            self.heap_offset,
+            source_digest,
+        ) = HEADER_STRUCT.unpack_from(self.data, 0)
+
+        if magic != METADATA_BUNDLE_MAGIC or version != METADATA_BUNDLE_VERSION:
+            self.data.close()
+            raise ValueError(
+                f'{bundle_file} isn\'t a version {METADATA_BUNDLE_VERSION} metadata bundle.'
+            )
+
+        self.source_digest: str = source_digest.hex()
+
+        if check_source and self.source_digest != get_source_digest(
+            pathlib.Path(bundle_file).parent
+        ):
+            self.data.close()
+            raise ValueError(
+                f'{bundle_file} is out of date with the metadata files. Rebuild it with '
+                'update_metadata_bundle.py.'
+            )
+        self.title_size: int = TITLE_STRUCT.size + self.mask_size
+
+        self.languages: tuple[str, ...] = tuple(
+            self.get_string(
+                *STRING_STRUCT.unpack_from(self.data, languages_offset + i * STRING_STRUCT.size)
+            ).decode('utf-8')
+            for i in range(language_count)
+        )
+
+    def __enter__(self) -> 'MetadataBundle':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the bundle."""
+        self.data.close()
+
+    def find_system(self, system: str) -> tuple[int, int] | None:
+        """
+        Finds a system in the system table.
+
+        Args:
+            system (str): The system name, like `Sony - PlayStation (Redump)`.
+
+        Returns:
+            tuple[int, int] | None: The index of the system's first title, and how many
+            titles it has, or `None` if the system isn't in the bundle.
+        """
+        target: bytes = system.encode('utf-8')
+        low: int = 0
+        high: int = self.system_count
+
+        while low < high:
+            middle: int = (low + high) // 2
+            name_offset, name_length, first_title, title_count = SYSTEM_STRUCT.unpack_from(
+                self.data, self.systems_offset + middle * SYSTEM_STRUCT.size
+            )
+            name: bytes = self.get_string(name_offset, name_length)
+
+            if name < target:
+                low = middle + 1
+            elif name > target:
+                high = middle
+            else:
+                return (first_title, title_count)
+
+        return None
+
+    def get_string(self, offset: int, length: int) -> bytes:
+        """
+        Reads a string from the heap.
+
+        Args:
+            offset (int): The offset of the string in the heap.
+
+            length (int): The length of the string in bytes.
+
+        Returns:
+            bytes: The UTF-8 encoded string.
+        """
+        start: int = self.heap_offset + offset
+
+        return self.data[start : start + length]
+
+    def get_systems(self) -> list[str]:
+        """
+        Gets the names of the systems in the bundle.
+
+        Returns:
+            list[str]: The system names, sorted.
+        """
+        systems: list[str] = []
+
+        for i in range(self.system_count):
+            name_offset, name_length, _, _ = SYSTEM_STRUCT.unpack_from(
+                self.data, self.systems_offset + i * SYSTEM_STRUCT.size
+            )
+            systems.append(self.get_string(name_offset, name_length).decode('utf-8'))
+
+        return systems
+
+    def lookup(self, system: str, title: str) -> dict[str, Any] | None:
+        """
+        Gets a title's metadata.
+
+        Args:
+            system (str): The system name, like `Sony - PlayStation (Redump)`.
+
+            title (str): The title name.
+
+        Returns:
+            dict[str, Any] | None: The title's metadata, the same as its entry in the
+            system's metadata file, or `None` if the title isn't in the bundle.
+        """
+        if (title_range := self.find_system(system)) is None:
+            return None
+
+        target: bytes = title.encode('utf-8')
+        low: int = title_range[0]
+        high: int = title_range[0] + title_range[1]
+
+        while low < high:
+            middle: int = (low + high) // 2
+            record_offset: int = self.titles_offset + middle * self.title_size
+            name_offset, name_length, local_name_offset, local_name_length = (
+                TITLE_STRUCT.unpack_from(self.data, record_offset)
+            )
+            name: bytes = self.get_string(name_offset, name_length)
+
+            if name < target:
+                low = middle + 1
+            elif name > target:
+                high = middle
+            else:
+                mask_offset: int = record_offset + TITLE_STRUCT.size
+                language_mask: int = int.from_bytes(
+                    self.data[mask_offset : mask_offset + self.mask_size], 'little'
+                )
+
+                metadata: dict[str, Any] = {
+                    'languages': [
+                        language
+                        for bit, language in enumerate(self.languages)
+                        if language_mask >> bit & 1
+                    ]
+                }
+
+                if local_name_length:
+                    metadata['localName'] = self.get_string(
+                        local_name_offset, local_name_length
+                    ).decode('utf-8')
+
+                return metadata
+
+        return None
+
+
+def build_metadata_bundle(metadata_folder: str | pathlib.Path) -> bytes:
+    """
+    Packs the metadata files in a folder into a bundle. The same metadata files always
+    produce the same bundle.
+
+    Args:
+        metadata_folder (str | pathlib.Path): The folder that contains the metadata
+            files and their hash.json file.
+
+    Returns:
+        bytes: The bundle.
+    """
+    folder: pathlib.Path = pathlib.Path(metadata_folder)
+
+    source_digest: bytes = bytes.fromhex(get_source_digest(folder))
+
+    systems: dict[str, dict[str, dict[str, Any]]] = {}
+
+    for metadata_file in folder.glob('*.json'):
+        if metadata_file.name != 'hash.json':
+            with open(metadata_file, encoding='utf-8') as input_file:
+                systems[metadata_file.stem] = json.load(input_file)
+
+    languages: list[str] = sorted(
+        {
+            language
+            for titles in systems.values()
+            for metadata in titles.values()
+            for language in metadata.get('languages', [])
+        }
+    )
+    language_bits: dict[str, int] = {language: 1 << bit for bit, language in enumerate(languages)}
+    mask_size: int = max((len(languages) + 7) // 8, 1)
+
+    heap: bytearray = bytearray()
+    heap_offsets: dict[bytes, int] = {}
+
+    def add_string(string: str) -> tuple[int, int]:
+        """Adds a string to the heap, and gets its offset and length."""
+        encoded: bytes = string.encode('utf-8')
+
+        if (offset := heap_offsets.get(encoded)) is None:
+            offset = heap_offsets[encoded] = len(heap)
+            heap.extend(encoded)
+
+        return (offset, len(encoded))
+
+    language_table: bytes = b''.join(STRING_STRUCT.pack(*add_string(x)) for x in languages)
+
+    system_table: bytearray = bytearray()
+    title_table: bytearray = bytearray()
+    title_count: int = 0
+
+    # Sorting the UTF-8 encoded names gives the same order as sorting the strings, and is
+    # the order the reader compares them in
+    for system in sorted(systems):
+        titles: dict[str, dict[str, Any]] = systems[system]
+
+        system_table += SYSTEM_STRUCT.pack(*add_string(system), title_count, len(titles))
+
+        for title in sorted(titles):
+            metadata: dict[str, Any] = titles[title]
+            language_mask: int = 0
+
+            for language in metadata.get('languages', []):
+                language_mask |= language_bits[language]
+
+            title_table += TITLE_STRUCT.pack(
+                *add_string(title), *add_string(metadata.get('localName', ''))
+            )
+            title_table += language_mask.to_bytes(mask_size, 'little')
+
+        title_count += len(titles)
+
+    languages_offset: int = HEADER_STRUCT.size
+    systems_offset: int = languages_offset + len(language_table)
+    titles_offset: int = systems_offset + len(system_table)
+    heap_offset: int = titles_offset + len(title_table)
+
+    return b''.join(
+        (
+            HEADER_STRUCT.pack(
+                METADATA_BUNDLE_MAGIC,
+                METADATA_BUNDLE_VERSION,
+                mask_size,
+                len(languages),
+                len(systems),
+                title_count,
+                languages_offset,
+                systems_offset,
+                titles_offset,
+                heap_offset,
+                source_digest,
+            ),
+            language_table,
+            system_table,
+            title_table,
+            heap,
+        )
+    )
+
+
+def get_source_digest(metadata_folder: str | pathlib.Path) -> str:
+    """
+    Gets the digest a bundle of the metadata files in a folder is built from, which
+    changes whenever one of the metadata files does.
+
+    Args:
+        metadata_folder (str | pathlib.Path): The folder that contains the metadata
+            files and their hash.json file.
+
+    Returns:
+        str: The SHA-256 digest of the hash.json file.
+    """
+    return hashlib.sha256(
+        pathlib.Path(metadata_folder).joinpath('hash.json').read_bytes()
+    ).hexdigest()
+
+
+def update_metadata_bundle(metadata_folder: str | pathlib.Path) -> bool:
+    """
+    Rebuilds the bundle of the metadata files in a folder. The bundle is only written
+    if it's changed.
+
+    Args:
+        metadata_folder (str | pathlib.Path): The folder that contains the metadata
+            files and their hash.json file.
+
+    Returns:
+        bool: Whether the bundle was written.
+    """
+    bundle_file: pathlib.Path = pathlib.Path(metadata_folder).joinpath(METADATA_BUNDLE_FILE)
+    bundle: bytes = build_metadata_bundle(metadata_folder)
+
+    try:
+        if bundle_file.read_bytes() == bundle:
+            return False
+    except FileNotFoundError:
+        pass
+
+    write_bytes_atomic(bundle_file, bundle)
+
+    return True
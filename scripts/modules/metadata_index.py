@@ -0,0 +1,429 @@
+import json
+import mmap
+import pathlib
+import struct
+
+from typing import Any
+
+from modules.utils import write_bytes_atomic
+
+# The folder in the metadata folder that the index of each metadata file is written to.
+# The indexes point at byte offsets in the local copies of the metadata files, so
+# they're built locally instead of being committed.
+METADATA_INDEX_FOLDER: str = 'index'
+METADATA_INDEX_SUFFIX: str = '.idx'
+
+# Identifies the file, and the version of its layout
+METADATA_INDEX_MAGIC: bytes = b'RTMI'
+METADATA_INDEX_VERSION: int = 2
+
+# The index's layout, all little-endian:
+#
+# * Header: the magic, version, the number of titles, the size of the metadata file,
+#   and the SHA-256 digest of the metadata file in hash.json when the index was built.
+# * Entries: the offset and length of each title name in the name heap, the byte
+#   offset of the title's key in the metadata file, and the byte offset and length of
+#   its JSON object. Sorted by the UTF-8 encoded title name, so they can be binary
+#   searched.
+# * Names: the UTF-8 encoded title names.
+INDEX_HEADER_STRUCT: struct.Struct = struct.Struct('<4sHxxIQ32s')
+INDEX_ENTRY_STRUCT: struct.Struct = struct.Struct('<5I')
+
+JSON_WHITESPACE: str = ' \t\n\r'
+
+
+class MetadataFileIndex:
+    """
+    Reads single titles from a metadata file, by memory mapping the file and its index,
+    binary searching the index, and only parsing the title's JSON object. Each lookup
+    checks the title's key comes right before the object, so an index that's out of
+    date with the file never returns another title's metadata.
+
+    Can be used as a context manager, which closes the files on exit.
+
+    Args:
+        metadata_file (str | pathlib.Path): The location of the metadata file.
+
+        index_file (str | pathlib.Path, optional): The location of the metadata file's
+            index. Defaults to `None`, which uses the index in the
+            `METADATA_INDEX_FOLDER` next to the metadata file.
+
+        check_source (bool, optional): Whether to check the index was built from the
+            metadata file as it is now, by comparing its digest with the one in the
+            hash.json file next to the metadata file, if it's listed there. Defaults to
+            `True`.
+
+    Raises:
+        ValueError: The index isn't valid, or was built from a different version of
+            the metadata file.
+    """
+
+    def __init__(
+        self,
+        metadata_file: str | pathlib.Path,
+        index_file: str | pathlib.Path | None = None,
+        check_source: bool = True,
+    ) -> None:
+        metadata_file = pathlib.Path(metadata_file)
+
+        if index_file is None:
+            index_file = get_index_file(metadata_file.parent, metadata_file.name)
+
+        self.metadata_file: pathlib.Path = metadata_file
+        self.index_file: pathlib.Path = pathlib.Path(index_file)
+        self.index: mmap.mmap = map_file(index_file)
+
+        if len(self.index) < INDEX_HEADER_STRUCT.size:
+            self.index.close()
+            raise ValueError(f'{index_file} isn\'t a metadata index.')
+
+        magic, version, self.title_count, metadata_size, sha256 = (
+            INDEX_HEADER_STRUCT.unpack_from(self.index, 0)
+        )
+
+        if magic != METADATA_INDEX_MAGIC or version != METADATA_INDEX_VERSION:
+            self.index.close()
+            raise ValueError(
+                f'{index_file} isn\'t a version {METADATA_INDEX_VERSION} metadata index.'
+            )
+
+        self.sha256: str = sha256.hex()
+
+        if (
+            check_source
+            and (source_sha256 := get_hash_json_sha256(metadata_file))
+            and self.sha256 != source_sha256
+        ):
+            self.index.close()
+            raise ValueError(f'{index_file} is out of date with {metadata_file}.')
+
+        self.names_offset: int = (
+            INDEX_HEADER_STRUCT.size + self.title_count * INDEX_ENTRY_STRUCT.size
+        )
+
+        try:
+            self.data: mmap.mmap = map_file(metadata_file)
+        except BaseException:
+            self.index.close()
+            raise
+
+        if len(self.data) != metadata_size:
+            self.close()
+            raise ValueError(f'{index_file} is out of date with {metadata_file}.')
+
+    def __enter__(self) -> 'MetadataFileIndex':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the metadata file and its index."""
+        self.index.close()
+        self.data.close()
+
+    def lookup(self, title: str) -> dict[str, Any] | None:
+        """
+        Gets a title's metadata.
+
+        Args:
+            title (str): The title name.
+
+        Raises:
+            ValueError: The title's key isn't where the index says it is, as the
+                metadata file has changed since the index was built.
+
+        Returns:
+            dict[str, Any] | None: The title's entry in the metadata file, or `None` if
+            the title isn't in it.
+        """
+        target: bytes = title.encode('utf-8')
+        low: int = 0
+        high: int = self.title_count
+
+        while low < high:
+            middle: int = (low + high) // 2
+            name_offset, name_length, key_offset, object_offset, object_length = (
+                INDEX_ENTRY_STRUCT.unpack_from(
+                    self.index, INDEX_HEADER_STRUCT.size + middle * INDEX_ENTRY_STRUCT.size
+                )
+            )
+            name_start: int = self.names_offset + name_offset
+            name: bytes = self.index[name_start : name_start + name_length]
+
+            if name < target:
+                low = middle + 1
+            elif name > target:
+                high = middle
+            else:
+                if not is_title_key(self.data[key_offset:object_offset], title):
+                    raise ValueError(
+                        f'{self.index_file} is out of date with {self.metadata_file}.'
+                    )
+
+                return json.loads(self.data[object_offset : object_offset + object_length])
+
+        return None
+
+
+def build_metadata_index(metadata_file: str | pathlib.Path, sha256: str) -> bytes:
+    """
+    Finds the byte range of each title's JSON object in a metadata file, and packs them
+    into an index.
+
+    Args:
+        metadata_file (str | pathlib.Path): The location of the metadata file.
+
+        sha256 (str): The SHA-256 digest of the metadata file in hash.json.
+
+    Raises:
+        ValueError: The metadata file isn't a JSON object.
+
+    Returns:
+        bytes: The index.
+    """
+    data: bytes = pathlib.Path(metadata_file).read_bytes()
+    text: str = data.decode('utf-8')
+
+    decoder: json.JSONDecoder = json.JSONDecoder()
+    titles: dict[bytes, tuple[int, int, int]] = {}
+
+    # Character positions are turned into byte offsets as the text is walked, which
+    # only needs encoding when there are non-ASCII characters
+    is_ascii: bool = text.isascii()
+    byte_position: int = 0
+    character_position: int = 0
+
+    def get_byte_offset(position: int) -> int:
+        """Turns a character position in the text into a byte offset."""
+        nonlocal byte_position, character_position
+
+        if is_ascii:
+            return position
+
+        byte_position += len(text[character_position:position].encode('utf-8'))
+        character_position = position
+
+        return byte_position
+
+    def skip_whitespace(position: int) -> int:
+        """Moves past any whitespace."""
+        while position < len(text) and text[position] in JSON_WHITESPACE:
+            position += 1
+
+        return position
+
+    position: int = skip_whitespace(0)
+
+    if text[position : position + 1] != '{':
+        raise ValueError(f'{metadata_file} isn\'t a JSON object.')
+
+    position = skip_whitespace(position + 1)
+
+    if text[position : position + 1] != '}':
+        while True:
+            key_start: int = position
+
+            try:
+                name, position = decoder.raw_decode(text, position)
+                position = skip_whitespace(position)
+
+                if not isinstance(name, str) or text[position : position + 1] != ':':
+                    raise ValueError
+
+                object_start: int = skip_whitespace(position + 1)
+                _, object_end = decoder.raw_decode(text, object_start)
+            except ValueError as error:
+                raise ValueError(
+                    f'{metadata_file} has invalid JSON at character {position}.'
+                ) from error
+
+            key_offset: int = get_byte_offset(key_start)
+            object_offset: int = get_byte_offset(object_start)
+            titles[name.encode('utf-8')] = (
+                key_offset,
+                object_offset,
+                get_byte_offset(object_end) - object_offset,
+            )
+
+            position = skip_whitespace(object_end)
+            separator: str = text[position : position + 1]
+            position = skip_whitespace(position + 1)
+
+            if separator == '}':
+                break
+
+            if separator != ',':
+                raise ValueError(f'{metadata_file} has invalid JSON at character {position}.')
+
+    entries: bytearray = bytearray()
+    names: bytearray = bytearray()
+
+    for name, (key_offset, object_offset, object_length) in sorted(titles.items()):
+        entries += INDEX_ENTRY_STRUCT.pack(
+            len(names), len(name), key_offset, object_offset, object_length
+        )
+        names += name
+
+    return (
+        INDEX_HEADER_STRUCT.pack(
+            METADATA_INDEX_MAGIC,
+            METADATA_INDEX_VERSION,
+            len(titles),
+            len(data),
+            bytes.fromhex(sha256),
+        )
+        + entries
+        + names
+    )
+
+
+def get_hash_json_sha256(metadata_file: str | pathlib.Path) -> str:
+    """
+    Gets a metadata file's digest from the hash.json file next to it.
+
+    Args:
+        metadata_file (str | pathlib.Path): The location of the metadata file.
+
+    Returns:
+        str: The SHA-256 digest, or `''` if the hash.json file doesn't exist or
+        doesn't list the metadata file.
+    """
+    metadata_file = pathlib.Path(metadata_file)
+
+    try:
+        with open(metadata_file.parent.joinpath('hash.json'), encoding='utf-8') as hash_file:
+            file_hashes: dict[str, str] = json.load(hash_file)
+    except FileNotFoundError:
+        return ''
+
+    return file_hashes.get(metadata_file.name, '').lower()
+
+
+def get_index_file(metadata_folder: str | pathlib.Path, metadata_file: str) -> pathlib.Path:
+    """
+    Gets the location of a metadata file's index.
+
+    Args:
+        metadata_folder (str | pathlib.Path): The folder that contains the metadata
+            files.
+
+        metadata_file (str): The metadata file's name, like
+            `Sony - PlayStation (Redump).json`.
+
+    Returns:
+        pathlib.Path: The location of the index.
+    """
+    return pathlib.Path(metadata_folder).joinpath(
+        METADATA_INDEX_FOLDER, f'{pathlib.Path(metadata_file).stem}{METADATA_INDEX_SUFFIX}'
+    )
+
+
+def get_index_sha256(index_file: str | pathlib.Path) -> str:
+    """
+    Reads the digest of the metadata file an index was built from, without reading the
+    rest of the index.
+
+    Args:
+        index_file (str | pathlib.Path): The location of the index.
+
+    Returns:
+        str: The SHA-256 digest, or `''` if the index doesn't exist or isn't valid.
+    """
+    try:
+        with open(index_file, 'rb') as input_file:
+            header: bytes = input_file.read(INDEX_HEADER_STRUCT.size)
+    except FileNotFoundError:
+        return ''
+
+    if len(header) < INDEX_HEADER_STRUCT.size:
+        return ''
+
+    magic, version, _, _, sha256 = INDEX_HEADER_STRUCT.unpack(header)
+
+    if magic != METADATA_INDEX_MAGIC or version != METADATA_INDEX_VERSION:
+        return ''
+
+    return sha256.hex()
+
+
+def is_title_key(key: bytes, title: str) -> bool:
+    """
+    Checks the bytes before a title's JSON object are its key.
+
+    Args:
+        key (bytes): The bytes from the start of the key to the start of the object,
+            like `"Title (USA)": `.
+
+        title (str): The title name.
+
+    Returns:
+        bool: Whether the bytes are the title's key, followed by a colon.
+    """
+    key = key.rstrip(JSON_WHITESPACE.encode('ascii'))
+
+    if not key.endswith(b':'):
+        return False
+
+    try:
+        return json.loads(key[:-1]) == title
+    except ValueError:
+        return False
+
+
+def map_file(file: str | pathlib.Path) -> mmap.mmap:
+    """
+    Memory maps a file for reading.
+
+    Args:
+        file (str | pathlib.Path): The location of the file.
+
+    Raises:
+        ValueError: The file is empty.
+
+    Returns:
+        mmap.mmap: The memory mapped file.
+    """
+    with open(file, 'rb') as input_file:
+        try:
+            return mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as error:
+            raise ValueError(f'{file} is empty.') from error
+
+
+def update_metadata_indexes(metadata_folder: str | pathlib.Path) -> list[str]:
+    """
+    Rebuilds the indexes of the metadata files in a folder. Only metadata files whose
+    hash in hash.json has changed since their index was built are read again, and
+    indexes of metadata files that are no longer in hash.json are removed.
+
+    Args:
+        metadata_folder (str | pathlib.Path): The folder that contains the metadata
+            files and their hash.json file.
+
+    Returns:
+        list[str]: The metadata files whose indexes were rebuilt.
+    """
+    folder: pathlib.Path = pathlib.Path(metadata_folder)
+
+    with open(folder.joinpath('hash.json'), encoding='utf-8') as hash_file:
+        file_hashes: dict[str, str] = json.load(hash_file)
+
+    rebuilt: list[str] = []
+    index_files: set[pathlib.Path] = set()
+
+    for file_name, sha256 in sorted(file_hashes.items()):
+        index_file: pathlib.Path = get_index_file(folder, file_name)
+        index_files.add(index_file)
+
+        if get_index_sha256(index_file) == sha256.lower():
+            continue
+
+        write_bytes_atomic(index_file, build_metadata_index(folder.joinpath(file_name), sha256))
+        rebuilt.append(file_name)
+
+    for index_file in folder.joinpath(METADATA_INDEX_FOLDER).glob(f'*{METADATA_INDEX_SUFFIX}'):
+        if index_file not in index_files:
+            index_file.unlink()
+
+    return rebuilt
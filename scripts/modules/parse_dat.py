@@ -1,55 +1,169 @@
-import os
+import copy
+import io
+import itertools
+import mmap
 import pathlib
 import re
+import sys
+import types
 
 from lxml import etree
-from lxml import html as html_
-from typing import Any, Iterator
+from typing import IO, Any, Iterator, Mapping, NamedTuple
+
+LOGIQX_HEADER_FIELDS: tuple[str, ...] = (
+    'name',
+    'description',
+    'version',
+    'author',
+    'homepage',
+    'url',
+)
+
+LOGIQX_HEADER_REGEX: re.Pattern[bytes] = re.compile(
+    rb'<header(?:\s[^>]*)?>.*?</header>', flags=re.DOTALL
+)
+
+# Used by the bytes engine to scan DAT files without building XML elements
+LOGIQX_ATTRIBS: bytes = rb'(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*'
+LOGIQX_ATTRIB_REGEX: re.Pattern[bytes] = re.compile(rb'([^\s=/>]+)\s*=\s*("[^"]*"|\'[^\']*\')')
+LOGIQX_NAME_REGEX: re.Pattern[bytes] = re.compile(rb'\sname\s*=\s*("[^"]*"|\'[^\']*\')')
+LOGIQX_CHILD_REGEX: re.Pattern[bytes] = re.compile(
+    rb'<(/?)([^\s/>]+)(?:(' + LOGIQX_ATTRIBS + rb')\s*(/?)>)?'
+)
+LOGIQX_FILE_TAGS: frozenset[bytes] = frozenset({b'rom', b'disk'})
+LOGIQX_SCANNERS: dict[tuple[str, ...], tuple[re.Pattern[bytes], ...]] = {}
+
+LOGIQX_ENTITY_REGEX: re.Pattern[str] = re.compile(
+    r'&(?:#(\d+)|#x([0-9a-fA-F]+)|(lt|gt|amp|quot|apos));'
+)
+LOGIQX_UNKNOWN_ENTITY_REGEX: re.Pattern[str] = re.compile(
+    r'&(?!(?:#\d+|#x[0-9a-fA-F]+|lt|gt|amp|quot|apos);)'
+)
+
+UNRECOGNIZED_CHILDREN_XPATH: etree.XPath = etree.XPath(
+    '*[not(self::category) '
+    'and not(self::description) '
+    'and not(self::disk) '
+    'and not(self::name) '
+    'and not(self::release) '
+    'and not(self::rom)]'
+)
+
+XML_ATTRIB_WHITESPACE: dict[int, int] = str.maketrans('\t\n\r', '   ')
+XML_ENTITIES: dict[str, str] = {'lt': '<', 'gt': '>', 'amp': '&', 'quot': '"', 'apos': "'"}
+
+EMPTY_CATEGORIES: frozenset[str] = frozenset()
+EMPTY_TAG_ATTRIBS: Mapping[str, str] = types.MappingProxyType({})
+
+
+class FileRecord(NamedTuple):
+    """
+    An immutable record of a file in a title. Fields that aren't set in the DAT file are
+    left as `''`, which isn't stored per file. Digests are interned, so files that share
+    a digest across titles also share the string.
+
+    Args:
+        name (str, optional): The name of the file. Defaults to `''`.
+
+        size (str, optional): The size of the file. Defaults to `''`.
+
+        crc (str, optional): The CRC32 digest of the file. Defaults to `''`.
+
+        md5 (str, optional): The MD5 digest of the file. Defaults to `''`.
+
+        sha1 (str, optional): The SHA1 digest of the file. Defaults to `''`.
+
+        sha256 (str, optional): The SHA256 digest of the file. Defaults to `''`.
+
+        type (str, optional): Whether the file has a `rom` or `disk` tag. Defaults to
+            `''`.
+
+        mia (str, optional): The MIA status of the file. Defaults to `''`.
+
+        header (str, optional): The header of the file. Defaults to `''`.
+    """
+
+    name: str = ''
+    size: str = ''
+    crc: str = ''
+    md5: str = ''
+    sha1: str = ''
+    sha256: str = ''
+    type: str = ''
+    mia: str = ''
+    header: str = ''
+
+    @property
+    def digests(self) -> tuple[str, str, str, str]:
+        """The CRC32, MD5, SHA1, and SHA256 digests of the file."""
+        return (self.crc, self.md5, self.sha1, self.sha256)
 
 
 class TitleData:
+    __slots__ = (
+        'name',
+        'categories',
+        'description',
+        'tag_name',
+        'tag_attribs',
+        'files',
+        'unrecognized_children',
+    )
+
     def __init__(
         self,
         name: str = '',
-        categories: set[str] | None = None,
+        categories: frozenset[str] | None = None,
         description: str = '',
         tag_name: str = 'game',
-        tag_attribs: dict[str, str] | None = None,
-        files: list[dict[str, str]] | None = None,
-        unrecognized_children: list[str] | None = None,
+        tag_attribs: Mapping[str, str] | None = None,
+        files: tuple[FileRecord, ...] = (),
+        unrecognized_children: tuple[str, ...] = (),
     ) -> None:
         """
         Creates an object that contains an input DAT's titles.
 
+        Titles are equal, and hash the same, if they have the same name and file
+        digests. Don't change a title's name or files after it's been added to a set.
+
         Args:
             name (str, optional): The name of the title. Defaults to `''`.
 
-            categories (set[str], optional): The categories of the title. Defaults to
-                `None`.
+            categories (frozenset[str], optional): The categories of the title. Defaults
+                to `None`.
 
             description (str, optional): The description of the title. Defaults to `''`.
 
             tag_name (str, optional): Whether the tag around the title is set to `game`
-                or `machine`. Defaults to `''`.
+                or `machine`. Defaults to `game`.
 
-            tag_attribs (dict[str, str]): Additional unrecognized attributes set on the
-                `game` or `machine` tag. Defaults to `None`.
+            tag_attribs (Mapping[str, str]): Additional unrecognized attributes set on
+                the `game` or `machine` tag. Defaults to `None`.
 
-            files (list[dict[str, str]], optional): The files in the title. Defaults to
-                `None`.
+            files (tuple[FileRecord, ...], optional): The files in the title. Defaults to
+                `()`.
 
-            unrecognized_children (list[str]): Child elements not recognized by Retool.
-                Defaults to `None`.
+            unrecognized_children (tuple[str, ...]): Child elements not recognized by
+                Retool. Defaults to `()`.
         """
         self.name: str = name
-        self.categories: set[str] = categories if categories is not None else set()
+        self.categories: frozenset[str] = categories if categories else EMPTY_CATEGORIES
         self.description: str = description
         self.tag_name: str = tag_name
-        self.tag_attribs: dict[str, str] = tag_attribs if tag_attribs is not None else {}
-        self.files: list[dict[str, str]] = files if files is not None else []
-        self.unrecognized_children: list[str] = (
-            unrecognized_children if unrecognized_children is not None else []
-        )
+        self.tag_attribs: Mapping[str, str] = tag_attribs if tag_attribs else EMPTY_TAG_ATTRIBS
+        self.files: tuple[FileRecord, ...] = files
+        self.unrecognized_children: tuple[str, ...] = unrecognized_children
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TitleData):
+            return NotImplemented
+
+        return self.name == other.name and [x.digests for x in self.files] == [
+            x.digests for x in other.files
+        ]
+
+    def __hash__(self) -> int:
+        return hash((self.name, tuple(x.digests for x in self.files)))
 
 
 def clean_namespaces(element: etree._Element) -> etree._Element:
@@ -71,6 +185,38 @@ def clean_namespaces(element: etree._Element) -> etree._Element:
     return element
 
 
+def decode_logiqx_attrib(value: bytes) -> str:
+    """
+    Decodes a raw attribute value from a LogiqX DAT file the same way an XML parser does,
+    normalizing whitespace and expanding the predefined entities.
+
+    Args:
+        value (bytes): The raw attribute value, including its quotes.
+
+    Raises:
+        ValueError: The value isn't valid UTF-8, or has markup that needs an XML parser
+            to handle.
+
+    Returns:
+        str: The decoded attribute value.
+    """
+    text: str = value[1:-1].decode('utf-8')
+
+    if '<' in text:
+        raise ValueError('Attribute value contains <.')
+
+    if '\t' in text or '\n' in text or '\r' in text:
+        text = text.replace('\r\n', '\n').translate(XML_ATTRIB_WHITESPACE)
+
+    if '&' in text:
+        if LOGIQX_UNKNOWN_ENTITY_REGEX.search(text):
+            raise ValueError('Attribute value contains an unknown entity.')
+
+        text = LOGIQX_ENTITY_REGEX.sub(expand_xml_entity, text)
+
+    return text
+
+
 def define_lxml_parser() -> etree.XMLParser:
     """Defines the LXML parser."""
     parser = etree.XMLParser(
@@ -87,6 +233,26 @@ def define_lxml_parser() -> etree.XMLParser:
     return parser
 
 
+def expand_xml_entity(match: re.Match[str]) -> str:
+    """
+    Expands a predefined XML entity or character reference matched by
+    `LOGIQX_ENTITY_REGEX`.
+
+    Args:
+        match (re.Match[str]): The entity match.
+
+    Returns:
+        str: The expanded character.
+    """
+    if match.group(1):
+        return chr(int(match.group(1)))
+
+    if match.group(2):
+        return chr(int(match.group(2), 16))
+
+    return XML_ENTITIES[match.group(3)]
+
+
 def fast_lxml_iter(context: etree.iterparse, func: Any, *args: Any, **kwargs: Any) -> None:
     """
     Reads through XML without chewing up huge amounts of memory.
@@ -107,18 +273,28 @@ def fast_lxml_iter(context: etree.iterparse, func: Any, *args: Any, **kwargs: An
     """
     for _, element in context:
         func(element, *args, **kwargs)
-        # It's safe to call clear() here because no descendants will be accessed
-        element.clear()
-        # Also eliminate now-empty references from the root node to element
-        for ancestor in element.xpath('ancestor-or-self::*'):
-            while ancestor.getprevious() is not None:
-                del ancestor.getparent()[0]
+        prune_lxml_element(element)
     del context
 
 
+def get_logiqx_attribs(raw_attribs: bytes) -> dict[bytes, bytes]:
+    """
+    Splits the raw attributes of a LogiqX tag into a dictionary. Values are left
+    undecoded and keep their quotes, so only the ones that are needed get decoded with
+    `decode_logiqx_attrib`.
+
+    Args:
+        raw_attribs (bytes): The attributes from the tag.
+
+    Returns:
+        dict[bytes, bytes]: The attribute names and raw values.
+    """
+    return dict(LOGIQX_ATTRIB_REGEX.findall(raw_attribs))
+
+
 def get_logiqx_file_details(
     child: etree._Element, file_type: str, digest_only: bool
-) -> dict[str, str]:
+) -> FileRecord:
     """
     Gets the following file details from a LogiqX rom or disk element.
 
@@ -139,208 +315,294 @@ def get_logiqx_file_details(
         digest_only (bool): Whether to only return digests.
 
     Returns:
-        dict[str, str]: The file details.
+        FileRecord: The file details.
     """
-    if not digest_only:
-        file_name = child.attrib.get('name', '')
-        file_size = child.attrib.get('size', '')
-        file_mia = child.attrib.get('mia', '')
-        file_header = child.attrib.get('header', '')
+    attribs = child.attrib
 
-    file_crc: str = child.attrib.get('crc', '')
-    file_md5: str = child.attrib.get('md5', '')
-    file_sha1: str = child.attrib.get('sha1', '')
-    file_sha256: str = child.attrib.get('sha256', '')
+    file_crc: str = sys.intern(attribs.get('crc', ''))
+    file_md5: str = sys.intern(attribs.get('md5', ''))
+    file_sha1: str = sys.intern(attribs.get('sha1', ''))
+    file_sha256: str = sys.intern(attribs.get('sha256', ''))
 
     if digest_only:
-        file_details = {'crc': file_crc, 'md5': file_md5, 'sha1': file_sha1, 'sha256': file_sha256}
+        return FileRecord(crc=file_crc, md5=file_md5, sha1=file_sha1, sha256=file_sha256)
+
+    return FileRecord(
+        name=attribs.get('name', ''),
+        size=attribs.get('size', ''),
+        crc=file_crc,
+        md5=file_md5,
+        sha1=file_sha1,
+        sha256=file_sha256,
+        type=file_type,
+        mia=attribs.get('mia', ''),
+        header=attribs.get('header', ''),
+    )
+
+
+def get_logiqx_header(dat_file: pathlib.Path | IO[bytes]) -> dict[str, str]:
+    """
+    Gets the header details from a LogiqX DAT file. Files on disk are memory mapped, and
+    file objects like zip file members are read in chunks only until the end of the
+    header. Either way the header is found in a single scan, which is much lighter on
+    memory than parsing the whole file with lxml.
+
+    The following details are returned, set to `''` if they aren't in the header:
+
+    * name
+    * description
+    * version
+    * author
+    * homepage
+    * url
+
+    Args:
+        dat_file (pathlib.Path | IO[bytes]): A pathlib object pointing to the DAT file,
+            or a binary file object positioned at the start of the DAT file.
+
+    Raises:
+        ValueError: The file isn't a LogiqX DAT file, or doesn't have a header.
+
+    Returns:
+        dict[str, str]: The header details.
+    """
+    header: dict[str, str] = {field: '' for field in LOGIQX_HEADER_FIELDS}
+    header_match: re.Match[bytes] | None = None
+    first_line: bytes
+
+    if isinstance(dat_file, (str, pathlib.Path)):
+        dat_file_name: str = str(dat_file)
+
+        with open(pathlib.Path(dat_file), 'rb') as file:
+            first_line = file.readline()
+
+            if is_logiqx(first_line):
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as dat_map:
+                    header_match = LOGIQX_HEADER_REGEX.search(dat_map)  # type: ignore
     else:
-        file_details = {
-            'name': file_name,
-            'size': file_size,
-            'crc': file_crc,
-            'md5': file_md5,
-            'sha1': file_sha1,
-            'sha256': file_sha256,
-            'type': file_type,
-            'mia': file_mia,
-            'header': file_header,
-        }
+        dat_file_name = str(getattr(dat_file, 'name', 'The DAT file'))
+        dat_bytes: bytearray = bytearray()
+
+        # Only read as far as the end of the header
+        while chunk := dat_file.read(65536):
+            search_start: int = max(len(dat_bytes) - 8, 0)
+            dat_bytes += chunk
+
+            if dat_bytes.find(b'</header>', search_start) != -1:
+                break
+
+        first_line = bytes(dat_bytes.split(b'\n', 1)[0])
 
-    return file_details
+        if is_logiqx(first_line):
+            header_match = LOGIQX_HEADER_REGEX.search(dat_bytes)
 
+    # Basic check to make sure it's a LogiqX file
+    if not is_logiqx(first_line):
+        raise ValueError(f'{dat_file_name} isn\'t a LogiqX DAT file.')
+
+    if not header_match:
+        raise ValueError(f'{dat_file_name} doesn\'t have a LogiqX header.')
+
+    header_element: etree._Element = etree.fromstring(
+        bytes(header_match.group()), parser=define_lxml_parser()
+    )
+
+    for child in header_element.iterchildren(*LOGIQX_HEADER_FIELDS):
+        if child.text is not None:
+            header[str(child.tag)] = child.text.strip()
+
+    return header
 
-def get_logiqx_header(dat_file: pathlib.Path) -> list[str]:
+
+def get_logiqx_scanner(tag_names: tuple[str, ...]) -> tuple[re.Pattern[bytes], ...]:
     """
-    Reads in the first bytes of a LogiqX DAT file until the header is retrieved. Much
-    lighter on memory than parsing with lxml.
+    Compiles the regexes the `bytes` engine uses to find titles, and caches them.
 
     Args:
-        dat_file (pathlib.Path): A pathlib object pointing to the DAT file.
+        tag_names (tuple[str, ...]): Which tag names to search for in the DAT file.
 
     Returns:
-        list[str]: The contents of the node for processing later.
+        tuple[re.Pattern[bytes], ...]: The regexes that find the start of a title, match a
+        title's opening tag, and find a title's closing tag. The opening tag regex leaves
+        group 2 unset if the tag can't be read, and sets group 3 if it's self-closing.
     """
-    header: list[str] = []
+    if tag_names not in LOGIQX_SCANNERS:
+        tags: bytes = b'|'.join(re.escape(tag.encode('utf-8')) for tag in tag_names)
 
-    with open(pathlib.Path(dat_file), 'rb') as file:
-        pos: int = 0
+        LOGIQX_SCANNERS[tag_names] = (
+            re.compile(rb'<(?:' + tags + rb')(?=[\s/>])'),
+            re.compile(rb'<(' + tags + rb')(?=[\s/>])(?:(' + LOGIQX_ATTRIBS + rb')\s*(/?)>)?'),
+            re.compile(rb'</(' + tags + rb')\s*>'),
+        )
 
-        first_line: bytes = file.readline()
-        header_bytes: bytes = b''
+    return LOGIQX_SCANNERS[tag_names]
 
-        file.seek(0)
 
-        # Basic check to make sure it's a LogiqX file
-        if (
-            b'<?xml version' in first_line
-            or b'<!DOCTYPE datafile' in first_line
-            or b'<datafile>"' in first_line
-        ):
-            while file.read(9) != b'</header>':
-                pos += 1
-                file.seek(pos, os.SEEK_SET)
+def get_logiqx_title(element: etree._Element, ra_digest_only: bool = False) -> TitleData | None:
+    """
+    Gets a single title from a LogiqX `game` or `machine` element.
 
-            file.seek(0)
-            header_bytes = file.read(pos + 9)
+    Args:
+        element (etree._Element): The `game` or `machine` element.
 
-            header_str = header_bytes.decode('utf-8')
+        ra_digest_only (bool, optional): Only return the title name and hashes for
+            RetroAchievements. Defaults to `False`.
 
-            regex_search_index_start = re.search('\\s*?<header', header_str)
-            regex_search_index_end = re.search('\n*\\s*?</header', header_str)
+    Returns:
+        TitleData | None: The title, or `None` if the title has no files listed.
+    """
+    if element is None:
+        return None
 
-            if regex_search_index_start and regex_search_index_end:
-                header_str = header_str[
-                    regex_search_index_start.start() : regex_search_index_end.start()
-                ]
+    name: str = element.attrib.get('name', '')
+    files: list[FileRecord] = []
 
-            header = [line.replace('\r', '\n') for line in header_str.split('\n') if line != '\r'][
-                1:
-            ]
+    if not ra_digest_only:
+        # Only add the title if there's a name
+        if not name:
+            return None
 
-    return header
+        # Collect the details for each title
+        known_attribs: set[str] = {'name', 'cloneof', 'cloneofid', 'romof'}
+        collected_attribs: dict[str, str] = {}
+
+        for attrib in element.attrib:
+            if attrib not in known_attribs:
+                collected_attribs[str(attrib)] = str(element.attrib[attrib])
+
+        description: str = ''
+
+        if description_element := [x.text for x in element.iterchildren(tag='description')]:
+            description = str(description_element[0])
+
+        categories: frozenset[str] = frozenset(
+            str(x.text) for x in element.iterchildren(tag='category')
+        )
+
+        for child in element.iterchildren(tag=('rom', 'disk')):
+            file_type: str = 'rom'
+
+            if child.tag == 'disk':
+                file_type = 'disk'
+
+            file_details: FileRecord = get_logiqx_file_details(child, file_type, ra_digest_only)
+
+            # Check for at least one digest in the file
+            if file_details.name and any(file_details.digests):
+                files.append(file_details)
+
+        # Add unrecognized children found in the element
+        unrecognized_children: tuple[str, ...] = tuple(
+            serialize_lxml_element(child) for child in UNRECOGNIZED_CHILDREN_XPATH(element)
+        )
+
+        # Only return the title if it has files listed
+        if not files:
+            return None
+
+        return TitleData(
+            name=name,
+            categories=categories,
+            description=description,
+            tag_name=element.tag,
+            tag_attribs=collected_attribs,
+            files=tuple(files),
+            unrecognized_children=unrecognized_children,
+        )
+
+    ra_file_details: FileRecord | None = None
+
+    for child in element.iterchildren(tag=('rom', 'disk')):
+        if 'name' in child.attrib:
+            # Exclude CUE or GDI files, which can change digests if the file name changes
+            if not any(x in child.attrib['name'] for x in ('.cue', '.gdi')):
+                ra_file_details = get_logiqx_file_details(child, '', ra_digest_only)
+
+        # RetroAchievements only takes track 0 for multi-track games, so we only want to
+        # return one file anyway
+        if ra_file_details is not None:
+            files.append(ra_file_details)
+            break
+
+    # Only return the title if it has files listed
+    if not files:
+        return None
+
+    return TitleData(name=name, files=tuple(files))
 
 
 def get_logiqx_titles(
-    dat_file: pathlib.Path, tag_names: tuple[str, ...], ra_digest_only: bool = False
+    dat_file: pathlib.Path | IO[bytes],
+    tag_names: tuple[str, ...],
+    ra_digest_only: bool = False,
+    engine: str = 'lxml',
 ) -> set[TitleData]:
     """
     Gets the titles from a LogiqX DAT file.
 
     Args:
-        dat_file (pathlib.Path): The path to the DAT file.
+        dat_file (pathlib.Path | IO[bytes]): The path to the DAT file, or a binary file
+            object like a zip file member.
 
         tag_names (tuple[str, ...]): Which tag names to search for in the DAT file (
             usually `game` and `machine`).
 
         ra_digest_only (bool, optional): Only return the title name and hashes for
-            RetroAchievements
+            RetroAchievements. Defaults to `False`.
+
+        engine (str, optional): How to read the DAT file, either `lxml` or `bytes`. The
+            `bytes` engine scans the raw bytes of the file instead of building XML
+            elements, and is only used when `ra_digest_only` is set. See
+            `scan_logiqx_titles`. Defaults to `lxml`.
+
+    Raises:
+        ValueError: The engine isn't valid.
 
     Returns:
         set[TitleData]: A set of titles.
     """
+    return set(iter_logiqx_titles(dat_file, tag_names, ra_digest_only, engine))
+
+
+def iter_logiqx_titles(
+    dat_file: pathlib.Path | IO[bytes],
+    tag_names: tuple[str, ...],
+    ra_digest_only: bool = False,
+    engine: str = 'lxml',
+) -> Iterator[TitleData]:
+    """
+    Yields the titles from a LogiqX DAT file one at a time. Each element is freed as soon
+    as its title has been built, so memory use stays flat regardless of the size of the
+    DAT file.
+
+    With `ra_digest_only` set, the `bytes` engine can be used instead, which scans the raw
+    bytes of the file without building any elements. See `scan_logiqx_titles`.
+
+    Args:
+        dat_file (pathlib.Path | IO[bytes]): The path to the DAT file, or a binary file
+            object like a zip file member.
+
+        tag_names (tuple[str, ...]): Which tag names to search for in the DAT file (
+            usually `game` and `machine`).
+
+        ra_digest_only (bool, optional): Only return the title name and hashes for
+            RetroAchievements. Defaults to `False`.
+
+        engine (str, optional): How to read the DAT file, either `lxml` or `bytes`. The
+            `bytes` engine is only used when `ra_digest_only` is set. Defaults to `lxml`.
+
+    Raises:
+        ValueError: The engine isn't valid.
+
+    Yields:
+        Iterator[TitleData]: Each title that has files listed.
+    """
+    if engine not in ('lxml', 'bytes'):
+        raise ValueError(f'{engine} isn\'t a valid engine. Use lxml or bytes.')
 
-    titles: set[TitleData] = set()
-
-    def process_element(element: etree._Element) -> None:
-        if element is not None:
-            title: TitleData = TitleData()
-
-            if not ra_digest_only:
-                # Collect the details for each title
-                title.tag_name = element.tag
-                title.name = element.attrib.get('name', '')
-
-                # Only add the title if there's a name
-                if title.name:
-                    known_attribs: set[str] = {'name', 'cloneof', 'cloneofid', 'romof'}
-                    collected_attribs: dict[str, str] = {}
-
-                    for attrib in element.attrib:
-                        if attrib not in known_attribs:
-                            collected_attribs[str(attrib)] = str(element.attrib[attrib])
-
-                    title.tag_attribs = collected_attribs
-
-                    if description_element := [
-                        x.text for x in element.iterchildren(tag='description')
-                    ]:
-                        title.description = str(description_element[0])
-
-                    title.categories = {str(x.text) for x in element.iterchildren(tag='category')}
-
-                    files: Iterator[etree._Element] = element.iterchildren(tag=('rom', 'disk'))
-                    file_type: str
-
-                    if files:
-                        for child in files:
-                            file_type = 'rom'
-
-                            if child.tag == 'disk':
-                                file_type = 'disk'
-
-                            file_details = get_logiqx_file_details(child, file_type, ra_digest_only)
-
-                            # Check for at least one digest in the file
-                            if file_details['name'] and (
-                                file_details['crc']
-                                or file_details['md5']
-                                or file_details['sha1']
-                                or file_details['sha256']
-                            ):
-                                title.files.append(file_details)
-
-                    # Add unrecognized children found in the element
-                    unrecognized_children: list[etree._Element] = list(
-                        element.xpath(  # type: ignore
-                            '*[not(self::category) '
-                            'and not(self::description) '
-                            'and not(self::disk) '
-                            'and not(self::name) '
-                            'and not(self::release) '
-                            'and not(self::rom)]'
-                        )
-                    )
-
-                    if unrecognized_children:
-                        parser = define_lxml_parser()
-
-                        for child in unrecognized_children:
-                            child = etree.XML(html_.tostring(child), parser=parser)
-                            title.unrecognized_children.append(
-                                etree.tostring(clean_namespaces(child)).decode('utf-8')
-                            )
-            else:
-                title.name = ''
-
-                title.name = element.attrib.get('name', '')
-
-                files = element.iterchildren(tag=('rom', 'disk'))
-                file_details = {}
-
-                for child in files:
-                    if 'name' in child.attrib:
-                        # Exclude CUE or GDI files, which can change digests if the
-                        # file name changes
-                        if not any(x in child.attrib['name'] for x in ('.cue', '.gdi')):
-                            file_details = get_logiqx_file_details(child, '', ra_digest_only)
-
-                    # Check for at least one digest in the file
-                    if file_details:
-                        if (
-                            'crc' in file_details
-                            or 'md5' in file_details
-                            or 'sha1' in file_details
-                            or 'sha256' in file_details
-                        ):
-                            # RetroAchievements only takes track 0 for multi-track games, so we
-                            # only want to return one file anyway
-                            if not title.files and file_details:
-                                title.files.append(file_details)
-
-            # Add the title if it has files listed
-            if title.files:
-                titles.add(title)
+    if engine == 'bytes' and ra_digest_only:
+        yield from scan_logiqx_titles(dat_file, tag_names)
+        return
 
     context = etree.iterparse(
         source=dat_file,
@@ -357,6 +619,229 @@ def get_logiqx_titles(
         strip_cdata=True,
     )
 
-    fast_lxml_iter(context, process_element)
+    for _, element in context:
+        title: TitleData | None = get_logiqx_title(element, ra_digest_only)
+        prune_lxml_element(element)
+
+        if title is not None:
+            yield title
+
+    del context
+
+
+def is_logiqx(first_line: bytes) -> bool:
+    """
+    Does a basic check to make sure a file is a LogiqX DAT file.
+
+    Args:
+        first_line (bytes): The first line of the file.
+
+    Returns:
+        bool: Whether the file looks like a LogiqX DAT file.
+    """
+    return (
+        b'<?xml version' in first_line
+        or b'<!DOCTYPE datafile' in first_line
+        or b'<datafile' in first_line
+    )
+
+
+def prune_lxml_element(element: etree._Element) -> None:
+    """
+    Frees an element that has been processed during an iterparse, along with any
+    siblings that came before it.
+
+    Only the element and its parent's earlier children are touched, so the cost doesn't
+    grow with the depth of the tree like walking every ancestor does.
+
+    Args:
+        element (etree._Element): The element that has just been processed.
+    """
+    # It's safe to call clear() here because no descendants will be accessed
+    element.clear(keep_tail=True)
+
+    # Also eliminate now-empty references from the parent node to element
+    parent: etree._Element | None = element.getparent()
+
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def scan_logiqx_digests(
+    dat_bytes: bytes | mmap.mmap, tag_names: tuple[str, ...]
+) -> Iterator[TitleData]:
+    """
+    Gets the title names and digests for RetroAchievements from the raw bytes of a LogiqX
+    DAT file, without building any XML elements. Returns the same titles as
+    `get_logiqx_title` does with `ra_digest_only` set.
+
+    Args:
+        dat_bytes (bytes | mmap.mmap): The contents of the DAT file.
+
+        tag_names (tuple[str, ...]): Which tag names to search for in the DAT file (
+            usually `game` and `machine`).
+
+    Raises:
+        ValueError: The DAT file is malformed, or uses markup that needs an XML parser
+            to handle, like comments or CDATA sections. Titles before the malformed one
+            have already been yielded.
+
+    Yields:
+        Iterator[TitleData]: Each title that has files listed.
+    """
+    for markup in (b'<!--', b'<![CDATA[', b'<!ENTITY'):
+        if dat_bytes.find(markup) != -1:
+            raise ValueError(f'DAT file contains {markup.decode("utf-8")}.')
+
+    title_start, title_tag, title_end = get_logiqx_scanner(tag_names)
+    pos: int = 0
+
+    while tag_match := title_tag.search(dat_bytes, pos):
+        if tag_match.group(2) is None:
+            raise ValueError(f'Malformed title tag at byte {tag_match.start()}.')
+
+        # lxml stops reading at a stray closing tag
+        if stray_match := title_end.search(dat_bytes, pos, tag_match.start()):
+            raise ValueError(f'Unexpected closing tag at byte {stray_match.start()}.')
+
+        pos = tag_match.end()
+
+        # Self-closing titles have no files
+        if tag_match.group(3):
+            continue
+
+        end_match: re.Match[bytes] | None = title_end.search(dat_bytes, pos)
+
+        if (
+            not end_match
+            or end_match.group(1) != tag_match.group(1)
+            or title_start.search(dat_bytes, pos, end_match.start())
+        ):
+            raise ValueError(f'Title at byte {tag_match.start()} isn\'t closed.')
+
+        # Only files that are direct children of the title are read, the same as lxml
+        depth: int = 0
+
+        for child_match in LOGIQX_CHILD_REGEX.finditer(dat_bytes, pos, end_match.start()):
+            if child_match.group(3) is None:
+                raise ValueError(f'Malformed tag at byte {child_match.start()}.')
+
+            if child_match.group(1):
+                depth -= 1
+
+                if depth < 0:
+                    raise ValueError(f'Unexpected closing tag at byte {child_match.start()}.')
+
+                continue
+
+            if not child_match.group(4):
+                depth += 1
+
+                if depth > 1 or child_match.group(2) not in LOGIQX_FILE_TAGS:
+                    continue
+            elif depth or child_match.group(2) not in LOGIQX_FILE_TAGS:
+                continue
+
+            file_attribs: dict[bytes, bytes] = get_logiqx_attribs(child_match.group(3))
+
+            if b'name' not in file_attribs:
+                continue
+
+            # Exclude CUE or GDI files, which can change digests if the file name changes
+            file_name: str = decode_logiqx_attrib(file_attribs[b'name'])
+
+            if '.cue' in file_name or '.gdi' in file_name:
+                continue
+
+            # RetroAchievements only takes track 0 for multi-track games, so only the
+            # first file is needed
+            digests: list[str] = []
+
+            for digest_type in (b'crc', b'md5', b'sha1', b'sha256'):
+                digest: bytes = file_attribs.get(digest_type, b'""')
+
+                # Digests are almost always plain hex, which doesn't need decoding
+                if digest[1:-1].isalnum():
+                    digests.append(sys.intern(digest[1:-1].decode('ascii')))
+                else:
+                    digests.append(sys.intern(decode_logiqx_attrib(digest)))
+
+            name_match: re.Match[bytes] | None = LOGIQX_NAME_REGEX.search(tag_match.group(2))
+
+            yield TitleData(
+                name=decode_logiqx_attrib(name_match.group(1)) if name_match else '',
+                files=(FileRecord('', '', *digests),),
+            )
+            break
+
+        pos = end_match.end()
+
+
+def scan_logiqx_titles(
+    dat_file: pathlib.Path | IO[bytes], tag_names: tuple[str, ...]
+) -> Iterator[TitleData]:
+    """
+    Yields the title names and digests for RetroAchievements from a LogiqX DAT file by
+    scanning its raw bytes. Files on disk are memory mapped.
+
+    If the DAT file turns out to be malformed or uses markup the scanner doesn't handle,
+    it's read again with lxml, skipping the titles that have already been yielded.
+
+    Args:
+        dat_file (pathlib.Path | IO[bytes]): The path to the DAT file, or a binary file
+            object like a zip file member.
+
+        tag_names (tuple[str, ...]): Which tag names to search for in the DAT file (
+            usually `game` and `machine`).
+
+    Yields:
+        Iterator[TitleData]: Each title that has files listed.
+    """
+    title_count: int = 0
+    lxml_source: pathlib.Path | IO[bytes]
+
+    try:
+        if isinstance(dat_file, (str, pathlib.Path)):
+            lxml_source = pathlib.Path(dat_file)
+
+            with open(pathlib.Path(dat_file), 'rb') as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as dat_map:
+                    for title in scan_logiqx_digests(dat_map, tag_names):
+                        title_count += 1
+                        yield title
+        else:
+            dat_bytes: bytes = dat_file.read()
+            lxml_source = io.BytesIO(dat_bytes)
+
+            for title in scan_logiqx_digests(dat_bytes, tag_names):
+                title_count += 1
+                yield title
+    except ValueError:
+        yield from itertools.islice(
+            iter_logiqx_titles(lxml_source, tag_names, True), title_count, None
+        )
+
+
+def serialize_lxml_element(element: etree._Element) -> str:
+    """
+    Serializes an element to a string in a single pass, without any namespaced
+    attributes on the element, or unused namespace declarations.
+
+    Elements with no namespaces in scope are serialized as they are. Otherwise the
+    element is copied first, as declarations from its ancestors would otherwise be
+    serialized too.
+
+    Args:
+        element (etree._Element): An element from an XML file.
+
+    Returns:
+        str: The serialized element, without its tail.
+    """
+    if element.nsmap:
+        element = clean_namespaces(copy.deepcopy(element))
+    else:
+        for attr in [x for x in element.attrib if x.startswith('{')]:
+            del element.attrib[attr]
 
-    return titles
\ No newline at end of file
+    return etree.tostring(element, with_tail=False).decode('utf-8')
@@ -0,0 +1,521 @@
+import json
+import pathlib
+import sqlite3
+
+from typing import Any, Iterable
+
+from modules.clone_lists import get_short_name
+from modules.validation import DATA_FOLDERS
+
+# The default location of the exported database
+SQLITE_EXPORT_FILE: str = 'retool-data.sqlite'
+
+# Stored as the database's user_version. If the schema changes, this needs to go up, so
+# databases made with the old schema are rebuilt from scratch.
+SQLITE_SCHEMA_VERSION: int = 1
+
+# The digest columns in the files table
+DIGEST_TYPES: tuple[str, ...] = ('crc', 'md5', 'sha1', 'sha256')
+
+# The tables, in the order they're created. Every title, MIA, and RetroAchievements
+# entry is a row in `titles`, which the full text search index is built on. Each index
+# holds the columns the queries it's for return, so those queries never touch the
+# table itself.
+SQLITE_SCHEMA: tuple[str, ...] = (
+    # Systems are shared by all the folders, and named after the data file
+    '''
+    CREATE TABLE systems (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    ''',
+    # The hash.json digest of each data file when it was last exported
+    '''
+    CREATE TABLE sources (
+        folder TEXT NOT NULL,
+        file TEXT NOT NULL,
+        system_id INTEGER NOT NULL REFERENCES systems (id),
+        sha256 TEXT NOT NULL,
+        PRIMARY KEY (folder, file)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE titles (
+        id INTEGER PRIMARY KEY,
+        folder TEXT NOT NULL,
+        system_id INTEGER NOT NULL REFERENCES systems (id),
+        name TEXT NOT NULL,
+        short_name TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX titles_name ON titles (name, system_id, folder)',
+    'CREATE INDEX titles_short_name ON titles (short_name, system_id, folder)',
+    'CREATE INDEX titles_system ON titles (system_id, folder, name)',
+    '''
+    CREATE VIRTUAL TABLE titles_fts USING fts5 (
+        name, content='titles', content_rowid='id'
+    )
+    ''',
+    '''
+    CREATE TABLE metadata (
+        title_id INTEGER PRIMARY KEY REFERENCES titles (id),
+        local_name TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE languages (
+        id INTEGER PRIMARY KEY,
+        code TEXT NOT NULL UNIQUE
+    )
+    ''',
+    '''
+    CREATE TABLE title_languages (
+        title_id INTEGER NOT NULL REFERENCES titles (id),
+        language_id INTEGER NOT NULL REFERENCES languages (id),
+        PRIMARY KEY (title_id, language_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX title_languages_language ON title_languages (language_id, title_id)',
+    # The digests of MIA and RetroAchievements files, in lowercase
+    '''
+    CREATE TABLE files (
+        title_id INTEGER PRIMARY KEY REFERENCES titles (id),
+        crc TEXT,
+        md5 TEXT,
+        sha1 TEXT,
+        sha256 TEXT
+    )
+    ''',
+    *(
+        f'CREATE INDEX files_{x} ON files ({x}, title_id) WHERE {x} IS NOT NULL'
+        for x in DIGEST_TYPES
+    ),
+    '''
+    CREATE TABLE clone_groups (
+        id INTEGER PRIMARY KEY,
+        system_id INTEGER NOT NULL REFERENCES systems (id),
+        name TEXT NOT NULL,
+        categories TEXT
+    )
+    ''',
+    'CREATE INDEX clone_groups_system ON clone_groups (system_id, name)',
+    'CREATE INDEX clone_groups_name ON clone_groups (name, system_id)',
+    # Lists and objects from the clone lists are kept as JSON, for use with SQLite's
+    # JSON functions
+    '''
+    CREATE TABLE clone_entries (
+        id INTEGER PRIMARY KEY,
+        group_id INTEGER NOT NULL REFERENCES clone_groups (id),
+        kind TEXT NOT NULL,
+        search_term TEXT NOT NULL,
+        name_type TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        title_position INTEGER,
+        english_friendly INTEGER,
+        categories TEXT,
+        local_names TEXT,
+        filters TEXT
+    )
+    ''',
+    'CREATE INDEX clone_entries_group ON clone_entries (group_id, kind)',
+    'CREATE INDEX clone_entries_search_term ON clone_entries (search_term, name_type, group_id)',
+)
+
+
+def create_schema(connection: sqlite3.Connection) -> None:
+    """
+    Drops every table in a database, and creates the export's tables.
+
+    Args:
+        connection (sqlite3.Connection): The database connection.
+    """
+    tables: list[str] = [
+        x[0]
+        for x in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+            "AND name NOT LIKE 'titles_fts_%'"
+        )
+    ]
+
+    for table in tables:
+        connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+
+    for statement in SQLITE_SCHEMA:
+        connection.execute(statement)
+
+    connection.execute(f'PRAGMA user_version = {SQLITE_SCHEMA_VERSION}')
+
+
+def delete_system(connection: sqlite3.Connection, folder: str, system_id: int) -> None:
+    """
+    Deletes everything that was exported from a data file.
+
+    Args:
+        connection (sqlite3.Connection): The database connection.
+
+        folder (str): The folder the data file is in, like `metadata`.
+
+        system_id (int): The ID of the data file's system.
+    """
+    if folder == 'clonelists':
+        connection.execute(
+            'DELETE FROM clone_entries WHERE group_id IN '
+            '(SELECT id FROM clone_groups WHERE system_id = ?)',
+            (system_id,),
+        )
+        connection.execute('DELETE FROM clone_groups WHERE system_id = ?', (system_id,))
+        return
+
+    title_ids: str = 'SELECT id FROM titles WHERE system_id = ? AND folder = ?'
+
+    # External content full text search indexes need the old values to remove a row
+    connection.execute(
+        "INSERT INTO titles_fts (titles_fts, rowid, name) "
+        "SELECT 'delete', id, name FROM titles WHERE system_id = ? AND folder = ?",
+        (system_id, folder),
+    )
+
+    for table in ('metadata', 'title_languages', 'files'):
+        connection.execute(
+            f'DELETE FROM {table} WHERE title_id IN ({title_ids})', (system_id, folder)
+        )
+
+    connection.execute(
+        'DELETE FROM titles WHERE system_id = ? AND folder = ?', (system_id, folder)
+    )
+
+
+def export_folders(
+    database: str | pathlib.Path = SQLITE_EXPORT_FILE,
+    folders: Iterable[str] | None = None,
+    force: bool = False,
+) -> list[str]:
+    """
+    Exports the data files in folders to a SQLite database. Only data files whose hash
+    in their folder's hash.json file has changed since they were last exported are read
+    again. Everything is written in a single transaction, so the database is never
+    left half updated.
+
+    Args:
+        database (str | pathlib.Path, optional): The location of the database. Defaults
+            to `SQLITE_EXPORT_FILE`.
+
+        folders (Iterable[str], optional): The folders to export. Defaults to `None`,
+            which exports all of the `DATA_FOLDERS`.
+
+        force (bool, optional): Whether to rebuild the database from scratch. Defaults
+            to `False`.
+
+    Returns:
+        list[str]: The data files that were exported, like `metadata/Sony - PlayStation
+        (Redump).json`.
+    """
+    if folders is None:
+        folders = DATA_FOLDERS
+
+    exported: list[str] = []
+    connection: sqlite3.Connection = sqlite3.connect(database, isolation_level=None)
+
+    try:
+        connection.execute('PRAGMA foreign_keys = OFF')
+        connection.execute('BEGIN IMMEDIATE')
+
+        if (
+            force
+            or connection.execute('PRAGMA user_version').fetchone()[0] != SQLITE_SCHEMA_VERSION
+        ):
+            create_schema(connection)
+
+        for folder in folders:
+            folder_path: pathlib.Path = pathlib.Path(folder)
+
+            with open(folder_path.joinpath('hash.json'), encoding='utf-8') as hash_file:
+                file_hashes: dict[str, str] = json.load(hash_file)
+
+            sources: dict[str, tuple[int, str]] = {
+                file: (system_id, sha256)
+                for file, system_id, sha256 in connection.execute(
+                    'SELECT file, system_id, sha256 FROM sources WHERE folder = ?',
+                    (folder_path.name,),
+                )
+            }
+
+            # Remove the data files that have gone
+            for file in sorted(set(sources) - set(file_hashes)):
+                delete_system(connection, folder_path.name, sources[file][0])
+                connection.execute(
+                    'DELETE FROM sources WHERE folder = ? AND file = ?', (folder_path.name, file)
+                )
+
+            for file, sha256 in sorted(file_hashes.items()):
+                if file in sources and sources[file][1] == sha256.lower():
+                    continue
+
+                system_id: int = get_system_id(connection, pathlib.Path(file).stem)
+
+                if file in sources:
+                    delete_system(connection, folder_path.name, sources[file][0])
+
+                with open(folder_path.joinpath(file), encoding='utf-8') as data_file:
+                    data: dict[str, Any] = json.load(data_file)
+
+                if folder_path.name == 'clonelists':
+                    insert_clone_list(connection, system_id, data)
+                elif folder_path.name == 'metadata':
+                    insert_metadata(connection, system_id, data)
+                elif folder_path.name == 'mias':
+                    insert_files(connection, 'mias', system_id, data.get('mias', []))
+                else:
+                    insert_files(
+                        connection,
+                        folder_path.name,
+                        system_id,
+                        data.get('retroachievements', []),
+                    )
+
+                connection.execute(
+                    'INSERT OR REPLACE INTO sources (folder, file, system_id, sha256) '
+                    'VALUES (?, ?, ?, ?)',
+                    (folder_path.name, file, system_id, sha256.lower()),
+                )
+
+                exported.append(f'{folder_path.name}/{file}')
+
+        # Systems that aren't in any data file anymore
+        connection.execute(
+            'DELETE FROM systems WHERE id NOT IN (SELECT system_id FROM sources)'
+        )
+
+        connection.execute('COMMIT')
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+    finally:
+        connection.close()
+
+    return exported
+
+
+def get_json(value: Any) -> str | None:
+    """
+    Formats a value from a data file as compact JSON.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        str | None: The JSON, or `None` if there's no value.
+    """
+    if value is None:
+        return None
+
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def get_language_ids(connection: sqlite3.Connection, codes: Iterable[str]) -> dict[str, int]:
+    """
+    Gets the IDs of language codes, adding the codes that aren't in the database yet.
+
+    Args:
+        connection (sqlite3.Connection): The database connection.
+
+        codes (Iterable[str]): The language codes.
+
+    Returns:
+        dict[str, int]: Each language code, and its ID.
+    """
+    connection.executemany(
+        'INSERT OR IGNORE INTO languages (code) VALUES (?)', ((x,) for x in sorted(set(codes)))
+    )
+
+    return dict(connection.execute('SELECT code, id FROM languages'))
+
+
+def get_next_id(connection: sqlite3.Connection, table: str) -> int:
+    """
+    Gets the next free ID in a table, so rows can be bulk inserted with known IDs.
+
+    Args:
+        connection (sqlite3.Connection): The database connection.
+
+        table (str): The table.
+
+    Returns:
+        int: The ID.
+    """
+    return connection.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}').fetchone()[0]
+
+
+def get_system_id(connection: sqlite3.Connection, system: str) -> int:
+    """
+    Gets the ID of a system, adding the system if it isn't in the database yet.
+
+    Args:
+        connection (sqlite3.Connection): The database connection.
+
+        system (str): The system name, like `Sony - PlayStation (Redump)`.
+
+    Returns:
+        int: The ID.
+    """
+    connection.execute('INSERT OR IGNORE INTO systems (name) VALUES (?)', (system,))
+
+    return connection.execute('SELECT id FROM systems WHERE name = ?', (system,)).fetchone()[0]
+
+
+def insert_clone_list(
+    connection: sqlite3.Connection, system_id: int, clone_list: dict[str, Any]
+) -> None:
+    """
+    Adds the variant groups and search terms in a clone list to the database.
+
+    Args:
+        connection (sqlite3.Connection): The database connection.
+
+        system_id (int): The ID of the clone list's system.
+
+        clone_list (dict[str, Any]): The contents of the clone list.
+    """
+    group_id: int = get_next_id(connection, 'clone_groups')
+    groups: list[tuple[Any, ...]] = []
+    entries: list[tuple[Any, ...]] = []
+
+    for variant in clone_list.get('variants', []):
+        groups.append(
+            (group_id, system_id, variant['group'], get_json(variant.get('categories')))
+        )
+
+        for kind in ('titles', 'supersets', 'compilations'):
+            for title in variant.get(kind) or []:
+                entries.append(
+                    (
+                        group_id,
+                        kind,
+                        title['searchTerm'],
+                        title.get('nameType', 'short'),
+                        title.get('priority', 1),
+                        title.get('titlePosition'),
+                        title.get('englishFriendly'),
+                        get_json(title.get('categories')),
+                        get_json(title.get('localNames')),
+                        get_json(title.get('filters')),
+                    )
+                )
+
+        group_id += 1
+
+    connection.executemany(
+        'INSERT INTO clone_groups (id, system_id, name, categories) VALUES (?, ?, ?, ?)', groups
+    )
+    connection.executemany(
+        'INSERT INTO clone_entries (group_id, kind, search_term, name_type, priority, '
+        'title_position, english_friendly, categories, local_names, filters) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        entries,
+    )
+
+
+def insert_files(
+    connection: sqlite3.Connection,
+    folder: str,
+    system_id: int,
+    file_entries: list[dict[str, str]],
+) -> None:
+    """
+    Adds MIA or RetroAchievements entries and their digests to the database.
+
+    Args:
+        connection (sqlite3.Connection): The database connection.
+
+        folder (str): The folder the entries are from, either `mias` or
+            `retroachievements`.
+
+        system_id (int): The ID of the entries' system.
+
+        file_entries (list[dict[str, str]]): The entries, each with a name and at least
+            one digest.
+    """
+    title_ids: list[int] = insert_titles(
+        connection, folder, system_id, [x['name'] for x in file_entries]
+    )
+
+    connection.executemany(
+        'INSERT INTO files (title_id, crc, md5, sha1, sha256) VALUES (?, ?, ?, ?, ?)',
+        (
+            (title_id, *(entry[x].lower() if entry.get(x) else None for x in DIGEST_TYPES))
+            for title_id, entry in zip(title_ids, file_entries)
+        ),
+    )
+
+
+def insert_metadata(
+    connection: sqlite3.Connection, system_id: int, metadata: dict[str, dict[str, Any]]
+) -> None:
+    """
+    Adds the titles in a metadata file, and their languages and local names, to the
+    database.
+
+    Args:
+        connection (sqlite3.Connection): The database connection.
+
+        system_id (int): The ID of the metadata file's system.
+
+        metadata (dict[str, dict[str, Any]]): The contents of the metadata file.
+    """
+    title_ids: list[int] = insert_titles(connection, 'metadata', system_id, list(metadata))
+
+    language_ids: dict[str, int] = get_language_ids(
+        connection, (x for title in metadata.values() for x in title.get('languages', []))
+    )
+
+    connection.executemany(
+        'INSERT INTO metadata (title_id, local_name) VALUES (?, ?)',
+        (
+            (title_id, title.get('localName'))
+            for title_id, title in zip(title_ids, metadata.values())
+        ),
+    )
+    connection.executemany(
+        'INSERT OR IGNORE INTO title_languages (title_id, language_id) VALUES (?, ?)',
+        (
+            (title_id, language_ids[language])
+            for title_id, title in zip(title_ids, metadata.values())
+            for language in title.get('languages', [])
+        ),
+    )
+
+
+def insert_titles(
+    connection: sqlite3.Connection, folder: str, system_id: int, names: list[str]
+) -> list[int]:
+    """
+    Adds title names to the database, and to the full text search index.
+
+    Args:
+        connection (sqlite3.Connection): The database connection.
+
+        folder (str): The folder the titles are from, like `metadata`.
+
+        system_id (int): The ID of the titles' system.
+
+        names (list[str]): The title names.
+
+    Returns:
+        list[int]: The ID of each title, in the same order as the names.
+    """
+    first_id: int = get_next_id(connection, 'titles')
+    title_ids: list[int] = list(range(first_id, first_id + len(names)))
+
+    connection.executemany(
+        'INSERT INTO titles (id, folder, system_id, name, short_name) VALUES (?, ?, ?, ?, ?)',
+        (
+            (title_id, folder, system_id, name, get_short_name(name))
+            for title_id, name in zip(title_ids, names)
+        ),
+    )
+    connection.executemany(
+        'INSERT INTO titles_fts (rowid, name) VALUES (?, ?)', zip(title_ids, names)
+    )
+
+    return title_ids
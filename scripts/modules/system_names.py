@@ -0,0 +1,157 @@
+import functools
+import re
+
+from modules.utils import get_internal_config
+
+# The prefix and suffix RetroAchievements DAT file names and MIA list names are given
+RA_PREFIX_REGEX: re.Pattern[str] = re.compile('^RA - ')
+MIA_SUFFIX_REGEX: re.Pattern[str] = re.compile('\\s?MIAs$')
+
+# MIA list names that don't match their No-Intro or Redump system name
+MIA_SYSTEM_MAPPING: dict[str, str] = {
+    'Atari - 2600 (No-Intro)': 'Atari - Atari 2600 (No-Intro)',
+    'Atari - 5200 (No-Intro)': 'Atari - Atari 5200 (No-Intro)',
+    'Atari - 7800 (No-Intro)': 'Atari - Atari 7800 (No-Intro)',
+    'Atari - Jaguar (No-Intro)': 'Atari - Atari Jaguar (No-Intro)',
+    'Atari - Lynx (No-Intro)': 'Atari - Atari Lynx (No-Intro)',
+    'Atari - ST (No-Intro)': 'Atari - Atari ST (No-Intro)',
+}
+
+# RetroAchievements systems that aren't in No-Intro or Redump
+RA_SKIP_SYSTEMS: frozenset[str] = frozenset(
+    {
+        'Arcade',
+        'Elektor TV Games Computer',
+        'NEC PC-8801',
+        'Uzebox',
+        'WASM-4',
+    }
+)
+
+# RetroAchievements system names that don't match their No-Intro or Redump system name
+RA_SYSTEM_MAPPING: dict[str, str] = {
+    '3DO Interactive Multiplayer': 'Panasonic - 3DO Interactive Multiplayer',
+    '3DO Interactive Multiplayer (CHD)': 'Panasonic - 3DO Interactive Multiplayer (CHD)',
+    'Amstrad CPC': 'Amstrad - CPC',
+    'Apple II': 'Apple - II',
+    'Arduboy': 'Arduboy Inc - Arduboy',
+    'Atari 2600': 'Atari - Atari 2600',
+    'Atari 7800': 'Atari - Atari 7800',
+    'Atari Jaguar': 'Atari - Atari Jaguar',
+    'Atari Jaguar CD': 'Atari - Jaguar CD Interactive Multimedia System',
+    'Atari Lynx': 'Atari - Atari Lynx',
+    'Colecovision': 'Coleco - Colecovision',
+    'Emerson Arcadia 2001': 'Emerson - Arcadia 2001',
+    'Fairchild Channel F': 'Fairchild - Channel F',
+    'GCE Vectrex': 'GCE - Vectrex',
+    'Interton VC 4000': 'Interton - VC 4000',
+    'Magnavox Odyssey 2': 'Magnavox - Odyssey 2',
+    'Mattel Intellivision': 'Mattel - Intellivision',
+    'Mega Duck': 'Welback - Mega Duck',
+    'Microsoft MSX': 'Microsoft - MSX',
+    'NEC PC-FX': 'NEC - PC-FX & PC-FXGA',
+    'NEC PC-FX (CHD)': 'NEC - PC-FX & PC-FXGA (CHD)',
+    'NEC TurboGrafx-16': 'NEC - PC Engine - TurboGrafx-16',
+    'NEC TurboGrafx-CD': 'NEC - PC Engine CD & TurboGrafx CD',
+    'NEC TurboGrafx-CD (CHD)': 'NEC - PC Engine CD & TurboGrafx CD (CHD)',
+    'Nintendo 64': 'Nintendo - Nintendo 64',
+    'Nintendo DS': 'Nintendo - Nintendo DS',
+    'Nintendo DSi': 'Nintendo - Nintendo DSi',
+    'Nintendo Entertainment System': 'Nintendo - Nintendo Entertainment System',
+    'Nintendo Game Boy Advance': 'Nintendo - Game Boy Advance',
+    'Nintendo Game Boy Color': 'Nintendo - Game Boy Color',
+    'Nintendo Game Boy': 'Nintendo - Game Boy',
+    'Nintendo GameCube': 'Nintendo - GameCube',
+    'Nintendo Pokemon Mini': 'Nintendo - Pokemon Mini',
+    'Nintendo Virtual Boy': 'Nintendo - Virtual Boy',
+    'Sega 32X': 'Sega - 32X',
+    'Sega CD': 'Sega - Mega CD & Sega CD',
+    'Sega CD (CHD)': 'Sega - Mega CD & Sega CD (CHD)',
+    'Sega Dreamcast': 'Sega - Dreamcast',
+    'Sega Dreamcast (CHD)': 'Sega - Dreamcast (CHD)',
+    'Sega Game Gear': 'Sega - Game Gear',
+    'Sega Genesis': 'Sega - Mega Drive - Genesis',
+    'Sega Master System': 'Sega - Master System - Mark III',
+    'Sega Saturn': 'Sega - Saturn',
+    'Sega Saturn (CHD)': 'Sega - Saturn (CHD)',
+    'Sega SG-1000': 'Sega - SG-1000',
+    'SNK Neo Geo CD': 'SNK - Neo Geo CD',
+    'SNK Neo Geo CD (CHD)': 'SNK - Neo Geo CD (CHD)',
+    'SNK Neo Geo Pocket': 'SNK - NeoGeo Pocket',
+    'Sony Playstation 2': 'Sony - PlayStation 2',
+    'Sony Playstation': 'Sony - PlayStation',
+    'Sony PSP': 'Sony - PlayStation Portable',
+    'Super Nintendo Entertainment System': 'Nintendo - Super Nintendo Entertainment System',
+    'Watara Supervision': 'Watara - Supervision',
+    'WonderSwan': 'Bandai - WonderSwan',
+}
+
+# RetroAchievements systems that No-Intro or Redump has split into more than one system,
+# and the other system that needs a copy of the file
+RA_MERGED_SYSTEMS: dict[str, str] = {
+    'Bandai - WonderSwan': 'Bandai - WonderSwan Color',
+    'Microsoft - MSX': 'Microsoft - MSX2',
+    'NEC - PC Engine - TurboGrafx-16': 'NEC - PC Engine SuperGrafx',
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_dat_file_tags_regex() -> re.Pattern[str]:
+    """
+    Compiles the `datFileTags` in internal-config.json into a single regex that matches
+    any of them in brackets, along with the whitespace before them.
+
+    Returns:
+        re.Pattern[str]: The regex. It never matches if there are no DAT file tags.
+    """
+    dat_file_tags: list[str] = get_internal_config().get('datFileTags', [])
+
+    if not dat_file_tags:
+        return re.compile('(?!)')
+
+    return re.compile(rf'\s?\((?:{"|".join(dat_file_tags)})\)')
+
+
+@functools.lru_cache(maxsize=None)
+def normalize_mia_system_name(mia_list_name: str) -> str:
+    """
+    Rewrites the name of an MIA list to match the No-Intro or Redump system name.
+
+    Args:
+        mia_list_name (str): The MIA list filename, without its extension.
+
+    Returns:
+        str: The system name.
+    """
+    system_name: str = MIA_SUFFIX_REGEX.sub('', mia_list_name)
+    system_name = get_dat_file_tags_regex().sub('', system_name)
+
+    if system_name.startswith('No-Intro - '):
+        system_name = system_name.replace('No-Intro - ', '')
+        system_name = f'{system_name} (No-Intro)'
+
+    if system_name.startswith('Redump - '):
+        system_name = system_name.replace('Redump - ', '')
+        system_name = f'{system_name} (Redump)'
+
+    return MIA_SYSTEM_MAPPING.get(system_name, system_name)
+
+
+@functools.lru_cache(maxsize=None)
+def normalize_ra_system_name(header_name: str) -> str:
+    """
+    Rewrites the name in a RetroAchievements DAT file's header to match the No-Intro or
+    Redump system name.
+
+    Args:
+        header_name (str): The name from the DAT file's header.
+
+    Returns:
+        str: The system name, or `''` if the system isn't in No-Intro or Redump.
+    """
+    system_name: str = RA_PREFIX_REGEX.sub('', header_name if header_name else 'Unknown')
+
+    if system_name in RA_SKIP_SYSTEMS:
+        return ''
+
+    return RA_SYSTEM_MAPPING.get(system_name, system_name)
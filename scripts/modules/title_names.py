@@ -0,0 +1,134 @@
+import functools
+import re
+import sys
+
+from typing import Iterable, NamedTuple
+
+from modules.utils import eprint, get_internal_config
+
+# How many normalized titles `normalize_title` remembers
+TITLE_CACHE_SIZE: int = 65536
+
+# A leading optional whitespace character in a regex, as long as it isn't quantified
+OPTIONAL_WHITESPACE_REGEX: re.Pattern[str] = re.compile(r'^\\s\?(?![?*+{])')
+
+
+class IgnoreTagPatterns(NamedTuple):
+    """
+    The compiled `ignoreTags` and `datFileTags` from internal-config.json.
+
+    Args:
+        detector (re.Pattern[str]): A single regex that matches wherever any of the tags
+            match.
+
+        patterns (tuple[tuple[str, re.Pattern[str]], ...]): Each tag's regex, in the
+            order they're removed in. Plain string tags also have the string itself, so
+            titles that don't contain it can be skipped without running the regex.
+    """
+
+    detector: re.Pattern[str]
+    patterns: tuple[tuple[str, re.Pattern[str]], ...]
+
+
+@functools.lru_cache(maxsize=None)
+def get_ignore_tag_patterns() -> IgnoreTagPatterns:
+    """
+    Compiles the `ignoreTags` and `datFileTags` in internal-config.json.
+
+    `ignoreTags` are removed first, in order, followed by `datFileTags`. Like the regex
+    tags, plain string tags and DAT file tags are removed along with one whitespace
+    character before them.
+
+    Returns:
+        IgnoreTagPatterns: The compiled tags.
+    """
+    internal_config = get_internal_config()
+    tag_patterns: list[tuple[str, str]] = []
+
+    for tag, tag_type in internal_config.get('ignoreTags', []):
+        if tag_type == 'regex':
+            tag_patterns.append(('', tag))
+        else:
+            tag_patterns.append((tag, rf'\s?{re.escape(tag)}'))
+
+    for tag in internal_config.get('datFileTags', []):
+        tag_patterns.append(('', rf'\s?\({tag}\)'))
+
+    try:
+        patterns: tuple[tuple[str, re.Pattern[str]], ...] = tuple(
+            (literal, re.compile(pattern)) for literal, pattern in tag_patterns
+        )
+
+        # The detector only needs to know whether a tag matches somewhere, and a leading
+        # optional whitespace character doesn't change that. Without it, the tags
+        # start with a bracket, which the regex engine can search for quickly.
+        detector: re.Pattern[str] = re.compile(
+            '|'.join(
+                f'(?:{OPTIONAL_WHITESPACE_REGEX.sub("", pattern)})' for _, pattern in tag_patterns
+            )
+            or '(?!)'
+        )
+    except re.error as error:
+        eprint(f'Invalid tag in internal-config.json: {error}', level='error')
+        sys.exit(1)
+
+    return IgnoreTagPatterns(detector, patterns)
+
+
+@functools.lru_cache(maxsize=TITLE_CACHE_SIZE)
+def normalize_title(name: str) -> str:
+    """
+    Removes the `ignoreTags` and `datFileTags` in internal-config.json from a title
+    name. The result is the same as removing each tag from the name one after another,
+    but most names are only scanned once.
+
+    Args:
+        name (str): The title name.
+
+    Returns:
+        str: The title name without any ignored tags.
+    """
+    ignore_tags: IgnoreTagPatterns = get_ignore_tag_patterns()
+
+    # If none of the tags match the name, removing them one after another won't change
+    # it either
+    if not ignore_tags.detector.search(name):
+        return name
+
+    # Otherwise remove them in order, as removing one tag can change whether another
+    # matches
+    for literal, pattern in ignore_tags.patterns:
+        if literal and literal not in name:
+            continue
+
+        name = pattern.sub('', name)
+
+    return name
+
+
+def normalize_titles(names: Iterable[str]) -> list[str]:
+    """
+    Removes the `ignoreTags` and `datFileTags` in internal-config.json from many title
+    names. Each unique name is only normalized once.
+
+    Args:
+        names (Iterable[str]): The title names.
+
+    Returns:
+        list[str]: The title names without any ignored tags, in the same order.
+    """
+    normalized_names: dict[str, str] = {}
+    normalized_titles: list[str] = []
+
+    # Bypass the cache, so a large batch doesn't push out titles normalized elsewhere
+    uncached_normalize_title = normalize_title.__wrapped__
+
+    for name in names:
+        normalized_name: str | None = normalized_names.get(name)
+
+        if normalized_name is None:
+            normalized_name = normalized_names[name] = uncached_normalize_title(name)
+
+        normalized_titles.append(normalized_name)
+
+    return normalized_titles
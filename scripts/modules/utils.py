@@ -1,18 +1,318 @@
-
+import concurrent.futures
 import datetime
+import filecmp
+import functools
 import hashlib
+import http.client
+import io
 import json
 import os
 import pathlib
+import random
+import re
+import shutil
+import stat
 import sys
+import tempfile
 import textwrap
+import threading
 import time
 import urllib.parse
 import urllib.request
 
-from typing import Any
+from typing import IO, Any, Callable, Iterable, Iterator, NamedTuple
 from urllib.error import HTTPError, URLError
 
+INTERNAL_CONFIG_FILE: str = 'config/internal-config.json'
+
+# How large a downloaded archive can get before it's spooled from memory to disk
+SPOOL_MAX_SIZE: int = 256 * 1024 * 1024
+
+# How downloads are streamed and retried. The backoff doubles with each retry, up to
+# the maximum, in seconds.
+DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024
+DOWNLOAD_RETRIES: int = 5
+DOWNLOAD_BACKOFF_BASE: float = 2
+DOWNLOAD_BACKOFF_MAX: float = 60
+DOWNLOAD_TIMEOUT: float = 60
+
+# How many redirects a pooled request follows before giving up
+MAX_REDIRECTS: int = 10
+REDIRECT_CODES: frozenset[int] = frozenset({301, 302, 303, 307, 308})
+
+# Where the validators and hashes of previous downloads are stored, so unchanged files
+# don't have to be downloaded and processed again
+DOWNLOAD_CACHE_FILE: str = '.download-cache.json'
+
+# Where the sizes, modification times, and hashes of files are stored, so unchanged files
+# don't have to be hashed again. Files modified less than two seconds before being
+# hashed aren't cached, in case they change again without their modification time
+# changing.
+HASH_CACHE_FILE: str = '.hash-cache.json'
+HASH_CACHE_MIN_AGE: int = 2_000_000_000
+HASH_BUFFER_SIZE: int = 1024 * 1024
+
+CONTENT_RANGE_REGEX: re.Pattern[str] = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+# The permissions new files are created with. Temporary files are only readable by
+# their owner, so they're given these permissions before they replace a file that
+# doesn't exist yet.
+FILE_UMASK: int = os.umask(0o022)
+os.umask(FILE_UMASK)
+DEFAULT_FILE_MODE: int = 0o666 & ~FILE_UMASK
+
+# How many tasks are queued for each worker at once, so the inputs of every task don't
+# have to be held in memory at the same time
+POOL_TASKS_PER_WORKER: int = 2
+
+
+class ConnectionPool:
+    """
+    Keeps HTTP connections open between requests to the same host so they can be
+    reused, and limits how many requests can be made to each host at once. Can be
+    shared between threads.
+
+    Args:
+        host_limit (int, optional): How many requests can be made to the same host at
+            once. Defaults to `4`.
+    """
+
+    def __init__(self, host_limit: int = 4) -> None:
+        self.host_limit: int = max(host_limit, 1)
+        self.connections_opened: int = 0
+        self.requests_made: int = 0
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._host_slots: dict[tuple[str, str, int], threading.BoundedSemaphore] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def __enter__(self) -> 'ConnectionPool':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes all idle connections."""
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+
+            self._idle.clear()
+
+    def urlopen(
+        self, req: urllib.request.Request, timeout: float | None = None
+    ) -> 'PooledResponse':
+        """
+        Makes a request over a pooled connection. Like `urllib.request.urlopen`,
+        redirects are followed, and responses that aren't successful raise `HTTPError`.
+
+        Args:
+            req (urllib.request.Request): The request to make.
+
+            timeout (float, optional): The socket timeout in seconds. Defaults to
+                `None`, which never times out.
+
+        Returns:
+            PooledResponse: The response, which hands its connection back to the pool
+            when closed.
+        """
+        url: str = req.full_url
+        headers: dict[str, str] = dict(req.header_items())
+
+        for _ in range(MAX_REDIRECTS + 1):
+            url_parts: urllib.parse.SplitResult = urllib.parse.urlsplit(url)
+
+            if url_parts.scheme not in ('http', 'https'):
+                raise URLError(f'unsupported URL scheme: {url_parts.scheme}')
+
+            host_key: tuple[str, str, int] = (
+                url_parts.scheme,
+                url_parts.hostname or '',
+                url_parts.port or (443 if url_parts.scheme == 'https' else 80),
+            )
+
+            path: str = urllib.parse.urlunsplit(('', '', url_parts.path or '/', url_parts.query, ''))
+
+            with self._lock:
+                host_slot: threading.BoundedSemaphore = self._host_slots.setdefault(
+                    host_key, threading.BoundedSemaphore(self.host_limit)
+                )
+
+            host_slot.acquire()
+
+            try:
+                connection, response = self.request(host_key, path, headers, timeout)
+            except BaseException:
+                host_slot.release()
+                raise
+
+            pooled_response: PooledResponse = PooledResponse(
+                url, response, functools.partial(self.release, host_key, connection, response, host_slot)
+            )
+
+            if response.status in REDIRECT_CODES and response.headers.get('Location'):
+                with pooled_response:
+                    pooled_response.read()
+
+                url = urllib.parse.urljoin(url, response.headers['Location'])
+                continue
+
+            if not 200 <= response.status < 300:
+                with pooled_response:
+                    body: bytes = pooled_response.read()
+
+                raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+
+            return pooled_response
+
+        raise URLError(f'too many redirects: {req.full_url}')
+
+    def release(
+        self,
+        host_key: tuple[str, str, int],
+        connection: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+        host_slot: threading.BoundedSemaphore,
+    ) -> None:
+        """
+        Hands a connection back to the pool once its response is finished with. Only
+        connections whose response has been read in full can be reused.
+
+        Args:
+            host_key (tuple[str, str, int]): The scheme, host, and port of the
+                connection.
+
+            connection (http.client.HTTPConnection): The connection.
+
+            response (http.client.HTTPResponse): The response to the last request made
+                over the connection.
+
+            host_slot (threading.BoundedSemaphore): The host's concurrency limit.
+        """
+        try:
+            if response.isclosed() and not response.will_close:
+                with self._lock:
+                    self._idle.setdefault(host_key, []).append(connection)
+            else:
+                response.close()
+                connection.close()
+        finally:
+            host_slot.release()
+
+    def request(
+        self,
+        host_key: tuple[str, str, int],
+        path: str,
+        headers: dict[str, str],
+        timeout: float | None,
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Makes a single GET request, reusing an idle connection to the host if there is
+        one. If the server has since closed an idle connection, the request is made
+        again over another one.
+
+        Args:
+            host_key (tuple[str, str, int]): The scheme, host, and port to connect to.
+
+            path (str): The path and query to request.
+
+            headers (dict[str, str]): The request headers.
+
+            timeout (float | None): The socket timeout in seconds.
+
+        Returns:
+            tuple[http.client.HTTPConnection, http.client.HTTPResponse]: The connection
+            the request was made over, and the response.
+        """
+        while True:
+            reused: bool = False
+
+            with self._lock:
+                self.requests_made += 1
+                idle: list[http.client.HTTPConnection] = self._idle.get(host_key, [])
+
+                if idle:
+                    connection: http.client.HTTPConnection = idle.pop()
+                    reused = True
+                else:
+                    self.connections_opened += 1
+
+            if reused:
+                connection.timeout = timeout
+
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+            elif host_key[0] == 'https':
+                connection = http.client.HTTPSConnection(host_key[1], host_key[2], timeout=timeout)
+            else:
+                connection = http.client.HTTPConnection(host_key[1], host_key[2], timeout=timeout)
+
+            try:
+                connection.request('GET', path, headers=headers)
+                return (connection, connection.getresponse())
+            except ConnectionError:
+                connection.close()
+
+                # Idle connections might have been closed by the server in the meantime
+                if not reused:
+                    raise
+
+                with self._lock:
+                    self.requests_made -= 1
+            except BaseException:
+                connection.close()
+                raise
+
+
+class DownloadReport(NamedTuple):
+    """
+    How a download in a batch went.
+
+    Args:
+        url (str): The URL the file was downloaded from.
+
+        path (str): The location the file was written to.
+
+        result (DownloadResult): The result of the download.
+
+        seconds (float): How long the download took, including any retries.
+    """
+
+    url: str
+    path: str
+    result: 'DownloadResult'
+    seconds: float
+
+
+class DownloadResult(NamedTuple):
+    """
+    The outcome of a download.
+
+    Args:
+        failed (bool): Whether the download has failed.
+
+        sha256 (str): The SHA-256 digest of the downloaded file. Empty if the download
+            has failed.
+
+        size (int): The size of the downloaded file in bytes.
+
+        etag (str): The `ETag` the server sent for the file.
+
+        last_modified (str): The `Last-Modified` date the server sent for the file.
+
+        not_modified (bool): Whether the file is the same as the one in the download
+            cache, either because the server said so, or because it has the same hash.
+            If the server said so, nothing has been written.
+    """
+
+    failed: bool
+    sha256: str = ''
+    size: int = 0
+    etag: str = ''
+    last_modified: str = ''
+    not_modified: bool = False
+
 
 class Font:
     """Console text formatting."""
@@ -47,10 +347,102 @@ class Font:
     overwrite: str = '\033M\033[2K'
 
 
-def download(download_details: tuple[str, ...], report_download: bool = True) -> bool:
+class PooledResponse:
+    """
+    A response from a `ConnectionPool`. Its connection is handed back to the pool when
+    it's closed.
+
+    Args:
+        url (str): The URL of the response, after any redirects.
+
+        response (http.client.HTTPResponse): The response.
+
+        release (Callable[[], None]): Hands the connection back to the pool.
+    """
+
+    def __init__(self, url: str, response: http.client.HTTPResponse, release: Callable[[], None]) -> None:
+        self.url: str = url
+        self.status: int = response.status
+        self.reason: str = response.reason
+        self.headers: http.client.HTTPMessage = response.headers
+        self._response: http.client.HTTPResponse = response
+        self._release: Callable[[], None] | None = release
+
+    def __enter__(self) -> 'PooledResponse':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Hands the connection back to the pool."""
+        if self._release is not None:
+            release: Callable[[], None] = self._release
+            self._release = None
+            release()
+
+    def read(self, amt: int | None = None) -> bytes:
+        """
+        Reads the response body.
+
+        Args:
+            amt (int, optional): How many bytes to read at most. Defaults to `None`,
+                which reads the rest of the body.
+
+        Returns:
+            bytes: The data read, which is empty once the body has been read in full.
+        """
+        return self._response.read(amt)
+
+
+def copy_file_atomic(source: str | pathlib.Path, destination: str | pathlib.Path) -> None:
+    """
+    Copies a file by copying it to a temporary file next to the destination first, and
+    then replacing the destination. Readers never see a partially written file.
+
+    Args:
+        source (str | pathlib.Path): The location of the file to copy.
+
+        destination (str | pathlib.Path): The location to copy the file to.
+    """
+    destination = pathlib.Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(
+        dir=destination.parent,
+        prefix=f'.{destination.name}.',
+        suffix='.part',
+        delete=False,
+    ) as output_file:
+        pass
+
+    try:
+        shutil.copyfile(source, output_file.name)
+        replace_file(output_file.name, destination)
+    except BaseException:
+        pathlib.Path(output_file.name).unlink(missing_ok=True)
+        raise
+
+
+def download(
+    download_details: tuple[str, ...],
+    report_download: bool = True,
+    buffer: IO[bytes] | None = None,
+    cache_file: str = '',
+    pool: ConnectionPool | None = None,
+) -> DownloadResult:
     """
     Downloads a file from a given URL.
 
+    The file is streamed in chunks and hashed as it arrives. When written to disk, it's
+    downloaded to a temporary file next to its location first, which then replaces the
+    file at that location only once the download has finished. Interrupted downloads
+    are resumed where they left off if the server supports range requests, and retried
+    with exponential backoff.
+
+    If a download cache is given, the server is asked to only send the file if it has
+    changed since it was last cached.
+
     Args:
         download_details (tuple[str, ...]): A tuple of the URL to download the file from,
             and the location to write it to.
@@ -58,34 +450,186 @@ def download(download_details: tuple[str, ...], report_download: bool = True) ->
         report_download (bool): Whether to report the filename being downloaded. Defaults
             to `True`.
 
+        buffer (IO[bytes], optional): A binary file object to write the file to instead,
+            like a `tempfile.SpooledTemporaryFile`. The location in `download_details` is
+            then only used for reporting. Defaults to `None`.
+
+        cache_file (str, optional): The download cache to check the file against. To
+            update the cache after the file has been processed, use
+            `update_download_cache`. Defaults to `''`, which doesn't check the cache.
+
+        pool (ConnectionPool, optional): A pool of connections to make the requests
+            with. Defaults to `None`, which makes each request over a new connection.
+
     Returns:
-        bool: Whether the download has failed.
+        DownloadResult: Whether the download has failed, the SHA-256 digest and size of
+        the downloaded file, and whether it has changed since it was last cached.
     """
     download_url: str = download_details[0]
-    local_file_path: str = download_details[1]
+    local_file_path: pathlib.Path = pathlib.Path(download_details[1])
 
     if report_download:
         eprint(
-            f'• Downloading {Font.b}{pathlib.Path(download_details[1]).name}...{Font.be}',
+            f'• Downloading {Font.b}{local_file_path.name}...{Font.be}',
             wrap=False,
             overwrite=True,
         )
 
-    def get_file(req: urllib.request.Request) -> tuple[bytes, bool]:
-        """Error handling for downloading a file."""
-        downloaded_file: bytes = b''
-        failed: bool = False
-        retrieved: bool = False
-        retry_count: int = 0
+    url: str = f'{os.path.dirname(download_url)}/{urllib.parse.quote(os.path.basename(download_url))}'
+
+    headers: dict[str, str] = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/81.0.4044.129 Safari/537.36'
+    }
+
+    output_file: IO[bytes]
+    temp_file_path: pathlib.Path | None = None
+
+    if buffer is not None:
+        output_file = buffer
+    else:
+        local_file_path.parent.mkdir(parents=True, exist_ok=True)
+        output_file = tempfile.NamedTemporaryFile(
+            dir=local_file_path.parent,
+            prefix=f'.{local_file_path.name}.',
+            suffix='.part',
+            delete=False,
+        )
+        temp_file_path = pathlib.Path(output_file.name)
+
+    cached: dict[str, Any] = {}
+
+    if cache_file:
+        cached = get_download_cache(cache_file).get(get_download_cache_key(download_url), {})
+
+    start_position: int = output_file.tell()
+    hash_sha256 = hashlib.sha256()
+    received: int = 0
+    total_size: int | None = None
+    validator: str = ''
+    etag: str = ''
+    last_modified: str = ''
+    failed: bool = False
+    not_modified: bool = False
+    retry_count: int = 0
+
+    def restart() -> None:
+        """Discards what has been downloaded so far."""
+        nonlocal hash_sha256, received, total_size
+
+        output_file.seek(start_position)
+        output_file.truncate()
+        hash_sha256 = hashlib.sha256()
+        received = 0
+        total_size = None
+
+    def retry(message: str) -> bool:
+        """Waits before the next attempt, or reports that there are no attempts left."""
+        nonlocal retry_count
+
+        now = get_datetime()
+
+        if retry_count == DOWNLOAD_RETRIES:
+            eprint(
+                f'\n  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: {local_file_path} failed to download.\n\n',
+                level='warning',
+            )
+            return False
+
+        retry_count += 1
+
+        # Back off exponentially, with jitter so parallel downloads don't retry in step
+        delay: float = min(DOWNLOAD_BACKOFF_MAX, DOWNLOAD_BACKOFF_BASE * 2 ** (retry_count - 1))
+        delay = random.uniform(delay / 2, delay)
+
+        eprint(
+            f'\n  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: {message}',
+            level='warning',
+        )
+
+        if received:
+            eprint(
+                f'  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Resuming from byte {received} in {delay:.0f} seconds ({retry_count}/{DOWNLOAD_RETRIES})...'
+            )
+        else:
+            eprint(
+                f'  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Trying again in {delay:.0f} seconds ({retry_count}/{DOWNLOAD_RETRIES})...'
+            )
+
+        time.sleep(delay)
+        return True
+
+    try:
+        while True:
+            request_headers: dict[str, str] = dict(headers)
+
+            if received:
+                request_headers['Range'] = f'bytes={received}-'
+
+                # Only resume if the file hasn't changed on the server since
+                if validator:
+                    request_headers['If-Range'] = validator
+            elif cached:
+                if cached.get('etag'):
+                    request_headers['If-None-Match'] = cached['etag']
+
+                if cached.get('lastModified'):
+                    request_headers['If-Modified-Since'] = cached['lastModified']
+
+            req: urllib.request.Request = urllib.request.Request(url, None, request_headers)
+            received_at_start: int = received
 
-        while not retrieved:
             try:
-                with urllib.request.urlopen(req) as response:
-                    downloaded_file = response.read()
+                with (pool.urlopen if pool else urllib.request.urlopen)(
+                    req, timeout=DOWNLOAD_TIMEOUT
+                ) as response:
+                    content_range: re.Match[str] | None = CONTENT_RANGE_REGEX.match(
+                        response.headers.get('Content-Range', '')
+                    )
+
+                    if received and not (
+                        response.status == 206
+                        and content_range
+                        and int(content_range.group(1)) == received
+                    ):
+                        # The server sent the whole file instead of the rest of it
+                        restart()
+                        received_at_start = 0
+
+                    if not received:
+                        etag = response.headers.get('ETag', '')
+                        last_modified = response.headers.get('Last-Modified', '')
+
+                        if etag and not etag.startswith('W/'):
+                            validator = etag
+                        else:
+                            validator = last_modified
+
+                        if response.headers.get('Content-Length', '').isdigit():
+                            total_size = int(response.headers['Content-Length'])
+                    elif content_range and content_range.group(3).isdigit():
+                        total_size = int(content_range.group(3))
+
+                    while chunk := response.read(DOWNLOAD_CHUNK_SIZE):
+                        output_file.write(chunk)
+                        hash_sha256.update(chunk)
+                        received += len(chunk)
+
+                if total_size is not None and received < total_size:
+                    raise http.client.IncompleteRead(b'', total_size - received)
             except HTTPError as error:
                 now = get_datetime()
 
-                if error.code == 404:
+                if error.code == 304 and cached:
+                    not_modified = True
+                    break
+
+                if error.code == 416 and received:
+                    # The file on the server has shrunk, so start again
+                    restart()
+
+                    if retry(f'Couldn\'t resume the download: {error}'):
+                        continue
+                elif error.code == 404:
                     eprint(
                         f'\n  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: 404, file not found: {Font.b}{download_url}',
                         level='warning',
@@ -94,7 +638,6 @@ def download(download_details: tuple[str, ...], report_download: bool = True) ->
                         f'  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Skipping...\n',
                         level='warning',
                     )
-                    retrieved = True
                 else:
                     eprint(
                         f'\n  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Data not retrieved: {error}',
@@ -104,109 +647,139 @@ def download(download_details: tuple[str, ...], report_download: bool = True) ->
                         f'  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Skipping...\n',
                         level='warning',
                     )
-                    retrieved = True
 
                 failed = True
-            except URLError as error:
-                if retry_count == 5:
-                    break
+                break
+            except (URLError, OSError, http.client.HTTPException) as error:
+                # Don't count attempts that made progress against the retry limit
+                if received > received_at_start:
+                    retry_count = 0
 
-                retry_count += 1
-                now = get_datetime()
-                eprint(
-                    f'\n  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Something unexpected happened: {error}',
-                    level='warning',
-                )
-                eprint(
-                    f'  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Trying again in 5 seconds ({retry_count}/5)...'
-                )
-                time.sleep(5)
-            except TimeoutError as error:
-                if retry_count == 5:
-                    break
+                if isinstance(error, URLError):
+                    message: str = f'Something unexpected happened: {error}'
+                elif isinstance(error, TimeoutError):
+                    message = f'Socket timeout: {error}'
+                elif isinstance(error, http.client.IncompleteRead):
+                    message = f'Connection closed after {received} of {total_size} bytes'
+                elif isinstance(error, OSError):
+                    message = f'Socket error: {error}'
+                else:
+                    message = 'Something unexpected happened.'
 
-                retry_count += 1
-                now = get_datetime()
-                eprint(
-                    f'\n  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Socket timeout: {error}',
-                    level='warning',
-                )
-                eprint(
-                    f'  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Trying again in 5 seconds ({retry_count}/5)...'
-                )
-                time.sleep(5)
-            except OSError as error:
-                if retry_count == 5:
-                    break
+                if retry(message):
+                    continue
 
-                retry_count += 1
-                now = get_datetime()
-                eprint(
-                    f'\n  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Socket error: {error}',
-                    level='warning',
-                )
-                eprint(
-                    f'  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Trying again in 5 seconds ({retry_count}/5)...'
-                )
-                time.sleep(5)
-            except Exception:
-                if retry_count == 5:
-                    break
+                failed = True
+                break
+            else:
+                break
+    finally:
+        if temp_file_path is not None:
+            output_file.close()
 
-                retry_count += 1
-                now = get_datetime()
-                eprint(
-                    f'\n  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Something unexpected happened.',
-                    level='warning',
-                )
-                eprint(
-                    f'  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: Trying again in 5 seconds ({retry_count}/5)...'
-                )
-                time.sleep(5)
+            if failed or not_modified:
+                temp_file_path.unlink(missing_ok=True)
             else:
-                retrieved = True
+                replace_file(temp_file_path, local_file_path)
 
-        if retry_count == 5:
-            failed = True
-            now = get_datetime()
-            eprint(
-                f'\n  • [{now.strftime("%Y/%m/%d, %H:%M:%S")}]: {local_file_path} failed to download.\n\n',
-                level='warning',
-            )
+    if report_download:
+        eprint(Font.overwrite)
 
-        # Delete any zero-sized files that have been created
-        if failed:
-            failed_file: pathlib.Path = pathlib.Path(local_file_path)
+    if failed:
+        return DownloadResult(failed=True)
 
-            if failed_file.exists() and failed_file.stat().st_size == 0:
-                pathlib.Path.unlink(failed_file)
+    if not_modified:
+        return DownloadResult(
+            failed=False,
+            sha256=cached.get('sha256', ''),
+            size=cached.get('size', 0),
+            etag=cached.get('etag', ''),
+            last_modified=cached.get('lastModified', ''),
+            not_modified=True,
+        )
 
-        return (downloaded_file, failed)
+    return DownloadResult(
+        failed=False,
+        sha256=hash_sha256.hexdigest(),
+        size=received,
+        etag=etag,
+        last_modified=last_modified,
+        not_modified=bool(cached) and cached.get('sha256') == hash_sha256.hexdigest(),
+    )
 
-    headers: dict[str, str] = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/81.0.4044.129 Safari/537.36'
-    }
 
-    req: urllib.request.Request = urllib.request.Request(
-        f'{os.path.dirname(download_url)}/{urllib.parse.quote(os.path.basename(download_url))}',
-        None,
-        headers,
-    )
+def download_many(
+    download_list: Iterable[tuple[str, str]],
+    jobs: int = 8,
+    host_limit: int = 4,
+    report_download: bool = True,
+    cache_file: str = '',
+) -> list[DownloadReport]:
+    """
+    Downloads files concurrently, reusing connections to the same host.
+
+    Args:
+        download_list (Iterable[tuple[str, str]]): Tuples of the URL to download each
+            file from, and the location to write it to.
 
-    downloaded_file: tuple[bytes, bool] = get_file(req)
+        jobs (int, optional): How many files to download at once. Defaults to `8`.
 
-    file_data: bytes = downloaded_file[0]
-    failed: bool = downloaded_file[1]
+        host_limit (int, optional): How many files to download from the same host at
+            once. Defaults to `4`.
 
-    if not failed:
-        pathlib.Path(local_file_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(pathlib.Path(f'{local_file_path}').resolve(), 'wb') as output_file:
-            output_file.write(file_data)
+        report_download (bool, optional): Whether to report how long each download took
+            once they've all finished. Defaults to `True`.
+
+        cache_file (str, optional): The download cache to check the files against. See
+            `download`. Defaults to `''`, which doesn't check the cache.
+
+    Returns:
+        list[DownloadReport]: How each download went, in the same order as
+        `download_list`.
+    """
+    download_list = list(download_list)
+    start_time: float = time.perf_counter()
+
+    with ConnectionPool(host_limit) as pool:
+
+        def timed_download(download_details: tuple[str, str]) -> DownloadReport:
+            """Downloads a file, and times how long it took."""
+            download_start_time: float = time.perf_counter()
+            result: DownloadResult = download(download_details, False, None, cache_file, pool)
+
+            return DownloadReport(
+                url=download_details[0],
+                path=download_details[1],
+                result=result,
+                seconds=time.perf_counter() - download_start_time,
+            )
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            reports: list[DownloadReport] = list(executor.map(timed_download, download_list))
 
     if report_download:
-        eprint(Font.overwrite)
+        for report in reports:
+            if report.result.failed:
+                eprint(f'• {Font.b}{pathlib.Path(report.path).name}{Font.be}: failed', level='warning')
+            elif report.result.not_modified:
+                eprint(
+                    f'• {Font.b}{pathlib.Path(report.path).name}{Font.be}: not modified '
+                    f'({report.seconds:.2f}s)'
+                )
+            else:
+                eprint(
+                    f'• {Font.b}{pathlib.Path(report.path).name}{Font.be}: '
+                    f'{report.result.size / 1048576:.2f} MiB in {report.seconds:.2f}s'
+                )
+
+        eprint(
+            f'• Downloaded {len(reports)} files '
+            f'({sum(x.result.size for x in reports) / 1048576:.2f} MiB) in '
+            f'{time.perf_counter() - start_time:.2f}s, making {pool.requests_made} requests '
+            f'over {pool.connections_opened} connections.'
+        )
 
-    return failed
+    return reports
 
 
 def eprint(
@@ -288,37 +861,474 @@ def get_datetime() -> datetime.datetime:
         .astimezone(tz=None)
     )
 
-def update_hash(file_list: list[str], relative_filepath: str) -> None:
-    """ Generates sha256 hashes for all files and stores them in hash.json """
 
-    hash_file_contents: list[str] = []
+def get_download_cache(cache_file: str) -> dict[str, dict[str, Any]]:
+    """
+    Reads the download cache.
+
+    Args:
+        cache_file (str): The location of the download cache.
+
+    Returns:
+        dict[str, dict[str, Any]]: The cached validators and hashes, keyed by
+        `get_download_cache_key`. Empty if the cache doesn't exist or can't be read.
+    """
+    try:
+        with open(cache_file, encoding='utf-8') as input_file:
+            cache: dict[str, dict[str, Any]] = json.load(input_file)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict):
+        return {}
+
+    return cache
+
+
+def get_download_cache_key(download_url: str) -> str:
+    """
+    Gets the key a URL is stored under in the download cache. The URL is hashed, as it
+    might be a secret that shouldn't be committed.
+
+    Args:
+        download_url (str): The URL of the download.
+
+    Returns:
+        str: The SHA-256 digest of the URL.
+    """
+    return hashlib.sha256(download_url.encode('utf-8')).hexdigest()
+
+
+def get_file_hashes(
+    file_list: list[str], cache_file: str = HASH_CACHE_FILE, jobs: int | None = None
+) -> dict[str, str]:
+    """
+    Gets the SHA-256 hashes of files. Files are only hashed again if their size or
+    modification time has changed since they were last hashed, and are otherwise read
+    from the hash cache.
+
+    Args:
+        file_list (list[str]): The files to hash.
 
-    hash_file_contents.append('{\n')
+        cache_file (str, optional): The location of the hash cache. Defaults to
+            `HASH_CACHE_FILE`.
+
+        jobs (int, optional): How many files to hash at once. Defaults to `None`, which
+            uses a thread for each CPU.
+
+    Returns:
+        dict[str, str]: Each file as it was passed in, and its SHA-256 hash.
+    """
+    hash_cache: dict[str, list[Any]] = get_hash_cache(cache_file)
+    file_hashes: dict[str, str] = {}
+    file_stats: dict[str, os.stat_result] = {}
+    stale_files: list[str] = []
 
     for file in file_list:
-        hash_sha256 = hashlib.sha256()
-        with open(file, 'rb') as file_to_hash:
-            for chunk in iter(lambda: file_to_hash.read(4096), b''):
-                hash_sha256.update(chunk)
+        cache_key: str = str(pathlib.Path(file).resolve())
+        file_stat: os.stat_result = os.stat(file)
+        cached: list[Any] | None = hash_cache.get(cache_key)
 
-        if file != file_list[-1]:
-            hash_file_contents.append(f'\t"{pathlib.Path(file).name}": "{hash_sha256.hexdigest()}",\n')
+        if cached and cached[0] == file_stat.st_size and cached[1] == file_stat.st_mtime_ns:
+            file_hashes[file] = cached[2]
         else:
-            hash_file_contents.append(f'\t"{pathlib.Path(file).name}": "{hash_sha256.hexdigest()}"\n')
+            stale_files.append(file)
+            file_stats[cache_key] = file_stat
+
+    if not stale_files:
+        return file_hashes
+
+    # hashlib releases the GIL while hashing large buffers, so threads are enough
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        for file, sha256 in zip(stale_files, executor.map(hash_file, stale_files)):
+            cache_key = str(pathlib.Path(file).resolve())
+            file_hashes[file] = sha256
+
+            # Files modified this recently might be modified again without their
+            # modification time changing, so don't trust them next time
+            if time.time_ns() - file_stats[cache_key].st_mtime_ns > HASH_CACHE_MIN_AGE:
+                hash_cache[cache_key] = [
+                    file_stats[cache_key].st_size,
+                    file_stats[cache_key].st_mtime_ns,
+                    sha256,
+                ]
+
+    # Drop files that no longer exist from the cache
+    hash_cache = {key: value for key, value in hash_cache.items() if pathlib.Path(key).exists()}
 
-    hash_file_contents.append('}\n')
+    write_file_atomic(cache_file, json.dumps(hash_cache, indent='\t', sort_keys=True) + '\n')
 
-    validate_json(''.join(hash_file_contents), file)
+    return file_hashes
 
-    with open (pathlib.Path(relative_filepath), 'w', newline='\n') as hash_file:
-        hash_file.writelines(''.join(hash_file_contents))
 
+def get_hash_cache(cache_file: str) -> dict[str, list[Any]]:
+    """
+    Reads the hash cache.
+
+    Args:
+        cache_file (str): The location of the hash cache.
+
+    Returns:
+        dict[str, list[Any]]: The size, modification time in nanoseconds, and SHA-256
+        digest of each file when it was last hashed, keyed by its absolute path. Empty
+        if the cache doesn't exist or can't be read.
+    """
+    try:
+        with open(cache_file, encoding='utf-8') as input_file:
+            cache: dict[str, list[Any]] = json.load(input_file)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict):
+        return {}
+
+    return cache
+
+
+@functools.lru_cache(maxsize=None)
+def get_internal_config(config_file: str = INTERNAL_CONFIG_FILE) -> dict[str, Any]:
+    """
+    Reads internal-config.json. The file is only read once, so the result shouldn't be
+    modified.
+
+    Args:
+        config_file (str, optional): The location of internal-config.json. Defaults to
+            `INTERNAL_CONFIG_FILE`.
+
+    Returns:
+        dict[str, Any]: The contents of internal-config.json.
+    """
+    try:
+        with open(config_file, encoding='utf-8') as input_file:
+            config_file_content: dict[str, Any] = json.load(input_file)
+    except Exception:
+        eprint('Couldn\'t read internal-config.json', level='error')
+        sys.exit(1)
+
+    return config_file_content
+
+
+def hash_file(file: str | pathlib.Path | IO[bytes]) -> str:
+    """
+    Gets the SHA-256 digest of a file.
+
+    Args:
+        file (str | pathlib.Path | IO[bytes]): The location of the file, or a binary
+            file object like a zip file member, which is read from its current position.
+
+    Returns:
+        str: The SHA-256 digest of the file.
+    """
+    hash_sha256 = hashlib.sha256()
+
+    if not isinstance(file, (str, pathlib.Path)):
+        for chunk in iter(lambda: file.read(HASH_BUFFER_SIZE), b''):
+            hash_sha256.update(chunk)
+
+        return hash_sha256.hexdigest()
+
+    with open(file, 'rb') as file_to_hash:
+        for chunk in iter(lambda: file_to_hash.read(HASH_BUFFER_SIZE), b''):
+            hash_sha256.update(chunk)
+
+    return hash_sha256.hexdigest()
+
+
+def iter_bounded_results(
+    executor: concurrent.futures.Executor,
+    func: Callable[..., Any],
+    arguments: Iterable[tuple[Any, ...]],
+    max_pending: int,
+) -> Iterator[Any]:
+    """
+    Runs a function in an executor for each set of arguments, with only a limited
+    number of calls queued or running at once. The arguments are only consumed as
+    earlier calls finish, so a generator that reads each input as it's needed keeps
+    memory use bounded.
+
+    Args:
+        executor (concurrent.futures.Executor): The executor to run the calls in.
+
+        func (Callable[..., Any]): The function to call.
+
+        arguments (Iterable[tuple[Any, ...]]): The arguments of each call.
+
+        max_pending (int): How many calls can be queued or running at once.
+
+    Yields:
+        Iterator[Any]: The result of each call, in the order they finish. If a call
+        raises an exception, it's raised here.
+    """
+    pending: set[concurrent.futures.Future[Any]] = set()
+
+    for call_arguments in arguments:
+        if len(pending) >= max(max_pending, 1):
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            for future in done:
+                yield future.result()
+
+        pending.add(executor.submit(func, *call_arguments))
+
+    for future in concurrent.futures.as_completed(pending):
+        yield future.result()
+
+
+def make_staging_folder(local_path: str | pathlib.Path) -> tempfile.TemporaryDirectory[str]:
+    """
+    Creates a temporary staging folder next to a folder, to write new files to before
+    moving them into the folder with `sync_staged_files`.
+
+    Args:
+        local_path (str | pathlib.Path): The folder the staged files are for.
+
+    Returns:
+        tempfile.TemporaryDirectory[str]: The staging folder, which is deleted along with
+        anything left in it when it's cleaned up, or used as a context manager.
+    """
+    local_path = pathlib.Path(local_path)
+
+    return tempfile.TemporaryDirectory(
+        dir=local_path.parent, prefix=f'.{local_path.name}.', suffix='.staging'
+    )
+
+
+def replace_file(temp_file: str | pathlib.Path, file_path: str | pathlib.Path) -> None:
+    """
+    Replaces a file with a temporary file in one step. The temporary file is given the
+    permissions of the file it replaces, or the default permissions for new files if
+    there isn't one, instead of the owner-only permissions temporary files are created
+    with.
+
+    Args:
+        temp_file (str | pathlib.Path): The location of the temporary file.
+
+        file_path (str | pathlib.Path): The location of the file to replace.
+    """
+    try:
+        file_mode: int = stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        file_mode = DEFAULT_FILE_MODE
+
+    os.chmod(temp_file, file_mode)
+    os.replace(temp_file, file_path)
+
+
+def sync_staged_files(
+    staging_path: str | pathlib.Path, local_path: str | pathlib.Path, keep: Iterable[str] = ()
+) -> tuple[list[str], list[str]]:
+    """
+    Moves files from a staging folder into a folder, only replacing files whose content
+    has changed, and removes files from the folder that aren't in the staging folder.
+    Unchanged files are left as they are, so their modification times don't change and
+    they don't need to be hashed again. Each file is replaced in one step.
+
+    Args:
+        staging_path (str | pathlib.Path): The staging folder.
+
+        local_path (str | pathlib.Path): The folder to move the files into.
+
+        keep (Iterable[str], optional): The names of files in the folder to keep, even
+            though they aren't in the staging folder. Hidden files are always kept.
+            Defaults to `()`.
+
+    Returns:
+        tuple[list[str], list[str]]: The names of the files that were added or changed,
+        and the names of the files that were removed.
+    """
+    local_path = pathlib.Path(local_path)
+    local_path.mkdir(parents=True, exist_ok=True)
+
+    keep = set(keep)
+    staged_files: set[str] = set()
+    changed_files: list[str] = []
+    removed_files: list[str] = []
+
+    for staged_file in sorted(pathlib.Path(staging_path).iterdir()):
+        if not staged_file.is_file():
+            continue
+
+        staged_files.add(staged_file.name)
+        local_file: pathlib.Path = local_path.joinpath(staged_file.name)
+
+        if local_file.is_file() and filecmp.cmp(staged_file, local_file, shallow=False):
+            continue
+
+        replace_file(staged_file, local_file)
+        changed_files.append(staged_file.name)
+
+    for local_file in sorted(local_path.iterdir()):
+        if (
+            local_file.is_file()
+            and local_file.name not in staged_files
+            and local_file.name not in keep
+            and not local_file.name.startswith('.')
+        ):
+            local_file.unlink()
+            removed_files.append(local_file.name)
+
+    return (changed_files, removed_files)
+
+
+def update_download_cache(cache_file: str, download_url: str, result: DownloadResult) -> None:
+    """
+    Stores the validators and hash of a download in the download cache. Only call this
+    once the downloaded file has been processed, so a failed run isn't skipped next
+    time.
+
+    Args:
+        cache_file (str): The location of the download cache.
+
+        download_url (str): The URL of the download.
+
+        result (DownloadResult): The result of downloading the file.
+    """
+    if result.failed:
+        return
+
+    cache: dict[str, dict[str, Any]] = get_download_cache(cache_file)
+
+    entry: dict[str, Any] = {
+        'etag': result.etag,
+        'lastModified': result.last_modified,
+        'sha256': result.sha256,
+        'size': result.size,
+    }
+
+    cache_key: str = get_download_cache_key(download_url)
+
+    if cache.get(cache_key) == entry:
+        return
+
+    cache[cache_key] = entry
+
+    write_file_atomic(cache_file, json.dumps(cache, indent='\t', sort_keys=True) + '\n')
+
+
+def update_hash(
+    file_list: list[str],
+    relative_filepath: str,
+    cache_file: str = HASH_CACHE_FILE,
+    jobs: int | None = None,
+) -> None:
+    """
+    Generates SHA-256 hashes for all files and stores them in a hash.json file, sorted
+    case-insensitively by filename.
+
+    Files are only hashed again if their size or modification time has changed since
+    they were last hashed, and are otherwise read from the hash cache.
+
+    Args:
+        file_list (list[str]): The files to hash. The hash.json file itself is skipped
+            if it's in the list.
+
+        relative_filepath (str): Where to write the hash.json file.
+
+        cache_file (str, optional): The location of the hash cache. Defaults to
+            `HASH_CACHE_FILE`.
+
+        jobs (int, optional): How many files to hash at once. Defaults to `None`, which
+            uses a thread for each CPU.
+    """
+    hash_file_path: pathlib.Path = pathlib.Path(relative_filepath)
+
+    file_hashes: dict[str, str] = {
+        pathlib.Path(file).name: sha256
+        for file, sha256 in get_file_hashes(
+            [
+                x
+                for x in file_list
+                if pathlib.Path(x).resolve() != hash_file_path.resolve()
+            ],
+            cache_file,
+            jobs,
+        ).items()
+    }
+
+    # Sorted case-insensitively, the same as the hash.json files maintained by hand
+    hash_file_contents: str = (
+        json.dumps(
+            dict(sorted(file_hashes.items(), key=lambda x: (x[0].lower(), x[0]))),
+            indent='\t',
+            ensure_ascii=False,
+        )
+        + '\n'
+    )
+
+    write_file_atomic(hash_file_path, hash_file_contents)
+
+
+def write_bytes_atomic(file_path: str | pathlib.Path, content: bytes) -> None:
+    """
+    Writes a binary file, by writing to a temporary file next to it first, and then
+    replacing the file. Readers never see a partially written file.
+
+    Args:
+        file_path (str | pathlib.Path): The location of the file.
+
+        content (bytes): What to write to the file.
+    """
+    file_path = pathlib.Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(
+        dir=file_path.parent,
+        prefix=f'.{file_path.name}.',
+        suffix='.part',
+        delete=False,
+    ) as output_file:
+        try:
+            output_file.write(content)
+        except BaseException:
+            output_file.close()
+            pathlib.Path(output_file.name).unlink(missing_ok=True)
+            raise
+
+    try:
+        replace_file(output_file.name, file_path)
+    except BaseException:
+        pathlib.Path(output_file.name).unlink(missing_ok=True)
+        raise
+
+
+def write_file_atomic(file_path: str | pathlib.Path, content: str | Iterable[str]) -> None:
+    """
+    Writes a UTF-8 text file with LF line endings, by writing to a temporary file next
+    to it first, and then replacing the file. Readers never see a partially written
+    file.
+
+    Args:
+        file_path (str | pathlib.Path): The location of the file.
+
+        content (str | Iterable[str]): What to write to the file. Can be an iterable of
+            chunks, which are written as they're produced.
+    """
+    file_path = pathlib.Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(
+        'w',
+        dir=file_path.parent,
+        prefix=f'.{file_path.name}.',
+        suffix='.part',
+        encoding='utf-8',
+        newline='\n',
+        delete=False,
+    ) as output_file:
+        try:
+            if isinstance(content, str):
+                output_file.write(content)
+            else:
+                output_file.writelines(content)
+        except BaseException:
+            output_file.close()
+            pathlib.Path(output_file.name).unlink(missing_ok=True)
+            raise
 
-def validate_json(jsonData: Any, file: str) -> bool:
-    """ Makes sure input JSON is valid """
     try:
-        json.loads(jsonData)
-    except ValueError:
-        print(f'\n* {Font.error}JSON is invalid in {file}, check the script is still operating as intended.{Font.end}')
-        sys.exit()
-    return True
+        replace_file(output_file.name, file_path)
+    except BaseException:
+        pathlib.Path(output_file.name).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,477 @@
+import concurrent.futures
+import hashlib
+import json
+import pathlib
+import re
+
+from typing import Any, Callable
+
+from modules.clone_lists import NAME_TYPES
+from modules.utils import HASH_CACHE_FILE, get_file_hashes, write_file_atomic
+
+# Where the results of previous validations are stored, by the SHA-256 of each file
+VALIDATION_CACHE_FILE: str = '.validation-cache.json'
+
+# Files are validated again whenever the schemas or checks in this module change
+VALIDATION_VERSION: str = hashlib.sha256(pathlib.Path(__file__).read_bytes()).hexdigest()
+
+# The folders that are validated. Each has a schema of the same name in `SCHEMAS`.
+DATA_FOLDERS: tuple[str, ...] = ('clonelists', 'metadata', 'mias', 'retroachievements')
+
+# The length of each digest type, in hex characters
+DIGEST_LENGTHS: dict[str, int] = {'crc': 8, 'md5': 32, 'sha1': 40, 'sha256': 64}
+
+HEX_REGEX: re.Pattern[str] = re.compile(r'[0-9a-fA-F]+')
+
+# The validation of each file is independent, so the pool only pays off with enough files
+MIN_POOL_FILES: int = 8
+
+
+def hex_digest(digest_type: str, leading_zeros: bool = True) -> Callable[[Any], str]:
+    """
+    Makes a schema check for a hex digest. Some DATs use uppercase digests, so both cases
+    are allowed.
+
+    Args:
+        digest_type (str): The digest type, like `crc` or `sha1`.
+
+        leading_zeros (bool, optional): Whether the digest keeps its leading zeros. If
+            not, shorter digests are allowed too. Defaults to `True`.
+
+    Returns:
+        Callable[[Any], str]: The check, which returns an error message, or an empty
+        string if the digest is valid.
+    """
+    length: int = DIGEST_LENGTHS[digest_type]
+    min_length: int = length if leading_zeros else 1
+
+    def check(value: Any) -> str:
+        if (
+            not isinstance(value, str)
+            or not min_length <= len(value) <= length
+            or not HEX_REGEX.fullmatch(value)
+        ):
+            if leading_zeros:
+                return f'expected a {length} character hex {digest_type} digest'
+
+            return f'expected a hex {digest_type} digest of up to {length} characters'
+
+        return ''
+
+    return check
+
+
+def name_type(value: Any) -> str:
+    """
+    A schema check for a search term's `nameType`.
+
+    Args:
+        value (Any): The value to check.
+
+    Returns:
+        str: An error message, or an empty string if the value is valid.
+    """
+    if value not in NAME_TYPES:
+        return f'expected one of {", ".join(sorted(NAME_TYPES))}'
+
+    return ''
+
+
+def non_empty_string(value: Any) -> str:
+    """
+    A schema check for a string that isn't empty.
+
+    Args:
+        value (Any): The value to check.
+
+    Returns:
+        str: An error message, or an empty string if the value is valid.
+    """
+    if not isinstance(value, str) or not value:
+        return 'expected a non-empty string'
+
+    return ''
+
+
+# Schemas are written as follows:
+#
+# * A type: the value must be an instance of it.
+# * A dict: the value must be an object. Keys starting with `?` are optional, the `*` key
+#   matches any other key, and keys that aren't in the schema aren't allowed.
+# * A list with one item: the value must be an array, with each item matching it.
+# * A function: returns an error message if the value is invalid.
+FILTER_SCHEMA: dict[str, Any] = {
+    'conditions': {
+        '?matchLanguages': [non_empty_string],
+        '?matchRegions': [non_empty_string],
+        '?matchString': non_empty_string,
+        '?regionOrder': {
+            'higherRegions': [non_empty_string],
+            'lowerRegions': [non_empty_string],
+        },
+    },
+    'results': {
+        '?categories': [non_empty_string],
+        '?englishFriendly': bool,
+        '?group': non_empty_string,
+        '?localNames': {'*': non_empty_string},
+        '?priority': int,
+        '?superset': bool,
+    },
+}
+
+SEARCH_TERM_SCHEMA: dict[str, Any] = {
+    'searchTerm': non_empty_string,
+    '?categories': [non_empty_string],
+    '?englishFriendly': bool,
+    '?filters': [FILTER_SCHEMA],
+    '?localNames': {'*': non_empty_string},
+    '?nameType': name_type,
+    '?priority': int,
+}
+
+SCHEMAS: dict[str, Any] = {
+    'clonelists': {
+        'description': {
+            'name': non_empty_string,
+            'lastUpdated': non_empty_string,
+            'minimumVersion': non_empty_string,
+        },
+        'variants': [
+            {
+                'group': non_empty_string,
+                '?categories': [non_empty_string],
+                '?compilations': [{**SEARCH_TERM_SCHEMA, '?titlePosition': int}],
+                '?supersets': [SEARCH_TERM_SCHEMA],
+                '?titles': [SEARCH_TERM_SCHEMA],
+            }
+        ],
+    },
+    'metadata': {
+        '*': {
+            'languages': [non_empty_string],
+            '?localName': non_empty_string,
+        }
+    },
+    'mias': {
+        'mias': [
+            {
+                'name': non_empty_string,
+                'crc': hex_digest('crc'),
+            }
+        ]
+    },
+    # Some RetroAchievements DATs drop the leading zeros of CRCs, and the files are
+    # written as the DATs ship them
+    'retroachievements': {
+        'retroachievements': [
+            {
+                'name': non_empty_string,
+                '?crc': hex_digest('crc', leading_zeros=False),
+                '?md5': hex_digest('md5'),
+                '?sha1': hex_digest('sha1'),
+                '?sha256': hex_digest('sha256'),
+            }
+        ]
+    },
+}
+
+
+def check_clone_list(clone_list: dict[str, Any]) -> list[str]:
+    """
+    Checks the parts of a clone list that its schema can't, like whether its regexes
+    compile.
+
+    Args:
+        clone_list (dict[str, Any]): The contents of the clone list.
+
+    Returns:
+        list[str]: The errors that were found.
+    """
+    errors: list[str] = []
+
+    for variant_index, variant in enumerate(clone_list.get('variants', [])):
+        if not isinstance(variant, dict):
+            continue
+
+        for kind in ('titles', 'supersets', 'compilations'):
+            for title_index, title in enumerate(variant.get(kind) or []):
+                if not isinstance(title, dict):
+                    continue
+
+                path: str = f'variants[{variant_index}].{kind}[{title_index}]'
+                regexes: list[tuple[str, Any]] = []
+
+                if title.get('nameType') == 'regex':
+                    regexes.append((f'{path}.searchTerm', title.get('searchTerm')))
+
+                for filter_index, title_filter in enumerate(title.get('filters') or []):
+                    if isinstance(title_filter, dict) and isinstance(
+                        title_filter.get('conditions'), dict
+                    ):
+                        regexes.append(
+                            (
+                                f'{path}.filters[{filter_index}].conditions.matchString',
+                                title_filter['conditions'].get('matchString'),
+                            )
+                        )
+
+                for regex_path, regex in regexes:
+                    if not isinstance(regex, str):
+                        continue
+
+                    try:
+                        re.compile(regex)
+                    except re.error as error:
+                        errors.append(f'{regex_path}: invalid regex, {error}')
+
+    return errors
+
+
+def check_schema(value: Any, schema: Any, path: str, errors: list[str]) -> None:
+    """
+    Checks a value against a schema, and adds any errors that are found to a list.
+
+    Args:
+        value (Any): The value to check.
+
+        schema (Any): The schema. See `SCHEMAS` for the format.
+
+        path (str): Where the value is in the file, for error messages.
+
+        errors (list[str]): The list to add errors to.
+    """
+    location: str = path or '(root)'
+
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            errors.append(f'{location}: expected an object')
+            return
+
+        for key in schema:
+            if key == '*' or key.startswith('?'):
+                continue
+
+            if key not in value:
+                errors.append(f'{location}: missing required key "{key}"')
+
+        for key, item in value.items():
+            item_path: str = f'{path}.{key}' if path else key
+
+            if key in schema:
+                check_schema(item, schema[key], item_path, errors)
+            elif f'?{key}' in schema:
+                check_schema(item, schema[f'?{key}'], item_path, errors)
+            elif '*' in schema:
+                check_schema(item, schema['*'], f'{path}["{key}"]' if path else key, errors)
+            else:
+                errors.append(f'{location}: unexpected key "{key}"')
+    elif isinstance(schema, list):
+        if not isinstance(value, list):
+            errors.append(f'{location}: expected an array')
+            return
+
+        for index, item in enumerate(value):
+            check_schema(item, schema[0], f'{path}[{index}]', errors)
+    elif isinstance(schema, type):
+        # bool is a subclass of int, but isn't a valid int in these files
+        if not isinstance(value, schema) or (schema is int and isinstance(value, bool)):
+            errors.append(f'{location}: expected {schema.__name__}')
+    elif error := schema(value):
+        errors.append(f'{location}: {error}')
+
+
+def get_validation_cache(cache_file: str) -> dict[str, list[Any]]:
+    """
+    Reads the validation cache, which stores the errors found in each file, along with
+    the SHA-256 hash the file had when it was validated.
+
+    Args:
+        cache_file (str): The location of the validation cache.
+
+    Returns:
+        dict[str, list[Any]]: Each file, and a list of its SHA-256 hash and errors.
+        Empty if the cache doesn't exist, can't be read, or was made by a different
+        version of this module.
+    """
+    try:
+        with open(cache_file, encoding='utf-8') as cache:
+            contents: dict[str, Any] = json.load(cache)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(contents, dict) or contents.get('version') != VALIDATION_VERSION:
+        return {}
+
+    files: Any = contents.get('files')
+
+    return files if isinstance(files, dict) else {}
+
+
+def validate_contents(json_data: str, folder_type: str) -> list[str]:
+    """
+    Validates the contents of a data file against the schema for its folder, like a
+    file a script is about to write.
+
+    Args:
+        json_data (str): The JSON contents of the file.
+
+        folder_type (str): The kind of folder the file is for, like `mias`.
+
+    Returns:
+        list[str]: The errors that were found.
+    """
+    try:
+        contents: Any = json.loads(json_data)
+    except ValueError as error:
+        return [f'invalid JSON, {error}']
+
+    errors: list[str] = []
+
+    check_schema(contents, SCHEMAS[folder_type], '', errors)
+
+    if folder_type == 'clonelists' and isinstance(contents, dict):
+        errors.extend(check_clone_list(contents))
+
+    return errors
+
+
+def validate_file(file: str, folder_type: str) -> list[str]:
+    """
+    Validates a data file against the schema for its folder.
+
+    Args:
+        file (str): The location of the file.
+
+        folder_type (str): The kind of folder the file is in, like `clonelists`.
+
+    Returns:
+        list[str]: The errors that were found.
+    """
+    try:
+        with open(file, encoding='utf-8') as data_file:
+            json_data: str = data_file.read()
+    except ValueError as error:
+        return [f'invalid JSON, {error}']
+
+    return validate_contents(json_data, folder_type)
+
+
+def validate_folders(
+    folders: dict[str, str] | None = None,
+    cache_file: str = VALIDATION_CACHE_FILE,
+    hash_cache_file: str = HASH_CACHE_FILE,
+    jobs: int | None = None,
+) -> dict[str, list[str]]:
+    """
+    Validates every data file, and checks that each folder's hash.json file is up to
+    date. Files that haven't changed since they were last validated aren't validated
+    again, and the others are validated in parallel.
+
+    Args:
+        folders (dict[str, str], optional): Each folder to validate, and the kind of
+            folder it is, like `clonelists`. Defaults to `None`, which validates
+            `DATA_FOLDERS`.
+
+        cache_file (str, optional): The location of the validation cache. Defaults to
+            `VALIDATION_CACHE_FILE`.
+
+        hash_cache_file (str, optional): The location of the hash cache. Defaults to
+            `HASH_CACHE_FILE`.
+
+        jobs (int, optional): How many processes to validate files with. Defaults to
+            `None`, which uses a process for each CPU.
+
+    Returns:
+        dict[str, list[str]]: Each file that has errors, and its errors, sorted by file.
+    """
+    if folders is None:
+        folders = {x: x for x in DATA_FOLDERS}
+
+    errors: dict[str, list[str]] = {}
+    data_files: dict[str, str] = {}
+    stored_hashes: dict[str, str] = {}
+
+    for folder, folder_type in folders.items():
+        hash_file: str = str(pathlib.Path(folder).joinpath('hash.json'))
+        folder_files: list[str] = sorted(
+            str(x) for x in pathlib.Path(folder).glob('*.json') if x.name != 'hash.json'
+        )
+
+        data_files.update({x: folder_type for x in folder_files})
+
+        try:
+            with open(hash_file, encoding='utf-8') as hash_json:
+                folder_hashes: dict[str, str] = json.load(hash_json)
+        except FileNotFoundError:
+            errors[hash_file] = ['missing']
+            continue
+        except ValueError as error:
+            errors[hash_file] = [f'invalid JSON, {error}']
+            continue
+
+        file_names: dict[str, str] = {pathlib.Path(x).name: x for x in folder_files}
+
+        for file_name, sha256 in folder_hashes.items():
+            if file_name in file_names:
+                stored_hashes[file_names[file_name]] = sha256
+            else:
+                errors.setdefault(hash_file, []).append(
+                    f'lists "{file_name}", which doesn\'t exist'
+                )
+
+        for file_name in sorted(set(file_names) - set(folder_hashes)):
+            errors.setdefault(hash_file, []).append(f'doesn\'t list "{file_name}"')
+
+    file_hashes: dict[str, str] = get_file_hashes(list(data_files), hash_cache_file)
+
+    for file, sha256 in file_hashes.items():
+        if file in stored_hashes and stored_hashes[file] != sha256:
+            hash_file = str(pathlib.Path(file).parent.joinpath('hash.json'))
+
+            errors.setdefault(hash_file, []).append(
+                f'has an out of date hash for "{pathlib.Path(file).name}"'
+            )
+
+    # Reuse the results of files that haven't changed since they were last validated
+    validation_cache: dict[str, list[Any]] = get_validation_cache(cache_file)
+    new_cache: dict[str, list[Any]] = {}
+    stale_files: list[str] = []
+
+    for file, sha256 in file_hashes.items():
+        cached: list[Any] | None = validation_cache.get(file)
+
+        if cached and cached[0] == sha256:
+            new_cache[file] = cached
+        else:
+            stale_files.append(file)
+
+    if stale_files:
+        stale_types: list[str] = [data_files[x] for x in stale_files]
+
+        if len(stale_files) < MIN_POOL_FILES:
+            results: list[list[str]] = list(map(validate_file, stale_files, stale_types))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(validate_file, stale_files, stale_types))
+
+        for file, file_errors in zip(stale_files, results):
+            new_cache[file] = [file_hashes[file], file_errors]
+
+    for file, (_, file_errors) in new_cache.items():
+        if file_errors:
+            errors.setdefault(file, []).extend(file_errors)
+
+    if new_cache != validation_cache:
+        write_file_atomic(
+            cache_file,
+            json.dumps(
+                {'version': VALIDATION_VERSION, 'files': new_cache},
+                indent='\t',
+                ensure_ascii=False,
+                sort_keys=True,
+            )
+            + '\n',
+        )
+
+    return dict(sorted(errors.items()))
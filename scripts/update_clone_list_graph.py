@@ -0,0 +1,27 @@
+from modules.clone_list_graph import CLONE_LIST_GRAPH_FILE, update_clone_list_graphs
+from update_hash import parse_folder_args, update_derived_files
+
+
+def main(folder: str, jobs: int | None) -> None:
+    update_derived_files(folder, f'{CLONE_LIST_GRAPH_FILE} file', rebuild_graphs, jobs)
+
+
+def rebuild_graphs(folder: str) -> str:
+    """
+    Rebuilds the graph of each clone list whose hash has changed.
+
+    Args:
+        folder (str): The folder that contains the clone lists.
+
+    Returns:
+        str: How many graphs were rebuilt.
+    """
+    return f'rebuilt {len(update_clone_list_graphs(folder))} clone list graphs'
+
+
+if __name__ == '__main__':
+    args = parse_folder_args(
+        'Rebuilds the superset and compilation graphs of the clone lists.', 'clonelists'
+    )
+
+    main(args.folder, args.jobs)
@@ -0,0 +1,171 @@
+import argparse
+import json
+import pathlib
+
+from typing import Callable
+
+from modules.utils import eprint, get_file_hashes, update_hash
+
+
+def add_jobs_argument(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the `--jobs` option of the scripts that bring hash.json files up to date.
+
+    Args:
+        parser (argparse.ArgumentParser): The script's argument parser.
+    """
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=None,
+        help='How many files to hash at once. Defaults to the CPU count.',
+    )
+
+
+def check_folder_hashes(folders: list[str], jobs: int | None = None) -> list[str]:
+    """
+    Checks that the hash.json file in each folder matches the data files, without
+    writing to it. Only files that have changed since they were last hashed are hashed
+    again.
+
+    Args:
+        folders (list[str]): The folders to check the hash.json file in.
+
+        jobs (int, optional): How many files to hash at once. Defaults to `None`, which
+            uses a thread for each CPU.
+
+    Returns:
+        list[str]: What's out of date in each hash.json file, or an empty list if they're
+        all up to date.
+    """
+    errors: list[str] = []
+
+    for folder in folders:
+        hash_file: pathlib.Path = pathlib.Path(folder).joinpath('hash.json')
+        files: list[str] = sorted(
+            str(x) for x in pathlib.Path(folder).glob('*.json') if x.name != 'hash.json'
+        )
+
+        try:
+            with open(hash_file, encoding='utf-8') as hash_json:
+                stored_hashes: dict[str, str] = json.load(hash_json)
+        except FileNotFoundError:
+            errors.append(f'{hash_file} is missing')
+            continue
+        except ValueError as error:
+            errors.append(f'{hash_file} is invalid JSON, {error}')
+            continue
+
+        file_hashes: dict[str, str] = {
+            pathlib.Path(file).name: sha256
+            for file, sha256 in get_file_hashes(files, jobs=jobs).items()
+        }
+
+        for file_name in sorted(set(stored_hashes) | set(file_hashes), key=str.lower):
+            if file_name not in file_hashes:
+                errors.append(f'{hash_file} lists "{file_name}", which doesn\'t exist')
+            elif file_name not in stored_hashes:
+                errors.append(f'{hash_file} doesn\'t list "{file_name}"')
+            elif stored_hashes[file_name] != file_hashes[file_name]:
+                errors.append(f'{hash_file} has an out of date hash for "{file_name}"')
+
+    return errors
+
+
+def main(folders: list[str], jobs: int | None) -> None:
+    update_folder_hashes(folders, jobs)
+
+
+def parse_folder_args(description: str, default_folder: str) -> argparse.Namespace:
+    """
+    Parses the arguments of a script that rebuilds files derived from the data files in
+    a folder with `update_derived_files`.
+
+    Args:
+        description (str): What the script does.
+
+        default_folder (str): The folder to use if one isn't given.
+
+    Returns:
+        argparse.Namespace: The `folder` and `jobs` arguments.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        'folder',
+        nargs='?',
+        default=default_folder,
+        help=f'The folder that contains the data files. Defaults to {default_folder}.',
+    )
+    add_jobs_argument(parser)
+
+    return parser.parse_args()
+
+
+def update_derived_files(
+    folder: str, derived_files: str, rebuild: Callable[[str], str], jobs: int | None = None
+) -> None:
+    """
+    Brings the hash.json file in a folder up to date, and then rebuilds the files
+    derived from the folder's data files. The rebuild function compares the data files
+    with hash.json to find the ones that changed, so hash.json has to be current first.
+
+    Args:
+        folder (str): The folder that contains the data files.
+
+        derived_files (str): What's rebuilt, for the progress messages, like
+            `index files`.
+
+        rebuild (Callable[[str], str]): The function that rebuilds the derived files.
+            It's passed the folder, and returns a summary of what it did, like
+            `rebuilt 3 indexes`, or `''`.
+
+        jobs (int, optional): How many files to hash at once. Defaults to `None`, which
+            uses a thread for each CPU.
+    """
+    update_folder_hashes([folder], jobs)
+
+    eprint(f'• Writing {folder} {derived_files}...')
+
+    summary: str = rebuild(folder)
+
+    eprint(
+        f'• Writing {folder} {derived_files}... done{f", {summary}" if summary else ""}.',
+        overwrite=True,
+    )
+
+
+def update_folder_hashes(folders: list[str], jobs: int | None = None) -> None:
+    """
+    Regenerates the hash.json file in each folder. Only files that have changed since
+    they were last hashed are hashed again.
+
+    Args:
+        folders (list[str]): The folders to update the hash.json file in.
+
+        jobs (int, optional): How many files to hash at once. Defaults to `None`, which
+            uses a thread for each CPU.
+    """
+    for folder in folders:
+        eprint(f'• Writing {folder} hash.json file...')
+
+        files = list(
+            str(x) for x in pathlib.Path(folder).glob('*.json') if x.name != 'hash.json'
+        )
+
+        update_hash(files, str(pathlib.Path(folder).joinpath('hash.json')), jobs=jobs)
+
+        eprint(f'• Writing {folder} hash.json file... done.', overwrite=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Regenerates hash.json files.')
+    parser.add_argument(
+        'folders',
+        nargs='*',
+        default=['clonelists', 'metadata'],
+        help='The folders to update the hash.json file in. Defaults to clonelists and metadata.',
+    )
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+
+    main(args.folders, args.jobs)
@@ -0,0 +1,27 @@
+from modules.metadata_bundle import METADATA_BUNDLE_FILE, update_metadata_bundle
+from update_hash import parse_folder_args, update_derived_files
+
+
+def main(folder: str, jobs: int | None) -> None:
+    update_derived_files(folder, f'{METADATA_BUNDLE_FILE} file', rebuild_bundle, jobs)
+
+
+def rebuild_bundle(folder: str) -> str:
+    """
+    Packs the metadata files into a bundle, if they've changed since it was last built.
+
+    Args:
+        folder (str): The folder that contains the metadata files.
+
+    Returns:
+        str: `''` if the bundle was written, otherwise that there were no changes.
+    """
+    return '' if update_metadata_bundle(folder) else 'no changes'
+
+
+if __name__ == '__main__':
+    args = parse_folder_args(
+        'Packs the metadata files into a single memory mappable bundle.', 'metadata'
+    )
+
+    main(args.folder, args.jobs)
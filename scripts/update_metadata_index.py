@@ -0,0 +1,25 @@
+from modules.metadata_index import update_metadata_indexes
+from update_hash import parse_folder_args, update_derived_files
+
+
+def main(folder: str, jobs: int | None) -> None:
+    update_derived_files(folder, 'index files', rebuild_indexes, jobs)
+
+
+def rebuild_indexes(folder: str) -> str:
+    """
+    Rebuilds the index of each metadata file whose hash has changed.
+
+    Args:
+        folder (str): The folder that contains the metadata files.
+
+    Returns:
+        str: How many indexes were rebuilt.
+    """
+    return f'rebuilt {len(update_metadata_indexes(folder))} indexes'
+
+
+if __name__ == '__main__':
+    args = parse_folder_args('Rebuilds the byte offset index of each metadata file.', 'metadata')
+
+    main(args.folder, args.jobs)
@@ -0,0 +1,74 @@
+import argparse
+import sys
+
+from modules.utils import Font, eprint
+from modules.validation import DATA_FOLDERS, validate_folders
+
+
+def main(folders: list[str], jobs: int | None) -> None:
+    validate(folders, jobs)
+
+
+def validate(folders: list[str], jobs: int | None = None) -> None:
+    """
+    Validates the data files in each folder, and reports every error that's found.
+    Exits with an error code if there are any.
+
+    Args:
+        folders (list[str]): The folders to validate. Each must be one of
+            `DATA_FOLDERS`.
+
+        jobs (int, optional): How many processes to validate files with. Defaults to
+            `None`, which uses a process for each CPU.
+    """
+    eprint('• Validating data files...')
+
+    errors: dict[str, list[str]] = validate_folders({x: x for x in folders}, jobs=jobs)
+
+    if not errors:
+        eprint('• Validating data files... done.', overwrite=True)
+        return
+
+    eprint('• Validating data files... failed.', overwrite=True)
+
+    error_count: int = 0
+
+    for file, file_errors in errors.items():
+        eprint(f'\n{Font.b}{file}{Font.end}')
+
+        for error in file_errors:
+            eprint(f'  * {error}')
+            error_count += 1
+
+    eprint(
+        f'\n{Font.error}Found {error_count} errors in {len(errors)} files.{Font.end}',
+        level='error',
+    )
+
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Validates the clone list, metadata, MIA, and RetroAchievements files.'
+    )
+    parser.add_argument(
+        'folders',
+        nargs='*',
+        help='The folders to validate. Defaults to all of them.',
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=None,
+        help='How many files to validate at once. Defaults to the CPU count.',
+    )
+    args = parser.parse_args()
+
+    if unknown_folders := [x for x in args.folders if x not in DATA_FOLDERS]:
+        parser.error(
+            f'unknown folders: {", ".join(unknown_folders)}. Choose from '
+            f'{", ".join(DATA_FOLDERS)}.'
+        )
+
+    main(args.folders or list(DATA_FOLDERS), args.jobs)
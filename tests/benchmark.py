@@ -0,0 +1,311 @@
+"""
+Benchmarks the optimized code in the scripts against the straightforward versions in
+`naive.py`. Run from anywhere with `python tests/benchmark.py <benchmark>`.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+from typing import Any, Callable
+
+# The scripts' modules, and the config and data files they read, are found relative to
+# the root of the repository
+REPO_ROOT: pathlib.Path = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT.joinpath('scripts')))
+os.chdir(REPO_ROOT)
+
+import naive  # noqa: E402
+
+from get_mia import get_mia_json, write_mia_system  # noqa: E402
+from modules.clone_lists import CloneListMatcher  # noqa: E402
+from modules.languages import (  # noqa: E402
+    get_tag_details,
+    get_tags_details,
+    get_titles_languages,
+)
+from modules.system_names import (  # noqa: E402
+    normalize_mia_system_name,
+    normalize_ra_system_name,
+)
+from modules.title_names import normalize_title, normalize_titles  # noqa: E402
+from modules.utils import get_internal_config  # noqa: E402
+
+
+def benchmark_clone_lists(count: int, naive_count: int) -> None:
+    """
+    Benchmarks matching each system's metadata titles to its clone list, for the
+    clone lists with the most search terms.
+
+    Args:
+        count (int): How many clone lists to benchmark.
+
+        naive_count (int): How many titles of each system to run the naive scan on, as
+            it compares every title to every search term.
+    """
+    internal_config: dict[str, Any] = get_internal_config()
+    clone_lists: list[tuple[int, str, dict[str, Any]]] = []
+
+    for clone_list_file in REPO_ROOT.joinpath('clonelists').glob('*.json'):
+        metadata_file: pathlib.Path = REPO_ROOT.joinpath('metadata', clone_list_file.name)
+
+        if clone_list_file.name == 'hash.json' or not metadata_file.is_file():
+            continue
+
+        with open(clone_list_file, encoding='utf-8') as input_file:
+            clone_list: dict[str, Any] = json.load(input_file)
+
+        term_count: int = sum(len(x.get('titles', [])) for x in clone_list.get('variants', []))
+        clone_lists.append((term_count, clone_list_file.stem, clone_list))
+
+    for term_count, system, clone_list in sorted(clone_lists, reverse=True)[:count]:
+        with open(REPO_ROOT.joinpath('metadata', f'{system}.json'), encoding='utf-8') as input_file:
+            titles: list[str] = list(json.load(input_file))
+
+        naive_titles: list[str] = titles[:naive_count]
+
+        print(f'{system}: {len(titles):,} titles, {term_count:,} search terms')
+
+        report(
+            f'  Naive scan, {len(naive_titles):,} titles',
+            lambda: [naive.match_clone_list(clone_list, x, internal_config) for x in naive_titles],
+            repeat=1,
+        )
+        matcher: CloneListMatcher = report('  Compile', CloneListMatcher, clone_list)
+        report(f'  match_titles, {len(naive_titles):,} titles', matcher.match_titles, naive_titles)
+        report(f'  match_titles, {len(titles):,} titles', matcher.match_titles, titles)
+
+
+def benchmark_languages(naive_count: int) -> None:
+    """
+    Benchmarks working out the languages of every title name in the metadata files.
+
+    Args:
+        naive_count (int): How many titles to check each tag of on their own.
+    """
+    internal_config: dict[str, Any] = get_internal_config()
+    titles: list[str] = naive.get_metadata_titles()
+    naive_titles: list[str] = titles[:: max(len(titles) // max(naive_count, 1), 1)]
+
+    def get_titles_languages_uncached(names: list[str]) -> dict[str, tuple[str, ...]]:
+        get_tag_details.cache_clear()
+        get_tags_details.cache_clear()
+
+        return get_titles_languages(names)
+
+    report(
+        f'Tag by tag, {len(naive_titles):,} titles',
+        lambda: [naive.get_title_languages(x, internal_config) for x in naive_titles],
+        repeat=1,
+    )
+    report(
+        f'get_titles_languages, {len(naive_titles):,} titles', get_titles_languages, naive_titles
+    )
+    report(f'get_titles_languages, {len(titles):,} titles', get_titles_languages, titles)
+    report(
+        f'get_titles_languages uncached, {len(titles):,} titles',
+        get_titles_languages_uncached,
+        titles,
+    )
+
+
+def benchmark_mia(count: int, naive_count: int) -> None:
+    """
+    Benchmarks writing a system's MIA JSON file.
+
+    Args:
+        count (int): How many titles the system has.
+
+        naive_count (int): How many titles to run the old writer on, as it's quadratic.
+    """
+    mia_files: list[dict[str, str]] = naive.generate_mia_files(count)
+    naive_mia_files: list[dict[str, str]] = naive.generate_mia_files(naive_count)
+
+    report(f'Old writer, {naive_count:,} titles', naive.get_mia_json, naive_mia_files, repeat=1)
+    report(f'get_mia_json, {naive_count:,} titles', get_mia_json, naive_mia_files)
+    report(f'get_mia_json, {count:,} titles', get_mia_json, mia_files)
+
+    with tempfile.TemporaryDirectory() as temp_path:
+        report(
+            f'write_mia_system, {count:,} titles',
+            write_mia_system,
+            'Test System',
+            mia_files,
+            temp_path,
+        )
+
+
+def benchmark_system_names(repeat: int) -> None:
+    """
+    Benchmarks normalizing MIA list names and RetroAchievements system names.
+
+    Args:
+        repeat (int): How many times each name is normalized, as names repeat between
+            runs.
+    """
+    dat_file_tags: list[str] = get_internal_config()['datFileTags']
+    mia_list_names: list[str] = naive.generate_mia_list_names() * repeat
+    header_names: list[str] = naive.generate_ra_header_names() * repeat
+
+    def normalize_mia_system_names() -> list[str]:
+        normalize_mia_system_name.cache_clear()
+
+        return [normalize_mia_system_name(x) for x in mia_list_names]
+
+    def normalize_ra_system_names() -> list[str]:
+        normalize_ra_system_name.cache_clear()
+
+        return [normalize_ra_system_name(x) for x in header_names]
+
+    report(
+        f'Old MIA normalization, {len(mia_list_names):,} names',
+        lambda: [naive.normalize_mia_system_name(x, dat_file_tags) for x in mia_list_names],
+    )
+    report(f'normalize_mia_system_name, {len(mia_list_names):,} names', normalize_mia_system_names)
+    report(
+        f'Old RA normalization, {len(header_names):,} names',
+        lambda: [naive.normalize_ra_system_name(x) for x in header_names],
+    )
+    report(f'normalize_ra_system_name, {len(header_names):,} names', normalize_ra_system_names)
+
+
+def benchmark_title_names(naive_count: int) -> None:
+    """
+    Benchmarks removing ignored tags from every title name in the metadata files.
+
+    Args:
+        naive_count (int): How many titles to run the naive substitution on, as it
+            takes a long time.
+    """
+    internal_config: dict[str, Any] = get_internal_config()
+    titles: list[str] = naive.get_metadata_titles()
+    naive_titles: list[str] = titles[:: max(len(titles) // max(naive_count, 1), 1)]
+
+    def normalize_titles_uncached(names: list[str]) -> list[str]:
+        normalize_title.cache_clear()
+
+        return [normalize_title(x) for x in names]
+
+    report(
+        f'Sequential substitution, {len(naive_titles):,} titles',
+        lambda: [
+            naive.normalize_title(
+                x, internal_config['ignoreTags'], internal_config['datFileTags']
+            )
+            for x in naive_titles
+        ],
+        repeat=1,
+    )
+    report(f'normalize_titles, {len(naive_titles):,} titles', normalize_titles, naive_titles)
+    report(f'normalize_titles, {len(titles):,} titles', normalize_titles, titles)
+    report(f'normalize_title, {len(titles):,} titles', normalize_titles_uncached, titles)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    benchmarks = parser.add_subparsers(dest='benchmark', required=True)
+
+    clone_lists_parser = benchmarks.add_parser(
+        'clone-lists', help='Matching titles to clone lists.'
+    )
+    clone_lists_parser.add_argument(
+        '--count',
+        type=int,
+        default=4,
+        help='How many of the largest clone lists to benchmark. Defaults to 4.',
+    )
+    clone_lists_parser.add_argument(
+        '--naive-count',
+        type=int,
+        default=2_000,
+        help='How many titles of each system to run the naive scan on. Defaults to 2,000.',
+    )
+
+    languages_parser = benchmarks.add_parser(
+        'languages', help='Working out the languages of titles from their tags.'
+    )
+    languages_parser.add_argument(
+        '--naive-count',
+        type=int,
+        default=20_000,
+        help='How many titles to check each tag of on their own. Defaults to 20,000.',
+    )
+
+    mia_parser = benchmarks.add_parser('mia', help='Writing MIA JSON files.')
+    mia_parser.add_argument('--count', type=int, default=50_000, help='Defaults to 50,000.')
+    mia_parser.add_argument(
+        '--naive-count',
+        type=int,
+        default=2_000,
+        help='How many titles to run the old writer on. Defaults to 2,000.',
+    )
+
+    system_names_parser = benchmarks.add_parser(
+        'system-names', help='Normalizing MIA and RetroAchievements system names.'
+    )
+    system_names_parser.add_argument(
+        '--repeat',
+        type=int,
+        default=10,
+        help='How many times each name is normalized. Defaults to 10.',
+    )
+
+    title_names_parser = benchmarks.add_parser(
+        'title-names', help='Removing ignored tags from title names.'
+    )
+    title_names_parser.add_argument(
+        '--naive-count',
+        type=int,
+        default=20_000,
+        help='How many titles to run the naive substitution on. Defaults to 20,000.',
+    )
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'clone-lists':
+        benchmark_clone_lists(args.count, args.naive_count)
+    elif args.benchmark == 'languages':
+        benchmark_languages(args.naive_count)
+    elif args.benchmark == 'mia':
+        benchmark_mia(args.count, args.naive_count)
+    elif args.benchmark == 'system-names':
+        benchmark_system_names(args.repeat)
+    elif args.benchmark == 'title-names':
+        benchmark_title_names(args.naive_count)
+
+
+def report(label: str, func: Callable[..., Any], *args: Any, repeat: int = 5) -> Any:
+    """
+    Times a function, and prints the fastest of several runs.
+
+    Args:
+        label (str): What's being timed.
+
+        func (Callable[..., Any]): The function to time.
+
+        *args (Any): The arguments to call the function with.
+
+        repeat (int, optional): How many times to run the function. Defaults to `5`.
+
+    Returns:
+        Any: What the function returned.
+    """
+    best: float = float('inf')
+    result: Any = None
+
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+
+    print(f'{label}: {best * 1000:,.1f} ms')
+
+    return result
+
+
+if __name__ == '__main__':
+    main()
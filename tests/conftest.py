@@ -0,0 +1,14 @@
+import pathlib
+
+import pytest
+
+# The scripts read their config and data files relative to the root of the repository
+REPO_ROOT: pathlib.Path = pathlib.Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    """Runs each test from the root of the repository."""
+    monkeypatch.chdir(REPO_ROOT)
+
+    return REPO_ROOT
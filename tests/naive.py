@@ -0,0 +1,587 @@
+"""
+Straightforward versions of the optimized code in the scripts, written the way the
+scripts used to work, and sample data to run them on. The tests check the optimized
+code gives the same results, and the benchmarks compare their speed.
+"""
+
+import json
+import pathlib
+import random
+import re
+
+from typing import Any
+
+# Plain names, and names with characters that need escaping in JSON
+SAMPLE_MIA_NAMES: tuple[str, ...] = (
+    'Title (USA)',
+    'Title (Europe) (En,Fr,De)',
+    'Titre & Compagnie (France)',
+    'Tītle - Ünicode (Japan)',
+    'Title\\Path (USA)',
+)
+
+# The RetroAchievements systems get_ra.update_ra used to skip, and rename
+RA_SKIP_SYSTEMS: list[str] = [
+    'Arcade',
+    'Elektor TV Games Computer',
+    'NEC PC-8801',
+    'Uzebox',
+    'WASM-4',
+]
+
+RA_SYSTEM_MAPPING: dict[str, str] = {
+        '3DO Interactive Multiplayer': 'Panasonic - 3DO Interactive Multiplayer',
+        '3DO Interactive Multiplayer (CHD)': 'Panasonic - 3DO Interactive Multiplayer (CHD)',
+        'Amstrad CPC': 'Amstrad - CPC',
+        'Apple II': 'Apple - II',
+        'Arduboy': 'Arduboy Inc - Arduboy',
+        'Atari 2600': 'Atari - Atari 2600',
+        'Atari 7800': 'Atari - Atari 7800',
+        'Atari Jaguar': 'Atari - Atari Jaguar',
+        'Atari Jaguar CD': 'Atari - Jaguar CD Interactive Multimedia System',
+        'Atari Lynx': 'Atari - Atari Lynx',
+        'Colecovision': 'Coleco - Colecovision',
+        'Emerson Arcadia 2001': 'Emerson - Arcadia 2001',
+        'Fairchild Channel F': 'Fairchild - Channel F',
+        'GCE Vectrex': 'GCE - Vectrex',
+        'Interton VC 4000': 'Interton - VC 4000',
+        'Magnavox Odyssey 2': 'Magnavox - Odyssey 2',
+        'Mattel Intellivision': 'Mattel - Intellivision',
+        'Mega Duck': 'Welback - Mega Duck',
+        'Microsoft MSX': 'Microsoft - MSX',
+        'NEC PC-FX': 'NEC - PC-FX & PC-FXGA',
+        'NEC PC-FX (CHD)': 'NEC - PC-FX & PC-FXGA (CHD)',
+        'NEC TurboGrafx-16': 'NEC - PC Engine - TurboGrafx-16',
+        'NEC TurboGrafx-CD': 'NEC - PC Engine CD & TurboGrafx CD',
+        'NEC TurboGrafx-CD (CHD)': 'NEC - PC Engine CD & TurboGrafx CD (CHD)',
+        'Nintendo 64': 'Nintendo - Nintendo 64',
+        'Nintendo DS': 'Nintendo - Nintendo DS',
+        'Nintendo DSi': 'Nintendo - Nintendo DSi',
+        'Nintendo Entertainment System': 'Nintendo - Nintendo Entertainment System',
+        'Nintendo Game Boy Advance': 'Nintendo - Game Boy Advance',
+        'Nintendo Game Boy Color': 'Nintendo - Game Boy Color',
+        'Nintendo Game Boy': 'Nintendo - Game Boy',
+        'Nintendo GameCube': 'Nintendo - GameCube',
+        'Nintendo Pokemon Mini': 'Nintendo - Pokemon Mini',
+        'Nintendo Virtual Boy': 'Nintendo - Virtual Boy',
+        'Sega 32X': 'Sega - 32X',
+        'Sega CD': 'Sega - Mega CD & Sega CD',
+        'Sega CD (CHD)': 'Sega - Mega CD & Sega CD (CHD)',
+        'Sega Dreamcast': 'Sega - Dreamcast',
+        'Sega Dreamcast (CHD)': 'Sega - Dreamcast (CHD)',
+        'Sega Game Gear': 'Sega - Game Gear',
+        'Sega Genesis': 'Sega - Mega Drive - Genesis',
+        'Sega Master System': 'Sega - Master System - Mark III',
+        'Sega Saturn': 'Sega - Saturn',
+        'Sega Saturn (CHD)': 'Sega - Saturn (CHD)',
+        'Sega SG-1000': 'Sega - SG-1000',
+        'SNK Neo Geo CD': 'SNK - Neo Geo CD',
+        'SNK Neo Geo CD (CHD)': 'SNK - Neo Geo CD (CHD)',
+        'SNK Neo Geo Pocket': 'SNK - NeoGeo Pocket',
+        'Sony Playstation 2': 'Sony - PlayStation 2',
+        'Sony Playstation': 'Sony - PlayStation',
+        'Sony PSP': 'Sony - PlayStation Portable',
+        'Super Nintendo Entertainment System': 'Nintendo - Super Nintendo Entertainment System',
+        'Watara Supervision': 'Watara - Supervision',
+        'WonderSwan': 'Bandai - WonderSwan',
+    }
+
+
+def evaluate_filters(
+    title_filters: list[dict[str, Any]],
+    name: str,
+    languages: list[str] | None,
+    region_order: list[str],
+    internal_config: dict[str, Any],
+) -> dict[str, Any]:
+    """
+    Works out what a search term's filters change about a title by checking each
+    condition of each filter against the title, in order.
+
+    Args:
+        title_filters (list[dict[str, Any]]): The filters of the search term the title
+            matched.
+
+        name (str): The title name.
+
+        languages (list[str] | None): The title's language codes, used if its name
+            doesn't have a language tag.
+
+        region_order (list[str]): The user's region order.
+
+        internal_config (dict[str, Any]): The contents of internal-config.json.
+
+    Returns:
+        dict[str, Any]: The results of the filters the title meets, merged in order.
+    """
+    title_regions: list[str] = get_title_regions(name, internal_config)
+    title_languages: tuple[str, ...] = get_title_languages(name, internal_config, languages)
+    results: dict[str, Any] = {}
+
+    for title_filter in title_filters:
+        conditions: dict[str, Any] = title_filter.get('conditions', {})
+
+        if 'regionOrder' in conditions:
+            higher_regions: list[str] = conditions['regionOrder'].get('higherRegions', [])
+            lower_regions: list[str] = conditions['regionOrder'].get('lowerRegions', [])
+            named_regions: list[str] = higher_regions + lower_regions
+
+            def get_ranks(regions: list[str]) -> list[int]:
+                ranks: list[int] = []
+
+                for region in regions:
+                    if region == 'All other regions':
+                        ranks.extend(
+                            i for i, x in enumerate(region_order) if x not in named_regions
+                        )
+                    elif region in region_order:
+                        ranks.append(region_order.index(region))
+                    else:
+                        ranks.append(len(region_order))
+
+                return ranks
+
+            higher_ranks: list[int] = get_ranks(higher_regions)
+            lower_ranks: list[int] = get_ranks(lower_regions)
+
+            if higher_ranks and lower_ranks and max(higher_ranks) >= min(lower_ranks):
+                continue
+
+        if not all(x in title_regions for x in conditions.get('matchRegions', [])):
+            continue
+
+        if not all(
+            set(get_title_languages('', internal_config, [x])) <= set(title_languages)
+            for x in conditions.get('matchLanguages', [])
+        ):
+            continue
+
+        if 'matchString' in conditions and not re.search(conditions['matchString'], name):
+            continue
+
+        results.update(title_filter.get('results', {}))
+
+    return results
+
+
+def generate_mia_files(count: int, seed: int = 0) -> list[dict[str, str]]:
+    """
+    Generates MIA titles with unique names, in no particular order.
+
+    Args:
+        count (int): How many titles to generate.
+
+        seed (int, optional): The random seed. Defaults to `0`.
+
+    Returns:
+        list[dict[str, str]]: The MIA titles, each with a `name` and `crc`.
+    """
+    rng: random.Random = random.Random(seed)
+
+    mia_files: list[dict[str, str]] = [
+        {
+            'name': f'{rng.choice(SAMPLE_MIA_NAMES)} {i:06d}.bin',
+            'crc': f'{rng.getrandbits(32):08x}',
+        }
+        for i in range(count)
+    ]
+    rng.shuffle(mia_files)
+
+    return mia_files
+
+
+def generate_mia_list_names() -> list[str]:
+    """
+    Generates MIA list names like the ones in the MIA zip file, for every system in the
+    data folders. Each is also generated with `datFileTags` entries added, taking turns
+    so every entry is used, and in the forms the old code had special cases for.
+
+    Returns:
+        list[str]: The MIA list names, without their extension.
+    """
+    systems: set[str] = {
+        x.stem
+        for folder in ('clonelists', 'metadata', 'mias', 'retroachievements')
+        for x in pathlib.Path(folder).glob('*.json')
+        if x.name != 'hash.json'
+    }
+
+    with open('config/internal-config.json', encoding='utf-8') as config_file:
+        dat_file_tags: list[str] = json.load(config_file)['datFileTags']
+
+    mia_list_names: set[str] = set()
+
+    for i, system in enumerate(sorted(systems)):
+        tag: str = dat_file_tags[i % len(dat_file_tags)]
+        next_tag: str = dat_file_tags[(i + 1) % len(dat_file_tags)]
+
+        for group in ('No-Intro', 'Redump'):
+            base_name: str = system.replace(f' ({group})', '')
+            mia_list_names.add(f'{group} - {base_name} MIAs')
+            mia_list_names.add(f'{group} - {base_name}MIAs')
+            mia_list_names.add(f'{group} - {base_name} ({tag}) MIAs')
+            mia_list_names.add(f'{group} - {base_name}({tag}) ({next_tag}) MIAs')
+
+    for system in ('2600', '5200', '7800', 'Jaguar', 'Lynx', 'ST'):
+        mia_list_names.add(f'No-Intro - Atari - {system} (Private) MIAs')
+
+    return sorted(mia_list_names)
+
+
+def generate_ra_header_names() -> list[str]:
+    """
+    Generates the names in RetroAchievements DAT file headers, including the ones the
+    old code skipped or rewrote.
+
+    Returns:
+        list[str]: The header names.
+    """
+    header_names: set[str] = {'', 'RA - ', 'Unknown', 'RA - RA - Sega 32X'}
+
+    for system in (
+        *RA_SYSTEM_MAPPING,
+        *RA_SYSTEM_MAPPING.values(),
+        *RA_SKIP_SYSTEMS,
+        'Nintendo Game Boy (Beta)',
+        'Some New System',
+    ):
+        header_names.update((system, f'RA - {system}', f'RA - {system} '))
+
+    return sorted(header_names)
+
+
+def get_language_codes(internal_config: dict[str, Any]) -> dict[str, str]:
+    """
+    Gets the canonical code of each language, the first code its regex matches.
+
+    Args:
+        internal_config (dict[str, Any]): The contents of internal-config.json.
+
+    Returns:
+        dict[str, str]: Each language regex, and its canonical code.
+    """
+    return {
+        language_regex: re.match('[A-Za-z-]+', language_regex).group(0)  # type: ignore
+        for language_regex in internal_config['languages'].values()
+    }
+
+
+def get_metadata_titles() -> list[str]:
+    """
+    Gets the name of every title in the metadata files, as a large set of real names.
+
+    Returns:
+        list[str]: The title names, sorted by system, and then in file order.
+    """
+    titles: list[str] = []
+
+    for metadata_file in sorted(pathlib.Path('metadata').glob('*.json')):
+        if metadata_file.name != 'hash.json':
+            with open(metadata_file, encoding='utf-8') as input_file:
+                titles.extend(json.load(input_file))
+
+    return titles
+
+
+def get_mia_json(system_files: list[dict[str, str]]) -> str:
+    """
+    Formats a system's MIA titles as JSON the way `get_mia.update_mia` used to, sorting
+    the titles again for every title to find the last one. Only backslashes are
+    escaped.
+
+    Args:
+        system_files (list[dict[str, str]]): The MIA titles, each with a `name` and
+            `crc`.
+
+    Returns:
+        str: The JSON, tab indented.
+    """
+    mia_json: list[str] = ['{\n\t"mias": [']
+
+    for system_file in sorted(system_files, key=lambda x: x['name']):
+        system_file_name: str = system_file['name'].replace('\\', '\\\\')
+        system_file_crc: str = system_file['crc']
+
+        if system_file == sorted(system_files, key=lambda x: x['name'])[-1]:
+            mia_json.append(
+                f'\n\t\t{{\n\t\t\t"name": "{system_file_name}",\n\t\t\t"crc": "{system_file_crc}"\n\t\t}}'
+            )
+        else:
+            mia_json.append(
+                f'\n\t\t{{\n\t\t\t"name": "{system_file_name}",\n\t\t\t"crc": "{system_file_crc}"\n\t\t}},'
+            )
+
+    mia_json.append('\n\t]\n}\n')
+
+    return ''.join(mia_json)
+
+
+def get_region_free_name(name: str, internal_config: dict[str, Any]) -> str:
+    """
+    Removes region and language tags from a title name by checking each tag on its
+    own. A tag is a region tag if every comma separated part is a region, and a
+    language tag if every part is fully matched by a language's regex. Only tags
+    followed by another tag, or at the end of the name, are removed.
+
+    Args:
+        name (str): The title name.
+
+        internal_config (dict[str, Any]): The contents of internal-config.json.
+
+    Returns:
+        str: The title name without its region and language tags.
+    """
+    regions: dict[str, Any] = internal_config['defaultRegionOrder']
+    languages: list[str] = list(internal_config['languages'].values())
+
+    region_free_name: str = ''
+    position: int = 0
+
+    for tag in re.finditer(r' \(([^()]*)\)(?= \(|$)', name):
+        contents: str = tag.group(1)
+
+        is_region_tag: bool = all(x in regions for x in contents.split(', '))
+        is_language_tag: bool = all(
+            any(re.fullmatch(language, x) for language in languages)
+            for x in re.split('[,+]', contents)
+        )
+
+        if is_region_tag or is_language_tag:
+            region_free_name += name[position : tag.start()]
+            position = tag.end()
+
+    return region_free_name + name[position:]
+
+
+def get_title_languages(
+    name: str, internal_config: dict[str, Any], languages: list[str] | None = None
+) -> tuple[str, ...]:
+    """
+    Works out a title's languages by checking each of its tags on its own. The codes in
+    the first language tag are used if there is one, then the given codes, and
+    otherwise the languages implied by the regions in the first region tag. Each code
+    stands for every language whose regex fully matches it.
+
+    Args:
+        name (str): The title name.
+
+        internal_config (dict[str, Any]): The contents of internal-config.json.
+
+        languages (list[str], optional): The title's language codes, used if it doesn't
+            have a language tag. Defaults to `None`.
+
+    Returns:
+        tuple[str, ...]: The sorted canonical language codes.
+    """
+    regions: dict[str, Any] = internal_config['defaultRegionOrder']
+    language_codes: dict[str, str] = get_language_codes(internal_config)
+    language_names: dict[str, str] = {
+        language: language_codes[language_regex]
+        for language, language_regex in internal_config['languages'].items()
+    }
+
+    region_languages: set[str] | None = None
+
+    for tag in re.finditer(r' \(([^()]*)\)(?= \(|$)', name):
+        contents: str = tag.group(1)
+
+        if all(x in regions for x in contents.split(', ')):
+            if region_languages is None:
+                region_languages = {
+                    language_names[regions[x]['impliedLanguage']]
+                    for x in contents.split(', ')
+                    if regions[x].get('impliedLanguage') in language_names
+                }
+
+            continue
+
+        tag_languages: list[set[str]] = [
+            {
+                language_code
+                for language_regex, language_code in language_codes.items()
+                if re.fullmatch(language_regex, x)
+            }
+            for x in re.split('[,+]', contents)
+        ]
+
+        if all(tag_languages):
+            return tuple(sorted(set().union(*tag_languages)))
+
+    if languages is not None:
+        return tuple(
+            sorted(
+                {
+                    language_code
+                    for language_regex, language_code in language_codes.items()
+                    for x in languages
+                    if re.fullmatch(language_regex, x)
+                }
+            )
+        )
+
+    return tuple(sorted(region_languages or ()))
+
+
+def get_title_regions(name: str, internal_config: dict[str, Any]) -> list[str]:
+    """
+    Finds the regions in a title's first region tag, by checking each of its tags on
+    its own.
+
+    Args:
+        name (str): The title name.
+
+        internal_config (dict[str, Any]): The contents of internal-config.json.
+
+    Returns:
+        list[str]: The regions, or an empty list if the title doesn't have a region
+        tag.
+    """
+    for tag in re.finditer(r' \(([^()]*)\)(?= \(|$)', name):
+        regions: list[str] = tag.group(1).split(', ')
+
+        if all(x in internal_config['defaultRegionOrder'] for x in regions):
+            return regions
+
+    return []
+
+
+def match_clone_list(
+    clone_list: dict[str, Any], name: str, internal_config: dict[str, Any]
+) -> tuple[str, int, str, str, int] | None:
+    """
+    Finds the variant group a title belongs to by comparing it to every search term in
+    a clone list, in order.
+
+    Args:
+        clone_list (dict[str, Any]): The contents of a clone list.
+
+        name (str): The title name.
+
+        internal_config (dict[str, Any]): The contents of internal-config.json.
+
+    Returns:
+        tuple[str, int, str, str, int] | None: The group, priority, search term, name
+        type, and clone list position of the first search term the title matches, or
+        `None` if it doesn't match any.
+    """
+    short_name: str = name.split(' (', 1)[0]
+    region_free_name: str = get_region_free_name(name, internal_config)
+    index: int = 0
+
+    for variant in clone_list.get('variants', []):
+        for title in variant.get('titles', []):
+            name_type: str = title.get('nameType', 'short')
+            search_term: str = title['searchTerm']
+
+            if (
+                (name_type == 'short' and search_term == short_name)
+                or (name_type == 'full' and search_term == name)
+                or (name_type == 'regionFree' and search_term == region_free_name)
+                or (name_type == 'regex' and re.search(search_term, name))
+            ):
+                return (
+                    variant['group'],
+                    title.get('priority', 1),
+                    search_term,
+                    name_type,
+                    index,
+                )
+
+            index += 1
+
+    return None
+
+
+def normalize_mia_system_name(mia_list_name: str, dat_file_tags: list[str]) -> str:
+    """
+    Rewrites the name of an MIA list the way `get_mia.update_mia` used to, running one
+    substitution per DAT file tag, and scanning the mapping.
+
+    Args:
+        mia_list_name (str): The MIA list filename, without its extension.
+
+        dat_file_tags (list[str]): The `datFileTags` from internal-config.json.
+
+    Returns:
+        str: The system name.
+    """
+    system_name: str = re.sub('\\s?MIAs$', '', mia_list_name)
+
+    for tag in dat_file_tags:
+        system_name = re.sub(rf'\s?\({tag}\)', '', system_name)
+
+    if system_name.startswith('No-Intro - '):
+        system_name = system_name.replace('No-Intro - ', '')
+        system_name = f'{system_name} (No-Intro)'
+
+    if system_name.startswith('Redump - '):
+        system_name = system_name.replace('Redump - ', '')
+        system_name = f'{system_name} (Redump)'
+
+    # Rewrite incorrect system names
+    system_mapping: dict[str, str] = {
+        'Atari - 2600 (No-Intro)': 'Atari - Atari 2600 (No-Intro)',
+        'Atari - 5200 (No-Intro)': 'Atari - Atari 5200 (No-Intro)',
+        'Atari - 7800 (No-Intro)': 'Atari - Atari 7800 (No-Intro)',
+        'Atari - Jaguar (No-Intro)': 'Atari - Atari Jaguar (No-Intro)',
+        'Atari - Lynx (No-Intro)': 'Atari - Atari Lynx (No-Intro)',
+        'Atari - ST (No-Intro)': 'Atari - Atari ST (No-Intro)',
+    }
+
+    for mia_name, proper_name in system_mapping.items():
+        if mia_name == system_name:
+            system_name = proper_name
+
+    return system_name
+
+
+def normalize_ra_system_name(header_name: str) -> str:
+    """
+    Rewrites the name in a RetroAchievements DAT file's header the way `get_ra.update_ra`
+    used to, scanning the skip list and the mapping.
+
+    Args:
+        header_name (str): The name from the DAT file's header.
+
+    Returns:
+        str: The system name, or `''` if the system was skipped.
+    """
+    system_name: str = header_name if header_name else 'Unknown'
+    system_name = re.sub('^RA - ', '', system_name)
+
+    if system_name in RA_SKIP_SYSTEMS:
+        return ''
+
+    for ra_name, proper_name in RA_SYSTEM_MAPPING.items():
+        if ra_name == system_name:
+            system_name = proper_name
+
+    return system_name
+
+
+def normalize_title(name: str, ignore_tags: list[list[str]], dat_file_tags: list[str]) -> str:
+    """
+    Removes ignored tags from a title name by running one substitution per tag, in
+    order. Regex tags are used as written, while string tags and DAT file tags are
+    removed along with one whitespace character before them.
+
+    Args:
+        name (str): The title name.
+
+        ignore_tags (list[list[str]]): The `ignoreTags` from internal-config.json.
+
+        dat_file_tags (list[str]): The `datFileTags` from internal-config.json.
+
+    Returns:
+        str: The title name without any ignored tags.
+    """
+    for tag, tag_type in ignore_tags:
+        if tag_type == 'regex':
+            name = re.sub(tag, '', name)
+        else:
+            name = re.sub(rf'\s?{re.escape(tag)}', '', name)
+
+    for tag in dat_file_tags:
+        name = re.sub(rf'\s?\({tag}\)', '', name)
+
+    return name
@@ -0,0 +1,197 @@
+import json
+import pathlib
+import random
+
+from typing import Any
+
+import pytest
+
+import naive
+
+from modules.clone_list_filters import FilterTable
+from modules.clone_lists import CloneListMatch, CloneListMatcher
+from modules.utils import get_internal_config
+
+CLONE_LIST_FILES: list[pathlib.Path] = sorted(
+    x
+    for x in pathlib.Path(__file__).resolve().parent.parent.joinpath('clonelists').glob('*.json')
+    if x.name != 'hash.json'
+)
+
+# Language codes that aren't canonical, or that stand for more than one language
+EXTRA_LANGUAGE_CODES: tuple[str, ...] = ('En-GB', 'En-US', 'Es-ES', 'Fr-FR', 'Pt-PT', 'Zh')
+
+# Tags that aren't region or language tags
+OTHER_TAGS: tuple[str, ...] = ('Rev 1', 'Proto', 'Disc 1', 'Unl', 'Xx,En', 'Europe, Mars')
+
+
+def evaluate_naive(
+    clone_list: dict[str, Any],
+    clone_list_matches: dict[str, CloneListMatch],
+    languages: dict[str, list[str]],
+    region_order: list[str],
+) -> dict[str, dict[str, Any]]:
+    """Runs the naive filter interpreter on each title that matched a search term."""
+    internal_config: dict[str, Any] = get_internal_config()
+    titles: list[dict[str, Any]] = [
+        title for variant in clone_list.get('variants', []) for title in variant.get('titles', [])
+    ]
+    filtered_titles: dict[str, dict[str, Any]] = {}
+
+    for name, clone_list_match in clone_list_matches.items():
+        if results := naive.evaluate_filters(
+            titles[clone_list_match.index].get('filters', []),
+            name,
+            languages.get(name),
+            region_order,
+            internal_config,
+        ):
+            filtered_titles[name] = results
+
+    return filtered_titles
+
+
+def generate_filter_clone_list(
+    rng: random.Random, term_count: int
+) -> tuple[dict[str, Any], list[str]]:
+    """Generates a clone list with random filters, and names that match its terms."""
+    internal_config: dict[str, Any] = get_internal_config()
+    regions: list[str] = list(internal_config['defaultRegionOrder'])
+    language_codes: list[str] = list(naive.get_language_codes(internal_config).values()) + list(
+        EXTRA_LANGUAGE_CODES
+    )
+
+    titles: list[dict[str, Any]] = []
+    names: list[str] = []
+
+    for i in range(term_count):
+        title_filters: list[dict[str, Any]] = []
+
+        for j in range(rng.randint(1, 3)):
+            conditions: dict[str, Any] = {}
+
+            if rng.random() < 0.4:
+                conditions['matchRegions'] = rng.sample(regions, rng.randint(1, 2))
+
+            if rng.random() < 0.5:
+                conditions['matchLanguages'] = rng.sample(language_codes, rng.randint(1, 2))
+
+            if rng.random() < 0.2:
+                conditions['matchString'] = rng.choice(('Rev', r'\(Proto\)', 'Disc [12]'))
+
+            if rng.random() < 0.2:
+                conditions['regionOrder'] = {
+                    'higherRegions': rng.sample(regions, rng.randint(1, 2)),
+                    'lowerRegions': rng.sample(regions, 1)
+                    + ['All other regions'] * rng.randint(0, 1),
+                }
+
+            title_filters.append({'conditions': conditions, 'results': {f'result {j}': i}})
+
+        titles.append({'searchTerm': f'Term {i}', 'filters': title_filters})
+
+        for _ in range(4):
+            tags: list[str] = []
+
+            if rng.random() < 0.8:
+                tags.append(', '.join(rng.sample(regions, rng.randint(1, 3))))
+
+            if rng.random() < 0.5:
+                tags.append(
+                    rng.choice((',', '+')).join(rng.sample(language_codes, rng.randint(1, 3)))
+                )
+
+            tags.extend(rng.sample(OTHER_TAGS, rng.randint(0, 2)))
+            rng.shuffle(tags)
+
+            names.append(''.join([f'Term {i}'] + [f' ({x})' for x in tags]))
+
+    return {'variants': [{'group': 'Group', 'titles': titles}]}, names
+
+
+@pytest.mark.parametrize(
+    'clone_list_file', CLONE_LIST_FILES, ids=[x.stem for x in CLONE_LIST_FILES]
+)
+def test_clone_list_filters_match(clone_list_file: pathlib.Path) -> None:
+    with open(clone_list_file, encoding='utf-8') as input_file:
+        clone_list: dict[str, Any] = json.load(input_file)
+
+    # Every filter has to compile, as unknown regions and languages are errors
+    filter_table: FilterTable = FilterTable(clone_list)
+
+    if not filter_table.filters:
+        return
+
+    metadata_file: pathlib.Path = clone_list_file.parent.parent.joinpath(
+        'metadata', clone_list_file.name
+    )
+    metadata: dict[str, dict[str, Any]] = {}
+
+    if metadata_file.is_file():
+        with open(metadata_file, encoding='utf-8') as input_file:
+            metadata = json.load(input_file)
+
+    languages: dict[str, list[str]] = {
+        name: details['languages'] for name, details in metadata.items() if 'languages' in details
+    }
+    clone_list_matches: dict[str, CloneListMatch] = CloneListMatcher(clone_list).match_titles(
+        metadata
+    )
+    region_order: list[str] = list(get_internal_config()['defaultRegionOrder'])
+
+    assert filter_table.evaluate_titles(clone_list_matches, languages) == evaluate_naive(
+        clone_list, clone_list_matches, languages, region_order
+    )
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_generated_filters_match(seed: int) -> None:
+    rng: random.Random = random.Random(seed)
+    clone_list, names = generate_filter_clone_list(rng, 200)
+
+    region_order: list[str] = list(get_internal_config()['defaultRegionOrder'])
+    rng.shuffle(region_order)
+    region_order = region_order[: len(region_order) * 3 // 4]
+
+    language_codes: list[str] = list(EXTRA_LANGUAGE_CODES) + ['En', 'Fr', 'Ja', 'nolang']
+    languages: dict[str, list[str]] = {
+        name: rng.sample(language_codes, rng.randint(0, 3)) for name in names[::2]
+    }
+
+    clone_list_matches: dict[str, CloneListMatch] = CloneListMatcher(clone_list).match_titles(
+        names
+    )
+    filtered_titles: dict[str, dict[str, Any]] = FilterTable(
+        clone_list, region_order
+    ).evaluate_titles(clone_list_matches, languages)
+
+    assert len(clone_list_matches) == len(set(names))
+    assert filtered_titles
+    assert filtered_titles == evaluate_naive(
+        clone_list, clone_list_matches, languages, region_order
+    )
+
+
+@pytest.mark.parametrize(
+    'conditions',
+    (
+        {'matchRegions': ['Mars']},
+        {'matchLanguages': ['En,']},
+        {'regionOrder': {'higherRegions': ['USA'], 'lowerRegions': ['Mars']}},
+        {'matchString': '('},
+    ),
+)
+def test_invalid_filters_are_reported(conditions: dict[str, Any]) -> None:
+    clone_list: dict[str, Any] = {
+        'variants': [
+            {
+                'group': 'Group',
+                'titles': [
+                    {'searchTerm': 'Title', 'filters': [{'conditions': conditions, 'results': {}}]}
+                ],
+            }
+        ]
+    }
+
+    with pytest.raises(ValueError, match='"Title"'):
+        FilterTable(clone_list)
@@ -0,0 +1,124 @@
+import json
+import pathlib
+import random
+
+from typing import Any
+
+import pytest
+
+import naive
+
+from modules.clone_lists import REGEX_CHUNK_SIZE, CloneListMatcher, get_region_free_name
+from modules.utils import get_internal_config
+
+CLONE_LIST_FILES: list[pathlib.Path] = sorted(
+    x
+    for x in pathlib.Path(__file__).resolve().parent.parent.joinpath('clonelists').glob('*.json')
+    if x.name != 'hash.json'
+)
+
+# How many metadata titles to check each clone list against, as the naive scan compares
+# every title to every search term
+SAMPLE_SIZE: int = 150
+
+
+def get_sample_titles(clone_list_file: pathlib.Path) -> list[str]:
+    """Gets a sample of the system's metadata titles, and names built from its terms."""
+    titles: list[str] = []
+    metadata_file: pathlib.Path = clone_list_file.parent.parent.joinpath(
+        'metadata', clone_list_file.name
+    )
+
+    if metadata_file.is_file():
+        with open(metadata_file, encoding='utf-8') as input_file:
+            metadata_titles: list[str] = list(json.load(input_file))
+
+        titles.extend(metadata_titles[:: max(len(metadata_titles) // SAMPLE_SIZE, 1)])
+
+    with open(clone_list_file, encoding='utf-8') as input_file:
+        clone_list: dict[str, Any] = json.load(input_file)
+
+    rng: random.Random = random.Random(clone_list_file.name)
+
+    for variant in clone_list.get('variants', []):
+        for title in variant.get('titles', []):
+            if rng.random() < 0.05 or title.get('nameType') in ('full', 'regionFree'):
+                titles.extend(
+                    (
+                        title['searchTerm'],
+                        f'{title["searchTerm"]} (USA)',
+                        f'{title["searchTerm"]} (Japan) (En,Ja) (Rev 1)',
+                    )
+                )
+
+    return titles
+
+
+@pytest.mark.parametrize(
+    'clone_list_file', CLONE_LIST_FILES, ids=[x.stem for x in CLONE_LIST_FILES]
+)
+def test_clone_lists_match(clone_list_file: pathlib.Path) -> None:
+    internal_config: dict[str, Any] = get_internal_config()
+
+    with open(clone_list_file, encoding='utf-8') as input_file:
+        clone_list: dict[str, Any] = json.load(input_file)
+
+    matcher: CloneListMatcher = CloneListMatcher(clone_list)
+    titles: list[str] = get_sample_titles(clone_list_file)
+
+    expected: dict[str, tuple[str, int, str, str, int]] = {}
+
+    for title in titles:
+        if title not in expected and (
+            clone_list_match := naive.match_clone_list(clone_list, title, internal_config)
+        ):
+            expected[title] = clone_list_match
+
+    assert {x: tuple(y) for x, y in matcher.match_titles(titles).items()} == expected
+
+
+def test_combined_regex_patterns_match() -> None:
+    internal_config: dict[str, Any] = get_internal_config()
+    rng: random.Random = random.Random(0)
+
+    # Enough regex terms to fill several combined patterns, with terms that have their
+    # own groups and backreferences, and plain terms that compete with them
+    variants: list[dict[str, Any]] = []
+
+    for i in range(REGEX_CHUNK_SIZE * 3):
+        titles: list[dict[str, Any]] = [{'searchTerm': f'Game {i}', 'priority': 2}]
+
+        if i % 7 == 0:
+            titles.append({'searchTerm': rf'(Game|Title) {i}\b.*\1', 'nameType': 'regex'})
+        elif i % 5 == 0:
+            titles.append({'searchTerm': f'Game {i} (USA)', 'nameType': 'full'})
+        elif i % 3 == 0:
+            titles.append({'searchTerm': f'Game {i % 50}', 'nameType': 'regionFree'})
+        else:
+            titles.append({'searchTerm': rf'\(Rev {i % 40}\)', 'nameType': 'regex'})
+
+        rng.shuffle(titles)
+        variants.append({'group': f'Group {i}', 'titles': titles})
+
+    clone_list: dict[str, Any] = {'variants': variants}
+    names: list[str] = [
+        f'{rng.choice(("Game", "Title"))} {rng.randrange(REGEX_CHUNK_SIZE * 3)}'
+        f'{rng.choice(("", " (USA)", " (Europe) (En,Fr)", " (Rev 3)", " (Title)", " (Game)"))}'
+        for _ in range(2000)
+    ]
+
+    matcher: CloneListMatcher = CloneListMatcher(clone_list)
+
+    assert len(matcher.regex_patterns) > 3
+    assert [tuple(x) if (x := matcher.match(name)) else None for name in names] == [
+        naive.match_clone_list(clone_list, name, internal_config) for name in names
+    ]
+
+
+def test_region_free_names_match() -> None:
+    internal_config: dict[str, Any] = get_internal_config()
+    titles: list[str] = naive.get_metadata_titles()[::20]
+
+    assert [get_region_free_name(x) for x in titles] == [
+        naive.get_region_free_name(x, internal_config) for x in titles
+    ]
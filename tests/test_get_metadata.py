@@ -0,0 +1,197 @@
+import html
+import io
+import json
+import pathlib
+import shutil
+import zipfile
+
+from typing import Any
+
+import pytest
+
+from get_metadata import (
+    METADATA_NEWLINE,
+    METADATA_SOURCES,
+    iter_metadata_json,
+    update_metadata,
+    write_metadata_system,
+)
+
+REPO_ROOT: pathlib.Path = pathlib.Path(__file__).resolve().parent.parent
+
+# Metadata files whose titles aren't in any simple sort order, so they only match if
+# titles are written in DAT file order
+UNSORTED_SYSTEMS: tuple[str, ...] = (
+    'APF - Imagination Machine (No-Intro)',
+    'Apple - II (No-Intro)',
+    'Atari - Atari 2600 (No-Intro)',
+)
+
+# The metadata files of No-Intro and Redump systems. The PlayStation file has a title
+# without a name, which a DAT file can't have.
+METADATA_FILES: list[pathlib.Path] = sorted(
+    x
+    for x in REPO_ROOT.joinpath('metadata').glob('*.json')
+    if x.stem.endswith(tuple(f'({y})' for y in METADATA_SOURCES.values()))
+    and x.stem != 'Sony - PlayStation (Redump)'
+)
+
+
+def generate_dat(system_name: str, titles: list[str]) -> bytes:
+    """Generates a No-Intro or Redump DAT file with the titles, in order."""
+    header_name, source = system_name.rsplit(' (', 1)
+    homepage: str = 'No-Intro' if source.startswith('No-Intro') else 'redump.org'
+    lines: list[str] = [
+        '<?xml version="1.0"?>',
+        '<datafile>',
+        f'\t<header>\n\t\t<name>{html.escape(header_name)}</name>\n'
+        f'\t\t<homepage>{homepage}</homepage>\n\t</header>',
+    ]
+
+    for i, title in enumerate(titles):
+        name: str = html.escape(title, quote=True)
+        lines.append(
+            f'\t<game name="{name}">\n\t\t<description>{name}</description>\n'
+            f'\t\t<rom name="{name}.bin" size="1" crc="{i:08x}"/>\n\t</game>'
+        )
+
+    lines.append('</datafile>\n')
+
+    return '\n'.join(lines).encode('utf-8')
+
+
+@pytest.mark.parametrize('metadata_file', METADATA_FILES, ids=[x.stem for x in METADATA_FILES])
+def test_matches_committed_files(metadata_file: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    system_name: str = metadata_file.stem
+    titles: list[str] = list(json.loads(metadata_file.read_text(encoding='utf-8')))
+
+    write_metadata_system(
+        io.BytesIO(generate_dat(system_name, titles)), system_name, 'metadata', str(tmp_path)
+    )
+
+    assert tmp_path.joinpath(f'{system_name}.json').read_bytes() == metadata_file.read_bytes()
+
+
+@pytest.mark.parametrize('metadata_file', METADATA_FILES, ids=[x.stem for x in METADATA_FILES])
+def test_writer_matches_committed_files(metadata_file: pathlib.Path) -> None:
+    metadata_bytes: bytes = metadata_file.read_bytes()
+
+    # A few files are formatted differently, and are only ever kept as they are
+    if metadata_bytes.count(b'\n') != metadata_bytes.count(METADATA_NEWLINE.encode()) or (
+        not metadata_bytes.endswith(METADATA_NEWLINE.encode())
+    ):
+        pytest.skip('not in the generated format')
+
+    metadata: dict[str, dict[str, Any]] = json.loads(metadata_bytes)
+
+    assert ''.join(
+        iter_metadata_json(
+            (name, title['languages'], title.get('localName', ''))
+            for name, title in metadata.items()
+        )
+    ).encode() == metadata_bytes
+
+
+@pytest.mark.parametrize('system_name', UNSORTED_SYSTEMS)
+def test_keeps_dat_file_order(system_name: str) -> None:
+    metadata_file: pathlib.Path = REPO_ROOT.joinpath('metadata', f'{system_name}.json')
+    titles: list[str] = list(json.loads(metadata_file.read_text(encoding='utf-8')))
+
+    assert titles != sorted(titles)
+
+
+def test_new_titles(tmp_path: pathlib.Path) -> None:
+    dat_bytes: bytes = generate_dat(
+        'New System (No-Intro)',
+        [
+            'Title A (Europe) (En-GB,Fr)',
+            'Title B (China)',
+            'Title C (Taiwan)',
+            'Title D (Brazil)',
+            'Title E (USA)',
+            'Title F (World)',
+        ],
+    )
+    dat_bytes = dat_bytes.replace(
+        b'<game name="Title D (Brazil)"', b'<game name="Title D (Brazil)" localName="T&#237;tulo D"'
+    ).replace(
+        b'<game name="Title E (USA)"',
+        b'<game name="Title E (USA)" languages="en, EN-gb,zh-hans+nolang" name_alt="Title E"',
+    )
+
+    write_metadata_system(
+        io.BytesIO(dat_bytes), 'New System (No-Intro)', 'metadata', str(tmp_path)
+    )
+
+    assert json.loads(
+        tmp_path.joinpath('New System (No-Intro).json').read_text(encoding='utf-8')
+    ) == {
+        'Title A (Europe) (En-GB,Fr)': {'languages': ['En-GB', 'Fr']},
+        'Title B (China)': {'languages': ['Zh']},
+        'Title C (Taiwan)': {'languages': ['Zh']},
+        'Title D (Brazil)': {'languages': ['Pt'], 'localName': 'Título D'},
+        'Title E (USA)': {
+            'languages': ['En', 'En-GB', 'Zh-Hans', 'nolang'],
+            'localName': 'Title E',
+        },
+        'Title F (World)': {'languages': ['En']},
+    }
+
+
+@pytest.mark.parametrize('jobs', (1, 3))
+def test_update_metadata_from_zip(
+    jobs: int, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Run in a copy of the parts of the repository the script reads and writes
+    shutil.copytree(REPO_ROOT.joinpath('config'), tmp_path.joinpath('config'))
+    tmp_path.joinpath('metadata').mkdir()
+
+    for system_name in UNSORTED_SYSTEMS:
+        shutil.copy(
+            REPO_ROOT.joinpath('metadata', f'{system_name}.json'), tmp_path.joinpath('metadata')
+        )
+
+    monkeypatch.chdir(tmp_path)
+
+    dat_zip: pathlib.Path = tmp_path.joinpath('dats.zip')
+
+    with zipfile.ZipFile(dat_zip, 'w') as zip_file:
+        for system_name in UNSORTED_SYSTEMS:
+            titles: list[str] = list(
+                json.loads(
+                    REPO_ROOT.joinpath('metadata', f'{system_name}.json').read_text(
+                        encoding='utf-8'
+                    )
+                )
+            )
+            zip_file.writestr(f'dats/{system_name}.dat', generate_dat(system_name, titles))
+
+        # DAT files without a LogiqX header are skipped
+        zip_file.writestr('dats/Malformed.dat', b'Not a DAT file\n')
+        zip_file.writestr(
+            'dats/New System (No-Intro).dat',
+            generate_dat(
+                'New System (No-Intro)', ['Title B (Japan)', 'Title A (Europe) (En-GB,Fr)']
+            ),
+        )
+
+    update_metadata(str(dat_zip), jobs)
+
+    for system_name in UNSORTED_SYSTEMS:
+        assert (
+            tmp_path.joinpath('metadata', f'{system_name}.json').read_bytes()
+            == REPO_ROOT.joinpath('metadata', f'{system_name}.json').read_bytes()
+        )
+
+    assert json.loads(
+        tmp_path.joinpath('metadata', 'New System (No-Intro).json').read_text(encoding='utf-8')
+    ) == {
+        'Title B (Japan)': {'languages': ['Ja']},
+        'Title A (Europe) (En-GB,Fr)': {'languages': ['En-GB', 'Fr']},
+    }
+
+    sources: list[str] = (
+        tmp_path.joinpath('metadata', 'sources.jsonl').read_text(encoding='utf-8').splitlines()
+    )
+
+    assert len(sources) == len(UNSORTED_SYSTEMS) + 1
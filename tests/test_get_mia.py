@@ -0,0 +1,61 @@
+import json
+import pathlib
+
+import pytest
+
+import naive
+
+from get_mia import get_mia_json, write_mia_system
+
+MIA_FILES: list[pathlib.Path] = sorted(
+    x for x in pathlib.Path(__file__).resolve().parent.parent.joinpath('mias').glob('*.json')
+    if x.name != 'hash.json'
+)
+
+
+@pytest.mark.parametrize('mia_file', MIA_FILES, ids=[x.stem for x in MIA_FILES])
+def test_matches_committed_files(mia_file: pathlib.Path) -> None:
+    mia_json: str = mia_file.read_text(encoding='utf-8')
+
+    assert get_mia_json(json.loads(mia_json)['mias']) == mia_json
+
+
+@pytest.mark.parametrize('count', (0, 1, 2, 500))
+def test_matches_old_writer(count: int) -> None:
+    mia_files: list[dict[str, str]] = naive.generate_mia_files(count, count)
+
+    assert get_mia_json(mia_files) == naive.get_mia_json(mia_files)
+
+
+def test_escapes_special_characters() -> None:
+    mia_files: list[dict[str, str]] = [
+        {'name': name, 'crc': '0badf00d'}
+        for name in ('Quote " (USA)', 'Tab\t(USA)', 'Control \x01\x1f', 'Separator \u2028')
+    ]
+
+    assert json.loads(get_mia_json(mia_files))['mias'] == sorted(
+        mia_files, key=lambda x: x['name']
+    )
+
+
+def test_write_mia_system(tmp_path: pathlib.Path) -> None:
+    mia_files: list[dict[str, str]] = naive.generate_mia_files(10)
+
+    write_mia_system('Test System', mia_files, str(tmp_path))
+
+    assert tmp_path.joinpath('Test System.json').read_text(encoding='utf-8') == (
+        naive.get_mia_json(mia_files)
+    )
+
+
+
+def test_write_mia_system_rejects_invalid_files(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    mia_files: list[dict[str, str]] = [{'name': 'Title (USA)', 'crc': 'Not a CRC'}]
+
+    with pytest.raises(ValueError, match='Test System'):
+        write_mia_system('Test System', mia_files, str(tmp_path))
+
+    assert 'mias[0].crc' in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,64 @@
+import io
+import json
+import pathlib
+import zipfile
+
+import pytest
+
+from get_ra import get_ra_system_name, iter_ra_json
+from modules.parse_dat import FileRecord
+
+RA_FILES: list[pathlib.Path] = sorted(
+    x
+    for x in pathlib.Path(__file__).resolve().parent.parent.joinpath('retroachievements').glob(
+        '*.json'
+    )
+    if x.name != 'hash.json'
+)
+
+RA_DAT_HEADER: bytes = (
+    b'<?xml version="1.0"?>\n'
+    b'<datafile>\n\t<header>\n\t\t<name>RA - Amstrad - CPC</name>\n\t</header>\n</datafile>\n'
+)
+
+
+@pytest.mark.parametrize('ra_file', RA_FILES, ids=[x.stem for x in RA_FILES])
+def test_matches_committed_files(ra_file: pathlib.Path) -> None:
+    ra_json: str = ra_file.read_text(encoding='utf-8')
+    titles: list[tuple[str, FileRecord]] = [
+        (
+            x['name'],
+            FileRecord(
+                crc=x.get('crc', ''),
+                md5=x.get('md5', ''),
+                sha1=x.get('sha1', ''),
+                sha256=x.get('sha256', ''),
+            ),
+        )
+        for x in json.loads(ra_json)['retroachievements']
+    ]
+
+    assert ''.join(iter_ra_json(titles)) == ra_json
+
+
+def test_malformed_dats_are_skipped(capsys: pytest.CaptureFixture[str]) -> None:
+    ra_zip: io.BytesIO = io.BytesIO()
+
+    with zipfile.ZipFile(ra_zip, 'w') as zip_file:
+        zip_file.writestr('Malformed.dat', b'Not a DAT file\n')
+        zip_file.writestr('No header.dat', b'<?xml version="1.0"?>\n<datafile>\n</datafile>\n')
+        zip_file.writestr('Amstrad - CPC.dat', RA_DAT_HEADER)
+
+    with zipfile.ZipFile(ra_zip) as zip_file:
+        system_names: list[str] = []
+
+        for member in zip_file.infolist():
+            with zip_file.open(member) as dat_file:
+                system_names.append(get_ra_system_name(dat_file))
+
+    assert system_names == ['', '', 'Amstrad - CPC']
+
+    errors: str = capsys.readouterr().err
+
+    assert 'Malformed.dat' in errors
+    assert 'No header.dat' in errors
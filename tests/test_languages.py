@@ -0,0 +1,56 @@
+from typing import Any
+
+import naive
+
+from modules.languages import get_code_languages, get_title_languages, get_titles_languages
+from modules.utils import get_internal_config
+
+# Tags where raw codes and canonical codes differ, or where a code stands for more than
+# one language
+TRICKY_NAMES: tuple[str, ...] = (
+    'Title (Europe) (En-GB,Fr,De)',
+    'Title (UK) (En-US+Es-ES)',
+    'Title (China) (Zh)',
+    'Title (Taiwan) (Zh-Hant)',
+    'Title (Hong Kong) (Zh-Hans,Zh-Hant)',
+    'Title (Canada) (Fr-CA,En)',
+    'Title (Brazil) (Pt-BR)',
+    'Title (Portugal) (Pt-PT)',
+    'Title (Mexico) (Es-MX,Es-XL)',
+    'Title (USA, Japan)',
+    'Title (Japan, Korea) (Rev 1)',
+    'Title (Unknown Region) (En)',
+    'Title (Europe) (Xx,En)',
+    'Title (Proto) (Europe)',
+    'Title (Europe) (Proto) (Fr)',
+    'Title (World)',
+    'Title',
+)
+
+
+def test_codes_are_canonical() -> None:
+    assert get_code_languages('En-GB') == ('En',)
+    assert get_code_languages('Fr-CA') == ('Fr-CA',)
+    assert get_code_languages('Zh') == ('Zh-Hans', 'Zh-Hant')
+    assert get_code_languages('Xx') == ()
+    assert get_title_languages('Title (Europe) (En-GB,Fr)') == ('En', 'Fr')
+
+    # Region tags and language tags use the same codes
+    assert get_title_languages('Title (UK)') == get_title_languages('Title (Europe) (En-GB)')
+
+
+def test_tricky_names_match() -> None:
+    internal_config: dict[str, Any] = get_internal_config()
+
+    assert [get_title_languages(x) for x in TRICKY_NAMES] == [
+        naive.get_title_languages(x, internal_config) for x in TRICKY_NAMES
+    ]
+
+
+def test_metadata_titles_match() -> None:
+    internal_config: dict[str, Any] = get_internal_config()
+    titles: list[str] = naive.get_metadata_titles()[::10]
+
+    titles_languages: dict[str, tuple[str, ...]] = get_titles_languages(titles)
+
+    assert titles_languages == {x: naive.get_title_languages(x, internal_config) for x in titles}
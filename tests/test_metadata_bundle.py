@@ -0,0 +1,88 @@
+import json
+import pathlib
+import shutil
+
+from typing import Any
+
+import pytest
+
+from modules.metadata_bundle import (
+    METADATA_BUNDLE_FILE,
+    MetadataBundle,
+    update_metadata_bundle,
+)
+from modules.utils import update_hash
+
+REPO_ROOT: pathlib.Path = pathlib.Path(__file__).resolve().parent.parent
+
+SYSTEMS: tuple[str, ...] = (
+    'Apple - II (No-Intro)',
+    'Nintendo - Game Boy (No-Intro)',
+    'Sony - PlayStation (Redump)',
+)
+
+
+@pytest.fixture
+def metadata_folder(tmp_path: pathlib.Path) -> pathlib.Path:
+    """Copies some of the metadata files, and builds their hash.json file and bundle."""
+    folder: pathlib.Path = tmp_path.joinpath('metadata')
+    folder.mkdir()
+
+    for system in SYSTEMS:
+        shutil.copy(REPO_ROOT.joinpath('metadata', f'{system}.json'), folder)
+
+    update_hash(
+        [str(x) for x in folder.glob('*.json')],
+        str(folder.joinpath('hash.json')),
+        str(tmp_path.joinpath('.hash-cache.json')),
+    )
+    update_metadata_bundle(folder)
+
+    return folder
+
+
+def test_lookup_matches_metadata_files(metadata_folder: pathlib.Path) -> None:
+    with MetadataBundle(metadata_folder.joinpath(METADATA_BUNDLE_FILE)) as bundle:
+        assert bundle.get_systems() == sorted(SYSTEMS)
+
+        for system in SYSTEMS:
+            with open(metadata_folder.joinpath(f'{system}.json'), encoding='utf-8') as input_file:
+                titles: dict[str, dict[str, Any]] = json.load(input_file)
+
+            for title, metadata in titles.items():
+                assert bundle.lookup(system, title) == metadata
+
+            assert bundle.lookup(system, 'Not a title') is None
+
+        assert bundle.lookup('Not a system', 'Not a title') is None
+
+
+def test_stale_bundle_is_rejected(metadata_folder: pathlib.Path) -> None:
+    bundle_file: pathlib.Path = metadata_folder.joinpath(METADATA_BUNDLE_FILE)
+    metadata_file: pathlib.Path = metadata_folder.joinpath(f'{SYSTEMS[0]}.json')
+    metadata_file.write_text('{}\n', encoding='utf-8')
+
+    update_hash(
+        [str(x) for x in metadata_folder.glob('*.json')],
+        str(metadata_folder.joinpath('hash.json')),
+        str(metadata_folder.parent.joinpath('.hash-cache.json')),
+    )
+
+    with pytest.raises(ValueError, match='out of date'):
+        MetadataBundle(bundle_file)
+
+    with MetadataBundle(bundle_file, check_source=False) as bundle:
+        assert bundle.find_system(SYSTEMS[0]) != (0, 0)
+
+    assert update_metadata_bundle(metadata_folder)
+
+    with MetadataBundle(bundle_file) as bundle:
+        assert bundle.find_system(SYSTEMS[0]) == (0, 0)
+
+
+def test_invalid_bundle_is_rejected(tmp_path: pathlib.Path) -> None:
+    bundle_file: pathlib.Path = tmp_path.joinpath(METADATA_BUNDLE_FILE)
+    bundle_file.write_bytes(b'not a bundle')
+
+    with pytest.raises(ValueError):
+        MetadataBundle(bundle_file)
@@ -0,0 +1,94 @@
+import json
+import pathlib
+import shutil
+
+from typing import Any
+
+import pytest
+
+from modules.metadata_index import MetadataFileIndex, update_metadata_indexes
+from modules.utils import update_hash
+
+REPO_ROOT: pathlib.Path = pathlib.Path(__file__).resolve().parent.parent
+
+# Systems with non-ASCII titles and local names, so byte offsets and character
+# positions differ
+SYSTEMS: tuple[str, ...] = (
+    'Apple - II (No-Intro)',
+    'Sony - PlayStation (Redump)',
+)
+
+
+def update_hash_json(folder: pathlib.Path) -> None:
+    """Brings a metadata folder's hash.json file up to date."""
+    update_hash(
+        [str(x) for x in folder.glob('*.json')],
+        str(folder.joinpath('hash.json')),
+        str(folder.parent.joinpath('.hash-cache.json')),
+    )
+
+
+@pytest.fixture
+def metadata_folder(tmp_path: pathlib.Path) -> pathlib.Path:
+    """Copies some of the metadata files, and builds their hash.json file and indexes."""
+    folder: pathlib.Path = tmp_path.joinpath('metadata')
+    folder.mkdir()
+
+    for system in SYSTEMS:
+        shutil.copy(REPO_ROOT.joinpath('metadata', f'{system}.json'), folder)
+
+    # Any JSON layout can be indexed, including escaped characters and no whitespace
+    with open(
+        REPO_ROOT.joinpath('metadata', f'{SYSTEMS[1]}.json'), encoding='utf-8'
+    ) as input_file:
+        folder.joinpath('Escaped.json').write_text(
+            json.dumps(json.load(input_file), separators=(',', ':')), encoding='utf-8'
+        )
+
+    update_hash_json(folder)
+    update_metadata_indexes(folder)
+
+    return folder
+
+
+def test_lookup_matches_metadata_files(metadata_folder: pathlib.Path) -> None:
+    for metadata_file in metadata_folder.glob('*.json'):
+        if metadata_file.name == 'hash.json':
+            continue
+
+        with open(metadata_file, encoding='utf-8') as input_file:
+            titles: dict[str, dict[str, Any]] = json.load(input_file)
+
+        with MetadataFileIndex(metadata_file) as index:
+            for title, metadata in titles.items():
+                assert index.lookup(title) == metadata
+
+            assert index.lookup('Not a title') is None
+
+
+def test_changed_file_is_rejected(metadata_folder: pathlib.Path) -> None:
+    metadata_file: pathlib.Path = metadata_folder.joinpath(f'{SYSTEMS[0]}.json')
+    data: bytes = metadata_file.read_bytes()
+    title: str = next(iter(json.loads(data)))
+
+    # The same size, so only the key check can tell
+    renamed_title: str = title[:-1] + ('X' if title[-1] != 'X' else 'Y')
+    metadata_file.write_bytes(
+        data.replace(json.dumps(title).encode(), json.dumps(renamed_title).encode(), 1)
+    )
+
+    with MetadataFileIndex(metadata_file) as index:
+        with pytest.raises(ValueError, match='out of date'):
+            index.lookup(title)
+
+    # Once hash.json has the new digest, the index is rejected when it's opened
+    update_hash_json(metadata_folder)
+
+    with pytest.raises(ValueError, match='out of date'):
+        MetadataFileIndex(metadata_file)
+
+    update_metadata_indexes(metadata_folder)
+
+    with MetadataFileIndex(metadata_file) as index:
+        assert index.lookup(title) is None
+        assert index.lookup(renamed_title) is not None
@@ -0,0 +1,197 @@
+import io
+import os
+import pathlib
+import random
+
+import pytest
+
+from modules.parse_dat import (
+    TitleData,
+    get_logiqx_titles,
+    iter_logiqx_titles,
+    scan_logiqx_digests,
+    scan_logiqx_titles,
+)
+
+TAG_NAMES: tuple[str, ...] = ('game', 'machine')
+
+# A folder of real DAT files to also compare the engines on, as the repo doesn't ship
+# any DAT files
+REAL_DATS_VARIABLE: str = 'RETOOL_TEST_DATS'
+
+DAT_HEADER: str = (
+    '<?xml version="1.0"?>\n'
+    '<!DOCTYPE datafile PUBLIC "-//Logiqx//DTD ROM Management Datafile//EN" '
+    '"http://www.logiqx.com/Dats/datafile.dtd">\n'
+    '<datafile>\n'
+    '\t<header>\n\t\t<name>Test</name>\n\t\t<description>Test</description>\n\t</header>\n'
+)
+
+# Names that need decoding, or that the engines have to skip
+FILE_NAMES: tuple[str, ...] = (
+    'Title (USA).bin',
+    'Title (USA) (Track 01).bin',
+    'Title (USA).cue',
+    'Title (Japan).gdi',
+    'Title &amp; Other (Europe).bin',
+    'Title &#233; (France).bin',
+    'Title &#x4E2D; (China).bin',
+    "Title 'Quoted' (USA).bin",
+    'Title\twith\ttabs.bin',
+    'Title\r\nwith newline.bin',
+)
+
+
+def generate_attrib(rng: random.Random, name: str, value: str) -> str:
+    """Formats an attribute with a random quote style and spacing."""
+    quote: str = '"' if "'" in value or rng.random() < 0.8 else "'"
+    spacing: str = rng.choice(('', '', ' ', '\n\t\t'))
+
+    return f' {name}{spacing}={spacing}{quote}{value}{quote}'
+
+
+def generate_dat(seed: int, title_count: int = 200) -> bytes:
+    """Generates a well-formed DAT file with the layouts the engines need to agree on."""
+    rng: random.Random = random.Random(seed)
+    lines: list[str] = [DAT_HEADER]
+
+    for i in range(title_count):
+        tag: str = rng.choice(TAG_NAMES)
+        name: str = rng.choice(FILE_NAMES).rsplit('.', 1)[0] + f' {i}'
+        title_attribs: str = generate_attrib(rng, 'name', name)
+
+        if rng.random() < 0.2:
+            title_attribs += generate_attrib(rng, 'cloneof', 'Parent')
+
+        if rng.random() < 0.05:
+            title_attribs = generate_attrib(rng, 'id', str(i))
+
+        if rng.random() < 0.05:
+            lines.append(f'\t<{tag}{title_attribs}/>\n')
+            continue
+
+        children: list[str] = [f'\t\t<description>{name}</description>\n']
+
+        if rng.random() < 0.3:
+            children.append('\t\t<category>Games</category>\n')
+
+        for _ in range(rng.randint(0, 4)):
+            file_attribs: str = ''
+
+            if rng.random() < 0.9:
+                file_attribs += generate_attrib(rng, 'name', rng.choice(FILE_NAMES))
+
+            file_attribs += generate_attrib(rng, 'size', str(rng.randint(1, 1 << 24)))
+
+            for digest_type, length in (('crc', 8), ('md5', 32), ('sha1', 40), ('sha256', 64)):
+                if rng.random() < 0.85:
+                    digest: str = f'{rng.getrandbits(length * 4):0{length}x}'
+                    file_attribs += generate_attrib(
+                        rng, digest_type, digest.upper() if rng.random() < 0.3 else digest
+                    )
+
+            file_tag: str = rng.choice(('rom', 'rom', 'rom', 'disk'))
+            closing: str = rng.choice(('/>', ' />', f'></{file_tag}>'))
+            file_element: str = f'<{file_tag}{file_attribs}{closing}'
+
+            # Files nested in another element aren't files of the title
+            if rng.random() < 0.1:
+                file_element = f'<trurip>{file_element}</trurip>'
+
+            children.append(f'\t\t{file_element}\n')
+
+        rng.shuffle(children)
+
+        lines.append(f'\t<{tag}{title_attribs}>\n{"".join(children)}\t</{tag}>\n')
+
+    lines.append('</datafile>\n')
+
+    return ''.join(lines).encode('utf-8')
+
+
+def get_lxml_titles(dat_bytes: bytes) -> list[tuple[str, tuple[object, ...]]]:
+    """Reads the titles of a DAT file with the lxml engine."""
+    return get_title_details(iter_logiqx_titles(io.BytesIO(dat_bytes), TAG_NAMES, True, 'lxml'))
+
+
+def get_title_details(titles: object) -> list[tuple[str, tuple[object, ...]]]:
+    """Gets everything the engines return for each title, in order."""
+    title_list: list[TitleData] = list(titles)  # type: ignore
+
+    return [(x.name, x.files) for x in title_list]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_generated_dats_match(seed: int) -> None:
+    dat_bytes: bytes = generate_dat(seed)
+
+    assert get_title_details(scan_logiqx_digests(dat_bytes, TAG_NAMES)) == get_lxml_titles(
+        dat_bytes
+    )
+
+
+def test_nested_files_are_skipped() -> None:
+    dat_bytes: bytes = (
+        DAT_HEADER
+        + '\t<game name="Nested">\n'
+        '\t\t<trurip><rom name="inner.bin" crc="11111111"/></trurip>\n'
+        '\t\t<rom name="outer.bin" crc="22222222"/>\n'
+        '\t</game>\n</datafile>\n'
+    ).encode('utf-8')
+
+    titles = get_title_details(scan_logiqx_digests(dat_bytes, TAG_NAMES))
+
+    assert titles == get_lxml_titles(dat_bytes)
+    assert titles[0][1][0].crc == '22222222'
+
+
+@pytest.mark.parametrize(
+    'dat_body',
+    (
+        '\t<game name="A"><rom name="a.bin" crc="1"/></game>\n'
+        '\t<!-- A comment --><game name="B"><rom name="b.bin" crc="2"/></game>\n',
+        '\t<game name="A"><rom name="a.bin" crc="1"/></game>\n'
+        '\t<game name="B"><rom name="b.bin" crc="2"/></game></game>\n'
+        '\t<game name="C"><rom name="c.bin" crc="3"/></game>\n',
+        '\t<game name="A &unknown;"><rom name="a.bin" crc="1"/></game>\n',
+        '\t<game name="A"><rom name="a.bin" crc=1/></game>\n',
+    ),
+)
+def test_malformed_dats_fall_back_to_lxml(dat_body: str) -> None:
+    dat_bytes: bytes = (DAT_HEADER + dat_body + '</datafile>\n').encode('utf-8')
+
+    with pytest.raises(ValueError):
+        list(scan_logiqx_digests(dat_bytes, TAG_NAMES))
+
+    assert get_title_details(scan_logiqx_titles(io.BytesIO(dat_bytes), TAG_NAMES)) == (
+        get_lxml_titles(dat_bytes)
+    )
+
+
+def test_engine_is_selectable(tmp_path: pathlib.Path) -> None:
+    dat_file: pathlib.Path = tmp_path.joinpath('test.dat')
+    dat_file.write_bytes(generate_dat(0))
+
+    assert get_logiqx_titles(dat_file, TAG_NAMES, True, 'bytes') == get_logiqx_titles(
+        dat_file, TAG_NAMES, True, 'lxml'
+    )
+
+    with pytest.raises(ValueError):
+        get_logiqx_titles(dat_file, TAG_NAMES, True, 'sax')
+
+
+@pytest.mark.skipif(
+    not os.environ.get(REAL_DATS_VARIABLE),
+    reason=f'Set {REAL_DATS_VARIABLE} to a folder of DAT files to compare them too.',
+)
+def test_real_dats_match() -> None:
+    dat_files: list[pathlib.Path] = sorted(
+        pathlib.Path(os.environ[REAL_DATS_VARIABLE]).rglob('*.dat')
+    )
+
+    assert dat_files
+
+    for dat_file in dat_files:
+        assert get_title_details(scan_logiqx_titles(dat_file, TAG_NAMES)) == get_lxml_titles(
+            dat_file.read_bytes()
+        ), dat_file
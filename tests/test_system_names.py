@@ -0,0 +1,22 @@
+import naive
+
+from modules.system_names import normalize_mia_system_name, normalize_ra_system_name
+from modules.utils import get_internal_config
+
+
+def test_mia_system_names_match() -> None:
+    dat_file_tags: list[str] = get_internal_config()['datFileTags']
+    mia_list_names: list[str] = naive.generate_mia_list_names()
+
+    assert len(mia_list_names) > 1_000
+    assert [normalize_mia_system_name(x) for x in mia_list_names] == [
+        naive.normalize_mia_system_name(x, dat_file_tags) for x in mia_list_names
+    ]
+
+
+def test_ra_system_names_match() -> None:
+    header_names: list[str] = naive.generate_ra_header_names()
+
+    assert [normalize_ra_system_name(x) for x in header_names] == [
+        naive.normalize_ra_system_name(x) for x in header_names
+    ]
@@ -0,0 +1,61 @@
+import pytest
+
+import naive
+
+from modules.title_names import get_ignore_tag_patterns, normalize_title, normalize_titles
+from modules.utils import get_internal_config
+
+# Names where removing the tags in order matters, because tags overlap, nest, or sit
+# next to each other
+TRICKY_NAMES: tuple[str, ...] = (
+    'Title (USA)',
+    'Title (USA) (GB)',
+    'Title(GB) (GBC)',
+    'Title (GB)(GB) (GB)',
+    '(GB) Title',
+    'Title (Made in (GB) Japan)',
+    'Title (Made in Japan) (Made in USA)',
+    'Title (Made in (Made in Japan))',
+    'Title (Multi Tap (GB) Doukonban) (Rev 1)',
+    'Title (Multi Tap) (GBA) (Doukonban)',
+    'Title (No EDC) (EDC)',
+    'Title (No (EDC))',
+    'Title (JY-001) (JY001) (JY-0001)',
+    'Title (NS-1234A) (VT-123) (KT-12)',
+    'Title (LA01) (LH99) (LI01)',
+    'Title (CTC-01) (CTC-1)',
+    'Title (N64brew Game Jam 2021) (64brew Game Jam 2029)',
+    "Title (Presence of Mind '98)",
+    'Title (Private) (Headered) (BETA)',
+    'Title (Private(GB)) (Headered)',
+    'Title  (GB)',
+    'Title\t(GB)',
+    'Title (gb)',
+    '',
+)
+
+
+@pytest.fixture(scope='module')
+def ignore_tags() -> tuple[list[list[str]], list[str]]:
+    internal_config = get_internal_config()
+
+    return (internal_config['ignoreTags'], internal_config['datFileTags'])
+
+
+def test_tricky_names_match(ignore_tags: tuple[list[list[str]], list[str]]) -> None:
+    expected: list[str] = [naive.normalize_title(x, *ignore_tags) for x in TRICKY_NAMES]
+
+    assert [normalize_title(x) for x in TRICKY_NAMES] == expected
+    assert normalize_titles(TRICKY_NAMES) == expected
+
+
+def test_metadata_titles_match(ignore_tags: tuple[list[list[str]], list[str]]) -> None:
+    detector = get_ignore_tag_patterns().detector
+    titles: list[str] = sorted(set(naive.get_metadata_titles()))
+
+    # Every name the detector sends down the sequential path, and a sample of the names
+    # it passes through as they are, as the naive version is slow
+    sample: list[str] = [x for i, x in enumerate(titles) if i % 50 == 0 or detector.search(x)]
+
+    assert len(sample) > 4000
+    assert normalize_titles(sample) == [naive.normalize_title(x, *ignore_tags) for x in sample]
@@ -0,0 +1,39 @@
+import json
+import pathlib
+
+import pytest
+
+from update_hash import check_folder_hashes, update_folder_hashes
+
+
+def test_check_folder_hashes(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Keep the hash cache out of the repository
+    monkeypatch.chdir(tmp_path)
+
+    folder: pathlib.Path = pathlib.Path('mias')
+    folder.mkdir()
+    folder.joinpath('A.json').write_text('{}\n', encoding='utf-8')
+    folder.joinpath('b.json').write_text('[]\n', encoding='utf-8')
+
+    assert check_folder_hashes([str(folder)]) == [f'{folder.joinpath("hash.json")} is missing']
+
+    update_folder_hashes([str(folder)])
+    hash_json: bytes = folder.joinpath('hash.json').read_bytes()
+
+    assert check_folder_hashes([str(folder)]) == []
+
+    folder.joinpath('A.json').write_text('{"changed": true}\n', encoding='utf-8')
+    folder.joinpath('b.json').unlink()
+    folder.joinpath('C.json').write_text('{}\n', encoding='utf-8')
+
+    hash_file: pathlib.Path = folder.joinpath('hash.json')
+
+    assert check_folder_hashes([str(folder)]) == [
+        f'{hash_file} has an out of date hash for "A.json"',
+        f'{hash_file} lists "b.json", which doesn\'t exist',
+        f'{hash_file} doesn\'t list "C.json"',
+    ]
+
+    # Checking never writes to hash.json
+    assert hash_file.read_bytes() == hash_json
+    assert list(json.loads(hash_json)) == ['A.json', 'b.json']
@@ -0,0 +1,318 @@
+import concurrent.futures
+import hashlib
+import http.server
+import io
+import os
+import pathlib
+import stat
+import threading
+
+from typing import Any, Iterator
+
+import pytest
+
+from modules import utils
+from modules.utils import (
+    DEFAULT_FILE_MODE,
+    ConnectionPool,
+    DownloadResult,
+    download,
+    hash_file,
+    iter_bounded_results,
+    update_download_cache,
+    write_bytes_atomic,
+    write_file_atomic,
+)
+
+# Large enough to be read in several chunks
+TEST_CONTENT: bytes = bytes(range(256)) * 4096
+
+
+class DownloadServer(http.server.ThreadingHTTPServer):
+    """
+    A stand-in for a download server that can drop connections partway through a
+    response, and can ignore range requests.
+
+    Args:
+        content (bytes): The file the server sends.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, content: bytes) -> None:
+        super().__init__(('127.0.0.1', 0), DownloadHandler)
+        self.content: bytes = content
+        self.etag: str = get_etag(content)
+        self.supports_range: bool = True
+        self.drop_after: list[int] = []
+        self.requests: list[dict[str, str]] = []
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/test file.zip'
+
+    def set_content(self, content: bytes) -> None:
+        """Changes the file the server sends."""
+        self.content = content
+        self.etag = get_etag(content)
+
+
+class DownloadHandler(http.server.BaseHTTPRequestHandler):
+    """Handles requests to a `DownloadServer`."""
+
+    protocol_version = 'HTTP/1.1'
+    server: DownloadServer
+
+    def do_GET(self) -> None:
+        self.server.requests.append(dict(self.headers.items()))
+        content: bytes = self.server.content
+
+        if self.headers.get('If-None-Match') == self.server.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.server.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        start: int = 0
+        range_header: str = self.headers.get('Range', '')
+
+        if (
+            range_header.startswith('bytes=')
+            and self.server.supports_range
+            and self.headers.get('If-Range', self.server.etag) == self.server.etag
+        ):
+            start = int(range_header[6:].rstrip('-'))
+
+        body: bytes = content[start:]
+
+        if start:
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(content) - 1}/{len(content)}')
+        else:
+            self.send_response(200)
+
+        self.send_header('ETag', self.server.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if self.server.drop_after:
+            self.wfile.write(body[: self.server.drop_after.pop(0)])
+            self.close_connection = True
+            return
+
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def get_etag(content: bytes) -> str:
+    """Gets a strong ETag for the content."""
+    return f'"{hashlib.sha256(content).hexdigest()[:16]}"'
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> Iterator[DownloadServer]:
+    """Runs a download server, and stops retries from waiting."""
+    monkeypatch.setattr(utils, 'DOWNLOAD_BACKOFF_BASE', 0)
+
+    download_server: DownloadServer = DownloadServer(TEST_CONTENT)
+    thread: threading.Thread = threading.Thread(target=download_server.serve_forever)
+    thread.start()
+
+    yield download_server
+
+    download_server.shutdown()
+    download_server.server_close()
+    thread.join()
+
+
+def test_download_writes_atomically(server: DownloadServer, tmp_path: pathlib.Path) -> None:
+    local_file: pathlib.Path = tmp_path.joinpath('test.zip')
+    result: DownloadResult = download((server.url, str(local_file)), False)
+
+    assert not result.failed
+    assert local_file.read_bytes() == TEST_CONTENT
+    assert result.sha256 == hashlib.sha256(TEST_CONTENT).hexdigest()
+    assert result.size == len(TEST_CONTENT)
+    assert result.etag == server.etag
+    assert stat.S_IMODE(local_file.stat().st_mode) == DEFAULT_FILE_MODE
+    assert [x.name for x in tmp_path.iterdir()] == ['test.zip']
+
+
+def test_download_resumes_with_range(server: DownloadServer, tmp_path: pathlib.Path) -> None:
+    server.drop_after = [100_000, 200_000]
+    local_file: pathlib.Path = tmp_path.joinpath('test.zip')
+
+    result: DownloadResult = download((server.url, str(local_file)), False)
+
+    assert not result.failed
+    assert local_file.read_bytes() == TEST_CONTENT
+    assert result.sha256 == hashlib.sha256(TEST_CONTENT).hexdigest()
+    assert [x.get('Range') for x in server.requests] == [
+        None,
+        'bytes=100000-',
+        'bytes=300000-',
+    ]
+    assert [x.get('If-Range') for x in server.requests[1:]] == [server.etag] * 2
+
+
+def test_download_restarts_without_range_support(
+    server: DownloadServer, tmp_path: pathlib.Path
+) -> None:
+    server.supports_range = False
+    server.drop_after = [100_000]
+    local_file: pathlib.Path = tmp_path.joinpath('test.zip')
+
+    result: DownloadResult = download((server.url, str(local_file)), False)
+
+    assert not result.failed
+    assert local_file.read_bytes() == TEST_CONTENT
+    assert result.sha256 == hashlib.sha256(TEST_CONTENT).hexdigest()
+
+
+def test_download_restarts_when_file_changes(
+    server: DownloadServer, tmp_path: pathlib.Path
+) -> None:
+    new_content: bytes = TEST_CONTENT[::-1] + b'new'
+    local_file: pathlib.Path = tmp_path.joinpath('test.zip')
+
+    # The file changes on the server after the connection drops, so the If-Range
+    # validator no longer matches and the whole new file is sent
+    class ChangingHandler(DownloadHandler):
+        def do_GET(self) -> None:
+            if len(self.server.requests) == 1:
+                self.server.set_content(new_content)
+
+            super().do_GET()
+
+    server.RequestHandlerClass = ChangingHandler
+    server.drop_after = [100_000]
+
+    result: DownloadResult = download((server.url, str(local_file)), False)
+
+    assert not result.failed
+    assert local_file.read_bytes() == new_content
+    assert result.sha256 == hashlib.sha256(new_content).hexdigest()
+    assert result.etag == server.etag
+
+
+def test_download_cache_not_modified(server: DownloadServer, tmp_path: pathlib.Path) -> None:
+    cache_file: str = str(tmp_path.joinpath('.download-cache.json'))
+    local_file: pathlib.Path = tmp_path.joinpath('test.zip')
+
+    first_result: DownloadResult = download((server.url, str(local_file)), False, None, cache_file)
+    update_download_cache(cache_file, server.url, first_result)
+    local_file.unlink()
+
+    result: DownloadResult = download((server.url, str(local_file)), False, None, cache_file)
+
+    assert server.requests[-1].get('If-None-Match') == server.etag
+    assert result.not_modified
+    assert result.sha256 == first_result.sha256
+    assert not local_file.exists()
+
+    # A changed file is downloaded again
+    server.set_content(TEST_CONTENT + b'changed')
+
+    result = download((server.url, str(local_file)), False, None, cache_file)
+
+    assert not result.not_modified
+    assert local_file.read_bytes() == TEST_CONTENT + b'changed'
+
+
+def test_download_not_found(server: DownloadServer, tmp_path: pathlib.Path) -> None:
+    local_file: pathlib.Path = tmp_path.joinpath('test.zip')
+
+    class NotFoundHandler(DownloadHandler):
+        def do_GET(self) -> None:
+            self.send_error(404)
+
+    server.RequestHandlerClass = NotFoundHandler
+
+    assert download((server.url, str(local_file)), False).failed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_connection_pool_reuses_connections(
+    server: DownloadServer, tmp_path: pathlib.Path
+) -> None:
+    with ConnectionPool() as pool:
+        for i in range(5):
+            local_file: pathlib.Path = tmp_path.joinpath(f'test {i}.zip')
+            result: DownloadResult = download((server.url, str(local_file)), False, None, '', pool)
+
+            assert not result.failed
+            assert local_file.read_bytes() == TEST_CONTENT
+
+        assert pool.requests_made == 5
+        assert pool.connections_opened == 1
+
+
+def test_connection_pool_resumes(server: DownloadServer, tmp_path: pathlib.Path) -> None:
+    server.drop_after = [100_000]
+    local_file: pathlib.Path = tmp_path.joinpath('test.zip')
+
+    with ConnectionPool() as pool:
+        result: DownloadResult = download((server.url, str(local_file)), False, None, '', pool)
+
+    assert not result.failed
+    assert local_file.read_bytes() == TEST_CONTENT
+    assert server.requests[-1].get('Range') == 'bytes=100000-'
+
+
+def test_atomic_writes_keep_permissions(tmp_path: pathlib.Path) -> None:
+    new_file: pathlib.Path = tmp_path.joinpath('new.json')
+    write_file_atomic(new_file, '{}\n')
+
+    assert stat.S_IMODE(new_file.stat().st_mode) == DEFAULT_FILE_MODE
+
+    existing_file: pathlib.Path = tmp_path.joinpath('existing.bin')
+    existing_file.write_bytes(b'old')
+    os.chmod(existing_file, 0o640)
+    write_bytes_atomic(existing_file, b'new')
+
+    assert existing_file.read_bytes() == b'new'
+    assert stat.S_IMODE(existing_file.stat().st_mode) == 0o640
+
+
+def test_iter_bounded_results_limits_pending_calls() -> None:
+    consumed: list[int] = []
+    max_pending: int = 3
+
+    def arguments() -> Iterator[tuple[int]]:
+        for i in range(20):
+            consumed.append(i)
+            yield (i,)
+
+    finished: list[int] = []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        for result in iter_bounded_results(executor, lambda x: x * 2, arguments(), max_pending):
+            finished.append(result)
+
+            # Only a few more arguments than have finished are read at once
+            assert len(consumed) <= len(finished) + max_pending
+
+    assert sorted(finished) == [x * 2 for x in range(20)]
+
+
+def test_iter_bounded_results_raises() -> None:
+    def fail(x: int) -> int:
+        if x == 5:
+            raise ValueError(x)
+
+        return x
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError):
+            list(iter_bounded_results(executor, fail, ((x,) for x in range(10)), 2))
+
+
+def test_hash_file_reads_file_objects(tmp_path: pathlib.Path) -> None:
+    test_file: pathlib.Path = tmp_path.joinpath('test.bin')
+    test_file.write_bytes(TEST_CONTENT)
+
+    assert hash_file(str(test_file)) == hashlib.sha256(TEST_CONTENT).hexdigest()
+    assert hash_file(test_file) == hash_file(io.BytesIO(TEST_CONTENT))
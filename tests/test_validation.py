@@ -0,0 +1,34 @@
+import pytest
+
+from modules.validation import SCHEMAS, check_schema
+
+
+def get_errors(value: object, folder_type: str) -> list[str]:
+    """Checks a value against the schema for a folder, and returns the errors."""
+    errors: list[str] = []
+    check_schema(value, SCHEMAS[folder_type], '', errors)
+
+    return errors
+
+
+@pytest.mark.parametrize('crc', ('3F24CF', '9B7C1F2', '0B35ED50', 'b35ed50'))
+def test_ra_crcs_can_drop_leading_zeros(crc: str) -> None:
+    assert not get_errors(
+        {'retroachievements': [{'name': 'Title', 'crc': crc}]}, 'retroachievements'
+    )
+
+
+@pytest.mark.parametrize('crc', ('', '0B35ED500', '0B35ED5G', 3))
+def test_invalid_ra_crcs(crc: object) -> None:
+    assert get_errors(
+        {'retroachievements': [{'name': 'Title', 'crc': crc}]}, 'retroachievements'
+    ) == ['retroachievements[0].crc: expected a hex crc digest of up to 8 characters']
+
+
+def test_other_digests_keep_leading_zeros() -> None:
+    assert get_errors({'mias': [{'name': 'Title', 'crc': '3F24CF'}]}, 'mias') == [
+        'mias[0].crc: expected a 8 character hex crc digest'
+    ]
+    assert get_errors(
+        {'retroachievements': [{'name': 'Title', 'md5': '1' * 31}]}, 'retroachievements'
+    ) == ['retroachievements[0].md5: expected a 32 character hex md5 digest']